@@ -1238,6 +1238,25 @@ class DynamoNutrition(object):
 
                 batch.put_item(Item=form.convert_to_decimal(current_plan))
 
+    def write_alternatives(self, unique_id, alternatives):
+        """Stores alternative plans next to the plan of each day, to be called
+        after write_to_nutrients_for_day.
+
+        :param unique_id: PARTITION KEY
+        :param alternatives: {date: [{container_key: [meal_key, ...]}, ...]}
+        """
+        table = self.dynamodb.Table(c.TABLE_NUTRITIONAL_NEEDS_DAY)
+        for date, day_plans in alternatives.iteritems():
+            table.update_item(
+                Key={
+                    c.UNIQUE_IDENTIFIER: unique_id,
+                    c.DATE: date
+                },
+                UpdateExpression='SET #alternatives = :value',
+                ExpressionAttributeNames={"#alternatives": c.ALTERNATIVES},
+                ExpressionAttributeValues={":value": day_plans}
+            )
+
     def write_to_nutrients_for_week(self, boundsForWeek, unique_id, nut_for_week, time):
         """
 
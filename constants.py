@@ -41,6 +41,7 @@ SPLITTED_NEEDS = 'splitted_needs'
 ITEM = 'Item'
 ITEMS = 'Items'
 SOLUTION_TIME = 'solution_time'
+ALTERNATIVES = 'alternatives'
 CREATED_ON = 'created_on'
 
 """ SQL DATABASE """
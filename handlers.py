@@ -37,7 +37,12 @@ def generate(event, context):
             event=event,
             prob_type=generate.__name__,
             time_out=120,
-            cbc_log=False
+            cbc_log=False,
+            symmetry=event.get('symmetry'),
+            engine=event.get('engine', 'cbc'),
+            evo_seconds=event.get('evo_seconds', 0),
+            pool_size=event.get('pool_size', 1),
+            sos=event.get('sos', False)
     ) as manager:
         manager.set_meal_by_container()
     return manager.managerLog
@@ -24,7 +24,8 @@ import constants as c
 import params
 import patients
 import awsapi
-from optimizationtools import Modeller, Evaluator
+from optimizationtools import Modeller, Evaluator, ModelCache, LagrangianSolver, EvolutionarySolver, \
+    PortfolioSolver
 from dbmodel import mealdescription, engine
 
 
@@ -33,6 +34,9 @@ switch_patient = {
     'DGE': patients.DGEPatient
 }
 
+# compiled models are kept as long as the Lambda container is warm
+model_cache = ModelCache(maxsize=8)
+
 
 class ModelManager(object):
     """Abstract Base Class for all context managers that perform
@@ -41,7 +45,8 @@ class ModelManager(object):
     __metaclass__ = abc.ABCMeta
 
     def __init__(self, cognito_id, event, prob_type, time_out, cbc_log,
-                 patient, strong_branching):
+                 patient, strong_branching, warm_start=False, engine='cbc', evo_seconds=0,
+                 pool_size=1, pool_distance=4):
         """This is a fake initializer and is to be called only by subclasses
         of ModelManager to set the standard modelling attributes.
 
@@ -53,6 +58,18 @@ class ModelManager(object):
         :param cbc_log: True | False, prints log from cbc solver
         :param patient: Patient, instance of a Patient class
         :param strong_branching: True | False, enables strong branching
+        :param warm_start: True | False, passes the plan stored in DynamoDB
+                           to cbc as MIP start
+        :param engine: 'cbc' | 'lagrange' | 'evo' | 'portfolio', solves the whole model with cbc,
+                       decomposes it by days (LagrangianSolver), searches a plan heuristically
+                       within time_out (EvolutionarySolver) or races several cbc configurations
+                       on all cpus and takes the first proven result (PortfolioSolver)
+        :param evo_seconds: seconds for EvolutionarySolver to find a plan that is passed to cbc
+                            as MIP start, 0 to skip. With engine 'portfolio' the EvolutionarySolver
+                            races along for evo_seconds instead
+        :param pool_size: number of plans cbc generates (SparseModel.solve_pool), the plans
+                          besides the first one are kept as alternatives
+        :param pool_distance: minimal number of meals in which the plans of the pool differ
         """
         self.cognitoId = cognito_id
         self.event = event
@@ -61,12 +78,20 @@ class ModelManager(object):
         self.cbcLog = 1 if cbc_log else 0
         self.patient = patient
         self.strongBranching = strong_branching
+        self.warmStart = warm_start
+        self.engine = engine
+        self.evoSeconds = evo_seconds
+        self.poolSize = pool_size
+        self.poolDistance = pool_distance
+        self.pool = []
+        self.alternativeMeals = []
         self.userNutritionStore = awsapi.DynamoNutrition()
         self.userDataStore = awsapi.DynamoUserData()
         self.problem = pulp.LpProblem(name=self.probType)
         self._tree = lambda: collections.defaultdict(self._tree)
         self.meals = {}
         self.managerLog = {}
+        self.presolveLog = None
         self.exclusions = self._exclusions()
         self.conn = engine.connect()
 
@@ -85,6 +110,95 @@ class ModelManager(object):
     def _set_splitted_macro_bounds(self):
         self.splitted_macro_bounds = None
 
+    def _solve(self, solver):
+        """Compiles and presolves the model of the Modeller and solves it with
+        'solver' by self.engine. The presolve log is printed and kept in
+        self.presolveLog.
+
+        :param solver: instance of pulp.PULP_CBC_CMD, pulp.PULP_CBC_WORKER or pulp.CBC_DLL
+        :return: pulp status
+        """
+        model = self.modeller.compile().presolve()
+        self.presolveLog = model.presolveLog
+        print 'presolve removed %d rows, fixed %d columns, tightened %d bounds' % (
+            len(self.presolveLog['rows']), len(self.presolveLog['columns']), self.presolveLog['bounds'])
+        if self.engine == 'lagrange':
+            return LagrangianSolver(
+                model=model,
+                blocks=self.modeller.day_blocks(model),
+                solver=solver
+            ).solve()
+        if self.engine == 'evo':
+            return EvolutionarySolver(
+                model=model,
+                blocks=self.modeller.day_blocks(model),
+                time_limit=self.timeOut
+            ).solve()
+        if self.engine == 'portfolio':
+            return PortfolioSolver(
+                model=model,
+                solver=solver,
+                blocks=self.modeller.day_blocks(model),
+                evo_seconds=self.evoSeconds
+            ).solve()
+        if self.evoSeconds:
+            evo = EvolutionarySolver(
+                model=model,
+                blocks=self.modeller.day_blocks(model),
+                time_limit=self.evoSeconds
+            )
+            genome, penalty = evo.search()
+            print 'evolutionary search: penalty %f after %d generations' % (penalty, evo.generations)
+            if penalty <= evo.tol:
+                for variable, val in zip(model.columns, genome.tolist()):
+                    variable.setInitialValue(int(val))
+                solver.warmStart = True
+        if self.poolSize > 1:
+            solutions = model.solve_pool(solver=solver, size=self.poolSize, distance=self.poolDistance)
+            self.pool = [self.modeller.plan(model, x) for x in solutions]
+            return model.status
+        return model.solve(solver=solver)
+
+    def _get_stored_plan(self, days):
+        """Returns the meal keys of the plan stored in DynamoDB for each
+        container and day. Days without a stored plan are left out.
+
+        :param days: list of dates in ISO 8601
+        :return: dict, {day: {container_key: [meal_key, ...]}}
+        """
+        stored_plan = {}
+        for day in days:
+            try:
+                plan = self.userNutritionStore.get_from_nutrients_for_day(
+                    unique_id=self.cognitoId,
+                    date=day,
+                    top_level=c.PLAN
+                )
+            except (KeyError, ValueError):
+                continue
+            stored_plan[day] = {container_key: list(container) for container_key, container in plan.iteritems()}
+        return stored_plan
+
+    def _alternatives_by_day(self):
+        """Returns the day plans of the alternative plans in self.pool that differ
+        from the plan that is stored (the first one), without duplicates.
+
+        :return: dict, {day: [{container_key: [meal_key, ...]}, ...]}
+        """
+        by_day = {}
+        if not self.pool:
+            return by_day
+        normalized = [
+            {day: {container_key: sorted(meal_keys) for container_key, meal_keys in day_plan.iteritems()}
+             for day, day_plan in plan.iteritems()}
+            for plan in self.pool
+        ]
+        for plan in normalized[1:]:
+            for day, day_plan in plan.iteritems():
+                if day_plan != normalized[0].get(day) and day_plan not in by_day.setdefault(day, []):
+                    by_day[day].append(day_plan)
+        return {day: day_plans for day, day_plans in by_day.iteritems() if day_plans}
+
     def get_meals(self, num, conditions, container_key):
         switch_cond = {
             'BF': [],  # TODO: extra Conditions einfügen für container??
@@ -266,7 +380,7 @@ class ModelManager(object):
 
 class RegenerateManager(ModelManager):
     def __init__(self, cognito_id, event, time_out, cbc_log, patient='Hypertension',
-                 strong_branching=False, prob_type='generate'):
+                 strong_branching=False, prob_type='generate', warm_start=False):
         super(RegenerateManager, self).__init__(
             cognito_id=cognito_id,
             event=event,
@@ -274,7 +388,8 @@ class RegenerateManager(ModelManager):
             time_out=time_out,
             cbc_log=cbc_log,
             patient=patient,
-            strong_branching=strong_branching
+            strong_branching=strong_branching,
+            warm_start=warm_start
         )
 
     def set_meal_by_cat(self, container_key):
@@ -341,6 +456,19 @@ class RegenerateManager(ModelManager):
                 )
             }
             self.meals[container_key].append(item)
+
+        self.alternativeMeals = self._get_alternative_meals(container_key=container_key)
+        candidates = set(meal_key for item in self.meals[container_key] for meal_key in item['meals'])
+        missing = sorted(set(meal_key for meal_keys in self.alternativeMeals for meal_key in meal_keys) - candidates)
+        if missing:
+            self.meals[container_key].append({
+                'preference': 'optional',
+                'meals': self.get_meals(
+                    num=len(missing),
+                    conditions=[mealdescription.c.MEAL_ID.in_(missing)],
+                    container_key=container_key
+                )
+            })
         print self.element
         if self.event['body-json'].get('meal_key'):
             self.modeller.set_meals(
@@ -437,7 +565,9 @@ class RegenerateManager(ModelManager):
         self.modeller = Modeller(
             model=self.problem,
             days=[self.event['body-json'][c.DATE]],
-            bounds=self.bounds
+            bounds=self.bounds,
+            vectorized=True,
+            cache=model_cache
         )
         print 'addWeek'
         print self.addWeek
@@ -468,14 +598,19 @@ class RegenerateManager(ModelManager):
             add_day=self.addDay,
             add_week=self.addWeek
         )
-        self.problem.solve(
-            solver=pulp.PULP_CBC_CMD(
-                maxSeconds=self.timeOut,
-                msg=self.cbcLog,
-                presolve=False,
-                strong=False
+        if not self._serve_alternative():
+            # the model has no objective, cbc would return the replaced meals as they are
+            self._exclude_current()
+            # cbc in process, the pool of cbc workers if libCbcSolver is not there
+            self._solve(
+                solver=pulp.CBC_DLL.fromSolver(pulp.PULP_CBC_WORKER(
+                    maxSeconds=self.timeOut,
+                    msg=self.cbcLog,
+                    presolve=False,
+                    strong=False,
+                    warmStart=self.warmStart
+                ))
             )
-        )
         if pulp.LpStatus[self.problem.status] == 'Optimal':
             evaluator = Evaluator(
                 model=self.problem,
@@ -513,10 +648,75 @@ class RegenerateManager(ModelManager):
     def _set_splitted_macro_bounds(self):
         self.splitted_macro_bounds = self.splittedNeeds
 
+    def _get_alternative_meals(self, container_key):
+        """Returns the meals of the alternative plans stored by generate for the
+        regenerated container (or single meals if a meal_key is given) that differ
+        from the stored plan.
+
+        :param container_key: BF, LU, DI, SN
+        :return: list of lists of meal keys
+        """
+        date = self.event['body-json'][c.DATE]
+        try:
+            day_plans = self.userNutritionStore.get_from_nutrients_for_day(
+                unique_id=self.cognitoId,
+                date=date,
+                top_level=c.ALTERNATIVES
+            )
+        except (KeyError, ValueError):
+            return []
+        current = self._get_stored_plan(days=[date]).get(date, {}).get(container_key, [])
+        alternative_meals = []
+        for day_plan in day_plans:
+            meal_keys = sorted(day_plan.get(container_key, []))
+            if self.event['body-json'].get('meal_key'):
+                candidates = [[meal_key] for meal_key in meal_keys if meal_key not in current]
+            else:
+                candidates = [meal_keys] if meal_keys and set(meal_keys) != set(current) else []
+            alternative_meals += [meal_keys for meal_keys in candidates if meal_keys not in alternative_meals]
+        return alternative_meals
+
+    def _serve_alternative(self):
+        """Takes the first alternative meals (see _get_alternative_meals) that
+        satisfy all constraints of the model as solution, so no solve is needed.
+
+        :return: True if an alternative was taken
+        """
+        date = self.event['body-json'][c.DATE]
+        container_key = self.event['body-json']['container_key']
+        model = self.modeller.compile()
+        for meal_keys in self.alternativeMeals:
+            x = self.modeller.plan_vector(model, {date: {container_key: meal_keys}})
+            if x is not None and model.violation(x) <= 1e-6:
+                model.solution = x
+                model.status = pulp.LpStatusOptimal
+                model.assign_solution()
+                self.problem.status = pulp.LpStatusOptimal
+                self.problem.solutionTime = 0.0
+                print 'alternative taken: {}'.format(meal_keys)
+                return True
+        return False
+
+    def _exclude_current(self):
+        """Takes the regenerated meal out of the candidates if a meal_key is given,
+        otherwise forbids the stored meals of the container as a whole, so that
+        the solution differs from what is replaced.
+
+        :return: None
+        """
+        date = self.event['body-json'][c.DATE]
+        container_key = self.event['body-json']['container_key']
+        if self.event['body-json'].get('meal_key'):
+            self.modeller.remove_meals(container_key, [self.event['body-json']['meal_key']])
+        else:
+            stored_plan = self._get_stored_plan(days=[date])
+            self.modeller.exclude_plan({date: {container_key: stored_plan.get(date, {}).get(container_key, [])}})
+
 
 class GenerateManager(ModelManager):
     def __init__(self, cognito_id, event, time_out, cbc_log, patient='Hypertension',
-                 strong_branching=True, prob_type='generate'):
+                 strong_branching=True, prob_type='generate', warm_start=False, symmetry=None,
+                 engine='cbc', evo_seconds=0, pool_size=1, sos=False):
         super(GenerateManager, self).__init__(
             cognito_id=cognito_id,
             event=event,
@@ -524,8 +724,16 @@ class GenerateManager(ModelManager):
             time_out=time_out,
             cbc_log=cbc_log,
             patient=patient,
-            strong_branching=strong_branching
+            strong_branching=strong_branching,
+            warm_start=warm_start,
+            engine=engine,
+            evo_seconds=evo_seconds,
+            pool_size=pool_size
         )
+        # None | 'GCAL' | 'index', see Modeller._set_symmetry_breaking
+        self.symmetry = symmetry
+        # SOS1 sets for the obligatory meals, see Modeller
+        self.sos = sos
 
 
     def __enter__(self):
@@ -560,7 +768,12 @@ class GenerateManager(ModelManager):
         self.modeller = Modeller(
             model=self.problem,
             days=days,
-            bounds=self.actualPatient.micro_bounds)
+            bounds=self.actualPatient.micro_bounds,
+            vectorized=True,
+            cache=model_cache,
+            symmetry=self.symmetry,
+            sos=self.sos,
+            lazy_names=True)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -582,14 +795,18 @@ class GenerateManager(ModelManager):
         print exc_tb
         traceback.print_exc()
         self.modeller.set_global(needs=self.actualPatient.macro_bounds)
+        if self.warmStart:
+            # re-planning an existing week, the stored plan is the MIP start
+            self.modeller.set_start(self._get_stored_plan(days=self.modeller.days))
 
         print 'start solving'
-        self.problem.solve(
+        self._solve(
             solver=pulp.PULP_CBC_CMD(
                 maxSeconds=self.timeOut,
                 msg=self.cbcLog,
                 presolve=False,
-                strong=self.strongBranching
+                strong=self.strongBranching,
+                warmStart=self.warmStart
             )
         )
 
@@ -623,6 +840,12 @@ class GenerateManager(ModelManager):
                 unique_id=cognito_id,
                 shoppinglist=self.nutrients.shopping_list
             )
+            alternatives = self._alternatives_by_day()
+            if alternatives:
+                self.userNutritionStore.write_alternatives(
+                    unique_id=cognito_id,
+                    alternatives=alternatives
+                )
         else:
             print self.problem.fixObjective
             print pulp.LpStatus[self.problem.status]
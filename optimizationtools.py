@@ -11,11 +11,20 @@ store the results in a proper data structure.
 @author: L.We
 """
 
-import array
 import collections
+import copy
 import fractions
+import hashlib
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import os
 import pprint
+import Queue
+import re
+import threading
+import time
 
+import numpy as np
 import pulp
 from sqlalchemy.sql.expression import select
 
@@ -45,6 +54,9 @@ class StandardConstraint(object):
         lb=value and/or ub=value:
             --> upper and/or lower bound constraint, actual values for ub and lb
                 are set for lower and upper bounds.
+
+        Rows with both bounds are created as one ranged row (MPS RANGES)
+        named _RNG or _EQ_RNG instead of an _UB and an _LB row.
         """
         self.name = name
         self.sum = sum
@@ -55,27 +67,61 @@ class StandardConstraint(object):
         self.constraintDict = {}
         self._create_constraints()
 
+    def _expression(self):
+        """Returns self.sum as pulp.LpAffineExpression. Sums that are
+        already built as an expression (vectorized Modeller) are used as is.
+        """
+        if isinstance(self.sum, pulp.LpAffineExpression):
+            return self.sum
+        return pulp.lpSum(self.sum)
+
+    def _ranged(self, suffix, lb, ub):
+        """Adds lb <= sum <= ub as a single ranged row, returns False if the
+        bounds contradict each other and are left to two separate rows.
+        """
+        if lb > ub:
+            return False
+        constraint = self._expression() >= lb
+        constraint.rhsRange = ub - lb
+        self.constraintDict.update({self.name + suffix: constraint})
+        return True
+
     def _create_constraints(self):
+        if self.ub and self.lb:
+            if self.eq:
+                if self._ranged('_EQ_RNG', (1 - self.tol) * self.eq, (1 + self.tol) * self.eq):
+                    return
+            elif self._ranged('_RNG', self.lb, self.ub):
+                return
+
         if self.ub and self.eq:
-            self.constraintDict.update({self.name + '_EQ_UB': (pulp.lpSum(self.sum) <= (1 + self.tol) * self.eq)})
+            self.constraintDict.update({self.name + '_EQ_UB': (self._expression() <= (1 + self.tol) * self.eq)})
         if (self.lb and self.eq):
-            self.constraintDict.update({self.name + '_EQ_LB': pulp.lpSum(self.sum) >= (1 - self.tol) * self.eq})
+            self.constraintDict.update({self.name + '_EQ_LB': self._expression() >= (1 - self.tol) * self.eq})
 
         if (self.eq and not (self.ub or self.lb)):
-            self.constraintDict.update({self.name + '_EQ': pulp.lpSum(self.sum) == self.eq})
+            self.constraintDict.update({self.name + '_EQ': self._expression() == self.eq})
 
         if (self.ub and not self.eq):
-            self.constraintDict.update({self.name + '_UB': pulp.lpSum(self.sum) <= self.ub})
+            self.constraintDict.update({self.name + '_UB': self._expression() <= self.ub})
 
         if (self.lb and not self.eq):
-            self.constraintDict.update({self.name + '_LB': pulp.lpSum(self.sum) >= self.lb})
+            self.constraintDict.update({self.name + '_LB': self._expression() >= self.lb})
 
     def add_to_model(self, model):
         """
         :param model: pulp.LpProblem instance
         """
-        for name, const in self.constraintDict.iteritems():
-            model.addConstraint(const, name)
+        model.addConstraints(self.constraintDict)
+
+    @staticmethod
+    def rows(constraints):
+        """Returns the (name, pulp.LpConstraint) of all 'constraints' for
+        pulp.LpProblem.addConstraints
+
+        :param constraints: iterable of StandardConstraints
+        """
+        return [row for constraint in constraints for row in constraint.constraintDict.iteritems()]
 
 
 class Modeller(object):
@@ -94,7 +140,8 @@ class Modeller(object):
     """
 
     def __init__(self, model, days, bounds, nutrientMicroList=params.nutrientList - params.nutrientsMacroList,
-                 nutrientMacroList=params.nutrientsMacroList, tol=params.tol):
+                 nutrientMacroList=params.nutrientsMacroList, tol=params.tol, vectorized=False, cache=None,
+                 symmetry=None, sos=False, lazy_names=False):
         """
 
         :param model: instance of pulp.LpProblem
@@ -102,21 +149,38 @@ class Modeller(object):
         :param bounds: dict of ub and lb for each nutrition
         :param nutrientMicroList: list of micro nutrients
         :param nutrientMacroList: list of macro nutrients
+        :param vectorized: True | False, builds all nutrient sums from a meal x nutrient
+                           matrix instead of lists of coef * variable products
+        :param cache: ModelCache, compiled models are reused for the same candidate meals
+                      and number of days, only the right hand sides are patched. Requires
+                      vectorized, set_meals is then to be called only once.
+        :param symmetry: None | 'GCAL' | 'index', breaks the symmetry of interchangeable days
+                         in set_global by ordering the days by their calories or by a weighted
+                         sum of the indices of their meals, see _set_symmetry_breaking
+        :param sos: True | False, declares the obligatory meals of each day and obligatory item
+                    of a container as SOS1 set (weighted by GCAL), so that cbc branches on the
+                    whole set. At most one of them is chosen, together with the OBLIGATORY row
+                    exactly one
+        :param lazy_names: True | False, variables are created without a name string and are
+                           identified by their column index only, the names (day_container_key)
+                           are built by pulp.LpNames when a name is read, e.g. by writeLP
 
         :parameter _tree: nested default-dict so that any sub-dict contains a dict as default.
-                    variable, counter, offset, crossSum, crossCounter use this data format
-        :parameter variable: actual variable for food
-        :parameter counter: binary that is:
-                            0 if variable = 0 and
-                            1 if variable > 0
-        :parameter offset: corresponds to variable - lb, is used to realize non-convex solution spaces for variable,
-                           i.e. including 0 so that {x | x = 0 ∨ lb ≤ x ≤ ub}
+                    variable, crossSum, crossCounter use this data format
+        :parameter variable: actual variable for food, semicontinuous for non-convex solution spaces
+                             {x | x = 0 ∨ lb ≤ x ≤ ub}
         :parameter crossCounter: binary that is:
                                  0 if a certain food does not occur in whole week plan and
                                  1 if a certain food does occur at least once
         :parameter crossSum: sum of all crossCounter
         :parameter sumGlobal: dict with lists of all variable * nutrient for each nutrient,
                               these lists get updated every time meals are added to the model
+        :parameter nutrients: sorted list of nutrients, column order of nutrientMatrix
+        :parameter mealKeys: dict of sorted meal keys for each container, row order of nutrientMatrix
+        :parameter nutrientMatrix: dict of numpy arrays (meal x nutrient) for each container,
+                                   only used if vectorized
+        :parameter boundRows: dict of (right hand side, range) for all nutrient bound constraints,
+                              only used if vectorized
         """
         self.model = model
         if not isinstance(days, collections.Iterable):
@@ -129,13 +193,31 @@ class Modeller(object):
         self.tol = tol
         self._tree = lambda: collections.defaultdict(self._tree)
         self.variable = self._tree()
-        self.counter = self._tree()
-        self.offset = self._tree()
         self.crossSum = self._tree()
         self.crossCounter = self._tree()
         self.sumGlobal = {}
         self.all_meals = self._tree()
-        self.all_meals_evo = self._tree()
+        self.vectorized = vectorized
+        self.nutrients = sorted(self.nutrientList)
+        self.mealKeys = {}
+        self.nutrientMatrix = {}
+        self.boundRows = collections.OrderedDict()
+        if cache is not None and not vectorized:
+            raise ValueError('cache can only be used with a vectorized Modeller')
+        if symmetry not in (None, 'GCAL', 'index'):
+            raise ValueError('unknown symmetry: {}'.format(symmetry))
+        self.symmetry = symmetry
+        self.sos = sos
+        self.cache = cache
+        self.cacheKey = None
+        self.symmetryWeights = None
+        # (container_key, meal_key) -> index of the obligatory item of the container, see _obligatory_name
+        self.obligatoryItems = {}
+        self._rhsOnly = False
+        self._deferred = None
+        self._compiled = None
+        self._global = False
+        self._names = pulp.LpNames(self._variable_names) if lazy_names else None
 
     def _join(self, *names):
         """Joins names with underscores for constraint
@@ -143,60 +225,47 @@ class Modeller(object):
         """
         return '_'.join(names)
 
-    def _set_variables(self, foods, cat):
-        """Sets standard variables for all "foods" in "cat"."""
-        for day in self.days:
-            for key, value in foods.iteritems():
-                self.variable[day][cat][key] = pulp.LpVariable(
-                    name=self._join(day, cat, key),
-                    lowBound=0,
-                    upBound=value[c.UB] / value[c.LB],
-                    cat=pulp.LpInteger if value[c.INT] else pulp.LpContinuous
-                )
-
-    def _set_counter(self, foods, cat):
-        """Sets binary counter variables for all "foods" in "cat". The counter (LpInteger) is forced to be 0 if variable = 0
-        and 1 if variable > 0 due to the following constraints:
-
-            C1: 0 ≤ counter ≤ 1
-            C2: variable ≤ counter * ub
-            C3: counter * lb ≤ variable
+    def _variable_name(self, *names):
+        """Name for a new variable, with lazy_names the shared pulp.LpNames
+        that builds the joined names when they are needed
         """
-        for day in self.days:
-            for key, value in foods.iteritems():
-                self.counter[day][cat][key] = pulp.LpVariable(
-                    name=self._join(day, c.COUNT, cat, key),
-                    cat=pulp.LpBinary
-                )
-
-                counter_constraint1 = \
-                    self.counter[day][cat][key] * value[c.UB] / value[c.LB] >= self.variable[day][cat][key]
-                counter_constraint2 = \
-                    self.counter[day][cat][key] <= self.variable[day][cat][key]
-
-                self.model.addConstraint(counter_constraint1)
-                self.model.addConstraint(counter_constraint2)
+        if self._names is not None:
+            return self._names
+        return self._join(*names)
 
-    def _set_offset(self, foods, cat):
-        """Sets offset variables for all "foods" in "cat". With offset (LpContinuous) and counter, variable has a
-        non-convex solution space i.e. {variable | variable = 0 ∨ lb ≤ variable ≤ ub}. This is obtained
-        by the following constraints:
+    def _variable_names(self):
+        """Yields (variable, name) for all variables of the Modeller as they
+        are named without lazy_names
+        """
+        for day, day_plan in self.variable.iteritems():
+            for container_key, container in day_plan.iteritems():
+                for key, variable in container.iteritems():
+                    yield variable, self._join(day, container_key, key)
+        for key, variable in self.crossCounter.iteritems():
+            yield variable, self._join('CROSS_COUNTER', key)
 
-            C1: 0 ≤ offset ≤ ub - lb
-            C2: offset + lb * counter == variable
+    def _set_variables(self, foods, cat):
+        """Sets standard variables for all "foods" in "cat". A food is either not
+        in the plan or within its bounds, i.e. {variable | variable = 0 ∨ lb ≤ variable ≤ ub}
+        (scaled by lb). This non-convex solution space is a single semicontinuous
+        column, integer foods already satisfy it with 0 ≤ variable ≤ ub.
         """
         for day in self.days:
             for key, value in foods.iteritems():
-                if not value[c.INT]:
-                    self.offset[day][cat][key] = pulp.LpVariable(
-                        name=self._join(day, c.OFFSET, cat, key),
+                if value[c.INT]:
+                    self.variable[day][cat][key] = pulp.LpVariable(
+                        name=self._variable_name(day, cat, key),
                         lowBound=0,
-                        upBound=value[c.UB] / value[c.LB] - 1,
-                        cat=pulp.LpContinuous
+                        upBound=value[c.UB] / value[c.LB],
+                        cat=pulp.LpInteger
+                    )
+                else:
+                    self.variable[day][cat][key] = pulp.LpVariable(
+                        name=self._variable_name(day, cat, key),
+                        lowBound=1,
+                        upBound=value[c.UB] / value[c.LB],
+                        cat=pulp.LpSemiContinuous
                     )
-                    offset_constraint = \
-                        self.variable[day][cat][key] == self.offset[day][cat][key] + self.counter[day][cat][key]
-                    self.model.addConstraint(offset_constraint)
 
     def _set_local_and_global_sum_for_container(self, container_content, needs, container_key,
                                                 add_meal=None, local_nut=None):
@@ -211,6 +280,14 @@ class Modeller(object):
         :param local_nut: nutrition that is to be considered for local constraint
         :param is_meal: boolean, is True when recipe
         """
+        if self.vectorized:
+            return self._set_local_and_global_matrix_for_container(
+                container_content=container_content,
+                needs=needs,
+                container_key=container_key,
+                add_meal=add_meal
+            )
+
         self.all_meals[container_key] = {}
         local_nut = 'GCAL'
 
@@ -218,13 +295,15 @@ class Modeller(object):
             self.all_meals[container_key].update(item['meals'])
 
         for day in self.days:
+            meal_keys = list(self.variable[day][container_key])
+            variables = [self.variable[day][container_key][meal_key] for meal_key in meal_keys]
             for n in self.nutrientList:
-                current_sum_for_nutrient = []
-                for meal_key, variable in self.variable[day][container_key].iteritems():
-                    sum_local = None
-                    current_sum_for_nutrient.append(self.all_meals[container_key][meal_key][n] * variable)
-                if n == local_nut:
-                    sum_local = current_sum_for_nutrient + ([add_meal[n]['VAL']] if add_meal else [])
+                sum_local = None
+                current_sum_for_nutrient = pulp.LpArrayExpression(
+                    variables, [self.all_meals[container_key][meal_key][n] for meal_key in meal_keys]
+                )
+                if n == local_nut and (variables or add_meal):
+                    sum_local = [current_sum_for_nutrient] + ([add_meal[n]['VAL']] if add_meal else [])
 
                 self.sumGlobal.setdefault(day, {}).setdefault(n, []).append(current_sum_for_nutrient)
 
@@ -239,6 +318,114 @@ class Modeller(object):
 
                         constraint.add_to_model(model=self.model)
 
+    def _set_local_and_global_matrix_for_container(self, container_content, needs, container_key,
+                                                   add_meal=None):
+        """Vectorized counterpart of _set_local_and_global_sum_for_container. Stores the
+        nutrients of all meals in 'container_key' as a meal x nutrient matrix (rows ordered
+        by mealKeys) and adds the local GCAL constraint for each day to the model. The global
+        sums are built from these matrices in set_global.
+
+        :param container_content: dict of foods come from Database (SQL Server)
+        :param needs: dict of needs come from PatientClass
+        :param container_key: cat in ['SM', 'SW', ...]
+        :param add_meal: dict of constants for each nutrition that is added to the constraints
+                         comes from user data from DDB.
+        """
+        self.all_meals[container_key] = {}
+        local_nut = 'GCAL'
+
+        for item in container_content:
+            self.all_meals[container_key].update(item['meals'])
+
+        meal_keys = sorted(self.all_meals[container_key])
+        self.mealKeys[container_key] = meal_keys
+        self.nutrientMatrix[container_key] = np.array(
+            [[self.all_meals[container_key][meal_key][n] for n in self.nutrients] for meal_key in meal_keys],
+            dtype=float
+        ).reshape(len(meal_keys), len(self.nutrients))
+
+        if not needs.get(container_key) or not (meal_keys or add_meal):
+            return
+
+        local_row = self.nutrientMatrix[container_key][:, self.nutrients.index(local_nut)]
+        constraints = []
+        for day in self.days:
+            variables = [self.variable[day][container_key][meal_key] for meal_key in meal_keys]
+            constraints.append(StandardConstraint(
+                name=self._join(day, container_key, local_nut),
+                sum=self._row_expression(variables, local_row, add_meal[local_nut]['VAL'] if add_meal else 0),
+                ub=needs[container_key][local_nut][c.UB],
+                lb=needs[container_key][local_nut][c.LB]
+            ))
+        self._add_bound_constraints(constraints)
+
+    def _add_bound_constraints(self, constraints):
+        """Records the right hand sides and ranges of nutrient bound constraints in boundRows
+        and adds them to the model in one batch. In the right hand side only pass
+        of a cached model (_rhsOnly) nothing is added to the model.
+
+        :param constraints: list of StandardConstraints
+        """
+        rows = StandardConstraint.rows(constraints)
+        for name, const in rows:
+            self.boundRows[name] = (-const.constant, const.rhsRange or 0)
+        if not self._rhsOnly:
+            self.model.addConstraints(rows)
+
+    def _row_expression(self, variables, row, constant=0):
+        """Returns the expression Σ row_j * variables_j + constant, built in bulk
+        from the buffers. Zero coefficients are dropped just as pulp drops them
+        for 0 * variable. In the right hand side only pass the expression is
+        just the constant.
+
+        :param variables: list of pulp.LpVariables
+        :param row: numpy array, one coefficient for each variable
+        :param constant: number
+        :return: pulp.LpAffineExpression
+        """
+        if self._rhsOnly:
+            return pulp.LpAffineExpression(constant=constant)
+        return pulp.LpArrayExpression(variables, row, constant=constant)
+
+    def _set_global_matrix(self, needs, add_day=None, add_week=None):
+        """Vectorized counterpart of set_global. The day matrix stacks the nutrient
+        matrices of all containers, the week matrix repeats it for every day. All
+        daily and weekly nutrient rows are then taken from these two matrices at once.
+        """
+        containers = sorted(self.nutrientMatrix)
+        day_matrix = np.vstack(
+            [self.nutrientMatrix[container_key] for container_key in containers] +
+            [np.zeros((0, len(self.nutrients)))]
+        )
+        day_variables = {
+            day: ([] if self._rhsOnly else
+                  [self.variable[day][container_key][meal_key]
+                   for container_key in containers for meal_key in self.mealKeys[container_key]])
+            for day in self.days
+        }
+
+        constraints = []
+        for day in self.days:
+            for n in self.nutrientMacroList:
+                constraints.append(StandardConstraint(
+                    name=self._join(day, 'GLOB', n),
+                    sum=self._row_expression(day_variables[day], day_matrix[:, self.nutrients.index(n)],
+                                             add_day[n] if add_day else 0),
+                    ub=needs[n][c.UB],
+                    lb=needs[n][c.LB]
+                ))
+
+        week_variables = [variable for day in self.days for variable in day_variables[day]]
+        for n in self.nutrientList - self.nutrientMacroList:
+            week_row = np.tile(day_matrix[:, self.nutrients.index(n)], len(self.days))
+            constraints.append(StandardConstraint(
+                name=self._join('TOT', 'GLOB', n),
+                sum=self._row_expression(week_variables, week_row, add_week[n] if add_week else 0),
+                ub=self.bounds[n][c.UB],
+                lb=self.bounds[n][c.LB]
+            ))
+        self._add_bound_constraints(constraints)
+
     def set_global(self, needs, add_day=None, add_week=None):
         """Sets the constraints for all nutrients for the whole week. This function is to be
         called after all meal types are set
@@ -249,36 +436,495 @@ class Modeller(object):
         :param add_week: dict of constant nutrient values for each nutrition that is added to
                          the constraints, comes from user data from DDB nutrientsForDay
         """
+        self._global = True
+        if self._deferred is not None:
+            deferred, self._deferred = self._deferred, None
+            if self._load_skeleton(deferred, needs=needs, add_day=add_day, add_week=add_week):
+                return
+            self._set_meals(**deferred)
+
+        if self.vectorized:
+            self._set_global_matrix(needs=needs, add_day=add_day, add_week=add_week)
+            return self._set_symmetry_breaking()
+
         # elasticNutrients = ['GCAL', 'ZE', 'ZF', 'ZK']
+        constraints = []
         for day in self.days:
             for n in self.nutrientMacroList:
                 # if n in elasticNutrients:
-                day_constraint = StandardConstraint(
+                constraints.append(StandardConstraint(
                     name=self._join(day, 'GLOB', n),
                     sum=self.sumGlobal[day][n] + ([add_day[n]] if add_day else []),
                     ub=needs[n][c.UB],
                     lb=needs[n][c.LB]
-                )
-                day_constraint.add_to_model(model=self.model)
+                ))
 
         for n in self.nutrientList - self.nutrientMacroList:
-            week_constraint = StandardConstraint(
+            constraints.append(StandardConstraint(
                 name=self._join('TOT', 'GLOB', n),
                 sum=[self.sumGlobal[day][n] for day in self.days] + ([add_week[n]] if add_week else []),
                 ub=self.bounds[n][c.UB],
                 lb=self.bounds[n][c.LB]
+            ))
+
+        self.model.addConstraints(StandardConstraint.rows(constraints))
+
+        self._set_symmetry_breaking()
+
+    def _set_symmetry_breaking(self):
+        """Orders the days if self.symmetry is set. All days have the same candidates,
+        bounds and constants (add_meal, add_day), so every plan can be permuted into a plan
+        with non-increasing order values and cbc does not need to explore the
+        permutations of a week:
+
+            C_d: Σ w_meal * variable_d,meal ≥ Σ w_meal * variable_d+1,meal
+
+        with w_meal = GCAL of the meal ('GCAL') or the position of the meal in the
+        sorted (container_key, meal_key) list + 1 ('index'). A stored plan used
+        as MIP start (set_start) is usually not ordered and rejected by cbc.
+        """
+        if not self.symmetry:
+            return
+        symmetry_weights = self._symmetry_weights()
+        keys = sorted(symmetry_weights)
+        weights = [symmetry_weights[key] for key in keys]
+
+        rows = []
+        for day, next_day in zip(self.days, self.days[1:]):
+            order = pulp.LpAffineExpression(
+                [(self.variable[day][ck][mk], w) for (ck, mk), w in zip(keys, weights) if w] +
+                [(self.variable[next_day][ck][mk], -w) for (ck, mk), w in zip(keys, weights) if w]
+            )
+            rows.append((self._join(day, 'SYM'), order >= 0))
+        self.model.addConstraints(rows)
+
+    def _symmetry_weights(self):
+        """Returns {(container_key, meal_key): weight} for _set_symmetry_breaking"""
+        if self.symmetryWeights is None:
+            keys = sorted(
+                (container_key, meal_key)
+                for container_key, container in self.variable[self.days[0]].iteritems()
+                for meal_key in container
             )
+            if self.symmetry == 'GCAL':
+                weights = [self.all_meals[container_key][meal_key]['GCAL'] for container_key, meal_key in keys]
+            else:
+                weights = range(1, len(keys) + 1)
+            self.symmetryWeights = dict(zip(keys, weights))
+        return self.symmetryWeights
 
-            week_constraint.add_to_model(model=self.model)
+    def compile(self):
+        """Compiles the model into column-major sparse arrays, to be
+        called after set_global. With a cache the compiled model is either
+        taken from the cache or stored in it.
 
-    def set_cross_counter_and_constraint(self, lb, ub):
+        :return: SparseModel
+        """
+        if self._compiled is None:
+            self._compiled = SparseModel.from_problem(self.model)
+            if self.cache is not None and self.cacheKey is not None:
+                self._store_skeleton(self._compiled)
+        return self._compiled
+
+    def _cache_key(self, meals):
+        """Key of the model structure: nutrients, number of days, symmetry, sos,
+        the candidate meals with their preference for each container and a
+        fingerprint of their nutrient values, which are the coefficients of
+        the cached model.
+        """
+        candidates = tuple(sorted(
+            (container_key, tuple((item['preference'], tuple(sorted(item['meals']))) for item in content))
+            for container_key, content in meals.iteritems()
+        ))
+        values = np.array(
+            [meals_by_key[meal_key][n]
+             for container_key, content in sorted(meals.iteritems())
+             for meals_by_key in (item['meals'] for item in content)
+             for meal_key in sorted(meals_by_key)
+             for n in self.nutrients],
+            dtype=float
+        )
+        return (
+            tuple(self.nutrients),
+            len(self.days),
+            self.symmetry,
+            self.sos,
+            candidates,
+            hashlib.sha1(values.tostring()).hexdigest()
+        )
+
+    def _neutral(self, name):
+        """Replaces the date at the beginning of a row or column name by
+        the position of the day, e.g. 2018-01-30_GLOB_ZF_UB --> D0_GLOB_ZF_UB.
+        pulp replaces '-' in names by '_', both spellings are accepted.
+        """
+        for i, day in enumerate(self.days):
+            for prefix in (day + '_', self._pulp_name(day) + '_'):
+                if name.startswith(prefix):
+                    return 'D%d_%s' % (i, name[len(prefix):])
+        return name
+
+    def _actual(self, name):
+        """Inverse of _neutral for the days of this Modeller, in pulp spelling"""
+        match = re.match(r'D(\d+)_', name)
+        if match:
+            return self._pulp_name(self.days[int(match.group(1))]) + name[match.end() - 1:]
+        return name
+
+    @staticmethod
+    def _pulp_name(name):
+        return str(name).translate(pulp.LpAffineExpression.trans)
+
+    def _store_skeleton(self, model):
+        """Stores the structure of a compiled model in the cache. Only models
+        made of meal variables (set_meals) are cached.
+
+        :param model: SparseModel
+        """
+        layout = {}
+        for i, day in enumerate(self.days):
+            for container_key, container in self.variable[day].iteritems():
+                for meal_key, variable in container.iteritems():
+                    layout[variable] = (i, container_key, meal_key)
+        if any(variable not in layout for variable in model.columns):
+            return
+        self.cache.put(self.cacheKey, Skeleton(
+            # without columns and problem, so that no pulp objects are kept alive
+            model=model.patched(columns=None, rows=None, rhs=model.rhs, sos1=collections.OrderedDict(
+                (self._neutral(name), members) for name, members in model.sos1.iteritems())),
+            layout=[layout[variable] for variable in model.columns],
+            rows=[self._neutral(name) for name in model.rows],
+            bound_rows=frozenset(self._neutral(name) for name in self.boundRows)
+        ))
+
+    def _load_skeleton(self, deferred, needs, add_day, add_week):
+        """Loads a compiled model from the cache and patches its right hand
+        sides and ranges, which are computed by a pass over all nutrient bound constraints
+        without building any expression.
+
+        :param deferred: dict of the arguments of set_meals
+        :return: True if the model was loaded, False if it has to be built
+        """
+        skeleton = self.cache.get(self.cacheKey)
+        if skeleton is None:
+            return False
+
+        self._rhsOnly = True
+        self.boundRows = collections.OrderedDict()
+        try:
+            self._set_containers(**deferred)
+            self._set_global_matrix(needs=needs, add_day=add_day, add_week=add_week)
+        finally:
+            self._rhsOnly = False
+        if frozenset(self._neutral(name) for name in self.boundRows) != skeleton.bound_rows:
+            self.boundRows = collections.OrderedDict()
+            return False
+
+        columns = []
+        model = skeleton.model
+        for (i, container_key, meal_key), lb, ub, integer in zip(
+                skeleton.layout, model.lower.tolist(), model.upper.tolist(), model.integer.tolist()):
+            variable = pulp.LpVariable(
+                name=self._variable_name(self.days[i], container_key, meal_key),
+                lowBound=lb if lb != -np.inf else None,
+                upBound=ub if ub != np.inf else None,
+                cat=pulp.LpInteger if integer else pulp.LpContinuous
+            )
+            self.variable[self.days[i]][container_key][meal_key] = variable
+            columns.append(variable)
+
+        rhs = model.rhs.copy()
+        ranges = model.ranges.copy()
+        row_index = dict((name, i) for i, name in enumerate(skeleton.rows))
+        for name, (value, row_range) in self.boundRows.iteritems():
+            rhs[row_index[self._neutral(name)]] = value
+            ranges[row_index[self._neutral(name)]] = row_range
+
+        self._compiled = model.patched(
+            columns=columns,
+            rows=[self._actual(name) for name in skeleton.rows],
+            rhs=rhs,
+            problem=self.model,
+            ranges=ranges,
+            sos1=collections.OrderedDict((self._actual(name), members) for name, members in model.sos1.iteritems())
+        )
+        return True
+
+    def day_blocks(self, model):
+        """Returns the day index of each column of a compiled model, -1 for
+        columns that do not belong to a single day (e.g. CrossCounter).
+
+        :param model: SparseModel of this Modeller
+        :return: numpy array
+        """
+        index = {}
+        for i, day in enumerate(self.days):
+            for container in self.variable.get(day, {}).itervalues():
+                for variable in container.itervalues():
+                    index[variable] = i
+        return np.array([index.get(variable, -1) for variable in model.columns], dtype=np.int64)
+
+    def _meal_layout(self):
+        """Returns {variable: (day, container_key, meal_key)} for all meal variables"""
+        layout = {}
+        for day in self.days:
+            for container_key, container in self.variable.get(day, {}).iteritems():
+                for meal_key, variable in container.iteritems():
+                    layout[variable] = (day, container_key, meal_key)
+        return layout
+
+    def plan(self, model, x):
+        """Returns the meals of a solution of a compiled model.
+
+        :param model: SparseModel of this Modeller (also presolved)
+        :param x: numpy array with a value for each column of model
+        :return: dict, {day: {container_key: [meal_key, ...]}}
+        """
+        layout = self._meal_layout()
+        plan = self._tree()
+        for variable, val in zip(model.columns, x.tolist()) + model.fixed:
+            if val > 0.5 and variable in layout:
+                day, container_key, meal_key = layout[variable]
+                plan[day].setdefault(container_key, []).append(meal_key)
+        return {day: dict(day_plan) for day, day_plan in plan.iteritems()}
+
+    def plan_vector(self, model, plan):
+        """Inverse of plan, all meal variables that are not in plan are 0.
+
+        :param model: SparseModel of this Modeller
+        :param plan: dict, {day: {container_key: iterable of meal keys}}
+        :return: numpy array with a value for each column of model, None if a meal
+                 of plan is not a candidate
+        """
+        index = dict((variable, j) for j, variable in enumerate(model.columns))
+        x = np.zeros(len(model.columns))
+        for day, day_plan in plan.iteritems():
+            for container_key, meal_keys in day_plan.iteritems():
+                for meal_key in meal_keys:
+                    variable = self.variable.get(day, {}).get(container_key, {}).get(meal_key)
+                    if variable not in index:
+                        return None
+                    x[index[variable]] = 1
+        return x
+
+    def _meal_rows(self, day, container_key, meal_key, preference):
+        """Returns (row base name, coefficient) of all rows the variable of a meal
+        is in. The names are completed by _row_names."""
+        meal = self.all_meals[container_key][meal_key]
+        rows = [(self._join(day, container_key, 'GCAL'), meal['GCAL'])]
+        if preference == 'obligatory':
+            item = self.obligatoryItems.get((container_key, meal_key), 0)
+            rows.append((self._obligatory_name(day, container_key, item), 1))
+        rows += [(self._join(day, 'GLOB', n), meal[n]) for n in self.nutrientMacroList]
+        rows += [(self._join('TOT', 'GLOB', n), meal[n]) for n in self.nutrientList - self.nutrientMacroList]
+        if self.symmetry:
+            weight = self._symmetry_weights()[container_key, meal_key]
+            i = self.days.index(day)
+            if i + 1 < len(self.days):
+                rows.append((self._join(day, 'SYM'), weight))
+            if i > 0:
+                rows.append((self._join(self.days[i - 1], 'SYM'), -weight))
+        return [(name, coef) for name, coef in rows if coef]
+
+    def _obligatory_name(self, day, container_key, item=0):
+        """Base name of the OBLIGATORY row of the item-th obligatory item of a
+        container, the first one has no index"""
+        if item:
+            return self._join(day, container_key, 'OBLIGATORY', str(item))
+        return self._join(day, container_key, 'OBLIGATORY')
+
+    def _sos_name(self, day, container_key, item=0):
+        """Name (pulp spelling) of the SOS1 set of the obligatory meals of an item"""
+        return self._pulp_name(self._obligatory_name(day, container_key, item))
+
+    def _row_names(self, base, existing):
+        """Names (pulp spelling) of the rows StandardConstraint made of 'base'"""
+        base = self._pulp_name(base)
+        return [base + suffix for suffix in ('', '_UB', '_LB', '_RNG', '_EQ', '_EQ_UB', '_EQ_LB', '_EQ_RNG')
+                if base + suffix in existing]
+
+    def add_meals(self, container_key, meals, preference='optional'):
+        """Adds candidate meals to a container of a complete model (after set_global)
+        in place. A variable is created for each day and added to all rows of its
+        container, day and week, in the LpProblem and in the compiled model (if
+        compiled), so the cost is proportional to the number of new meals.
+
+        :param container_key: BF, LU, DI, SN
+        :param meals: dict {meal_key: meal} of meals from Database, like 'meals' of set_meals
+        :param preference: 'optional' | 'obligatory'
+        :return: list of new variables
+        """
+        if not self._global:
+            raise RuntimeError('add_meals is to be called after set_global')
+        if self.crossCounter:
+            raise RuntimeError('add_meals does not support CrossCounter')
+        new_keys = sorted(set(meals) - set(self.all_meals[container_key]))
+        if not new_keys:
+            return []
+        self.cacheKey = None
+        self.all_meals[container_key].update((meal_key, meals[meal_key]) for meal_key in new_keys)
+        self._update_matrix(container_key)
+        if self.symmetry:
+            weights = self._symmetry_weights()
+            for meal_key in new_keys:
+                weights[container_key, meal_key] = meals[meal_key]['GCAL'] if self.symmetry == 'GCAL' \
+                    else max(weights.values() or [0]) + 1
+
+        compiled = self._compiled
+        row_index = dict((name, i) for i, name in enumerate(compiled.rows)) if compiled is not None else {}
+        sos1 = collections.OrderedDict(compiled.sos1) if compiled is not None else None
+        new_variables = []
+        new_entries = []
+        for day in self.days:
+            for meal_key in new_keys:
+                variable = pulp.LpVariable(name=self._variable_name(day, container_key, meal_key),
+                                           cat=pulp.LpBinary)
+                self.variable[day][container_key][meal_key] = variable
+                self.model.addVariable(variable)
+                entries = []
+                for base, coef in self._meal_rows(day, container_key, meal_key, preference):
+                    for name in self._row_names(base, self.model.constraints):
+                        self.model.constraints[name].addterm(variable, coef)
+                    entries += [(row_index[name], coef) for name in self._row_names(base, row_index)]
+                if self.sos and preference == 'obligatory':
+                    # new obligatory meals join the first obligatory item
+                    name, weight = self._sos_name(day, container_key), meals[meal_key]['GCAL']
+                    if name in self.model.sos1:
+                        self.model.sos1[name][variable] = weight
+                    if sos1 is not None:
+                        columns, weights = sos1.get(name, (np.zeros(0, dtype=np.int64), np.zeros(0)))
+                        sos1[name] = (np.append(columns, len(compiled.columns) + len(new_variables)),
+                                      np.append(weights, weight))
+                new_variables.append(variable)
+                new_entries.append(entries)
+        if compiled is not None:
+            self._compiled = compiled.with_columns(new_variables, new_entries, sos1=sos1)
+        return new_variables
+
+    def remove_meals(self, container_key, meal_keys):
+        """Removes candidate meals of a container from a complete model (after
+        set_global) in place. Their variables are taken out of all rows of the
+        LpProblem and fixed to 0 in the compiled model (presolve drops them).
+
+        :param container_key: BF, LU, DI, SN
+        :param meal_keys: iterable of meal keys
+        :return: list of removed variables
+        """
+        if not self._global:
+            raise RuntimeError('remove_meals is to be called after set_global')
+        if self.crossCounter:
+            raise RuntimeError('remove_meals does not support CrossCounter')
+        removed = []
+        for meal_key in meal_keys:
+            if meal_key not in self.all_meals[container_key]:
+                continue
+            for day in self.days:
+                variable = self.variable[day][container_key].pop(meal_key)
+                for base, _ in self._meal_rows(day, container_key, meal_key, 'obligatory'):
+                    for name in self._row_names(base, self.model.constraints):
+                        self.model.constraints[name].pop(variable, None)
+                if self.sos:
+                    name = self._sos_name(day, container_key, self.obligatoryItems.get((container_key, meal_key), 0))
+                    self.model.sos1.get(name, {}).pop(variable, None)
+                variable.lowBound = variable.upBound = 0
+                removed.append(variable)
+            if self.symmetry:
+                self._symmetry_weights().pop((container_key, meal_key))
+            self.obligatoryItems.pop((container_key, meal_key), None)
+            del self.all_meals[container_key][meal_key]
+        if not removed:
+            return []
+        self.cacheKey = None
+        self._update_matrix(container_key)
+        if self._compiled is not None:
+            self._compiled = self._compiled.with_bounds(removed, 0, 0)
+        return removed
+
+    def exclude_plan(self, plan):
+        """Forbids the meals of each container of plan as a whole (no-good row
+        Σ x ≤ len(meal keys) - 1), e.g. the stored container that is regenerated.
+        Single meals of it remain possible. To be called after set_global, the
+        compiled model is built again.
+
+        :param plan: dict, {day: {container_key: iterable of meal keys}}
+        :return: number of rows added
+        """
+        if not self._global:
+            raise RuntimeError('exclude_plan is to be called after set_global')
+        rows = []
+        for day, day_plan in sorted(plan.iteritems()):
+            for container_key, meal_keys in sorted(day_plan.iteritems()):
+                container = self.variable.get(day, {}).get(container_key, {})
+                meal_keys = set(meal_keys)
+                if not meal_keys or not meal_keys <= set(container):
+                    # a meal that is not a candidate cannot be chosen anyway
+                    continue
+                variables = [container[meal_key] for meal_key in sorted(meal_keys)]
+                rows.append((self._join(day, container_key, 'NOGOOD'),
+                             pulp.lpSum(variables) <= len(variables) - 1))
+        if rows:
+            self.model.addConstraints(rows)
+            self.cacheKey = None
+            self._compiled = None
+        return len(rows)
+
+    def _update_matrix(self, container_key):
+        meal_keys = sorted(self.all_meals[container_key])
+        self.mealKeys[container_key] = meal_keys
+        self.nutrientMatrix[container_key] = np.array(
+            [[self.all_meals[container_key][meal_key][n] for n in self.nutrients] for meal_key in meal_keys],
+            dtype=float
+        ).reshape(len(meal_keys), len(self.nutrients))
+
+    def set_start(self, plan):
+        """Sets the initial values of all meal variables from an existing plan,
+        1 for meals in the plan and 0 otherwise. These values are passed to cbc
+        as MIP start by a solver with warmStart=True. To be called after set_global.
+
+        :param plan: dict, {day: {container_key: iterable of meal keys}}, e.g.
+                     nutrients_for_meal from DDB. Days that are missing in plan
+                     and all other variables are not set.
+        :return: number of meal variables set to 1
+        """
+        # the values of an earlier solve are kept in varValue as well, they must
+        # not end up in the start (days missing in plan, CrossCounter, ...)
+        for variable in self.model.columns():
+            variable.varValue = None
+        chosen = 0
+        for day in self.days:
+            if day not in plan:
+                continue
+            for container_key, container in self.variable[day].iteritems():
+                planned = plan[day].get(container_key) or ()
+                for meal_key, variable in container.iteritems():
+                    variable.setInitialValue(1 if meal_key in planned else 0)
+                    chosen += meal_key in planned
+        return chosen
+
+    def set_cross_counter_and_constraint(self, lb, ub, formulation='bound'):
         """Sets CrossCounter variables and constraints. The constraint restricts the
         number of different foods that are included in the plan. This method is called
         once after all meals are added to the model.
 
+        CrossCounter is forced to be 1 if any variable of the food is > 0. Depending on
+        'formulation' this is done by:
+
+            'big_m':         crossCounter * 1e8 ≥ Σ variable
+            'bound':         crossCounter * Σ ub(variable) ≥ Σ variable
+            'disaggregated': crossCounter * ub(variable) ≥ variable, for each variable
+
+        All formulations have the same integer solutions, but the LP relaxation of
+        'big_m' is weak. 'big_m' is used for variables without upper bound.
+
         :param lb: lower bound for number of foods that are to be included in the plan
         :param ub: upper bound for number of foods that are to be included in the plan
+        :param formulation: 'big_m' | 'bound' | 'disaggregated'
         """
+        if formulation not in ('big_m', 'bound', 'disaggregated'):
+            raise ValueError('unknown formulation: {}'.format(formulation))
+        if self._compiled is not None:
+            raise RuntimeError('the model is already compiled (or loaded from the cache), '
+                               'CrossCounter has to be set before')
 
         ls_key = []
         ls_cat = []
@@ -293,6 +939,7 @@ class Modeller(object):
         set_key = set(ls_key)
         set_cat = set(ls_cat)
 
+        rows = []
         for key in set_key:
             self.crossSum[key] = []
             for cat in set_cat:
@@ -302,16 +949,26 @@ class Modeller(object):
                         self.crossSum[key].append(current_var)
 
             self.crossCounter[key] = pulp.LpVariable(
-                name=self._join('CROSS_COUNTER', key),
+                name=self._variable_name('CROSS_COUNTER', key),
                 cat=pulp.LpBinary
             )
-            counter_constraint1 = \
-                self.crossCounter[key] * 100000000.0 >= pulp.lpSum(self.crossSum[key])
+            bounded = all(var.upBound is not None for var in self.crossSum[key])
+            if formulation == 'disaggregated' and bounded:
+                for var in self.crossSum[key]:
+                    rows.append((None, self.crossCounter[key] * var.upBound >= var))
+            else:
+                if formulation == 'bound' and bounded:
+                    big_m = sum(var.upBound for var in self.crossSum[key])
+                else:
+                    big_m = 100000000.0
+                counter_constraint1 = \
+                    self.crossCounter[key] * big_m >= pulp.lpSum(self.crossSum[key])
+                rows.append((None, counter_constraint1))
             counter_constraint2 = \
                 self.crossCounter[key] <= pulp.lpSum(self.crossSum[key])
 
-            self.model.addConstraint(counter_constraint1)
-            self.model.addConstraint(counter_constraint2)
+            rows.append((None, counter_constraint2))
+        self.model.addConstraints(rows)
 
         cross_counter_constraint = StandardConstraint(
             name='CROSS_COUNTER',
@@ -322,14 +979,27 @@ class Modeller(object):
         cross_counter_constraint.add_to_model(model=self.model)
 
     def set_meals(self, meals, needs, add_meal=None):
+        """Sets a binary variable for every meal in every container and day, the
+        obligatory constraints and the local and global sums. With a cache the model
+        is built in set_global, if it is not found in the cache.
+        """
+        if self.cache is not None:
+            self.cacheKey = self._cache_key(meals)
+            self._deferred = dict(meals=meals, needs=needs, add_meal=add_meal)
+            return
+        self._set_meals(meals=meals, needs=needs, add_meal=add_meal)
+
+    def _set_meals(self, meals, needs, add_meal=None):
 
+        obligatory = []
         for day in self.days:
             for container_key, container_content in meals.iteritems():
+                obligatory_index = 0
                 for item in container_content:
                     for k in item['meals'].keys():
                         if not self.variable[day][container_key].get(k):
                             current_variable = pulp.LpVariable(
-                                name=self._join(day, container_key, k),
+                                name=self._variable_name(day, container_key, k),
                                 cat=pulp.LpBinary
                             )
                             self.variable[day][container_key][k] = current_variable
@@ -338,13 +1008,25 @@ class Modeller(object):
                     if item['preference'] == 'obligatory':
                         sum1 = [self.variable[day][container_key][k] for k in item['meals'].keys()]
 
-                        constraint_day = StandardConstraint(
-                            name=self._join(day, container_key, 'OBLIGATORY'),
+                        # one row and SOS1 set for each obligatory item of the container
+                        obligatory.append(StandardConstraint(
+                            name=self._obligatory_name(day, container_key, obligatory_index),
                             sum=sum1,
                             lb=1
-                        )
-                        constraint_day.add_to_model(model=self.model)
+                        ))
+                        if self.sos:
+                            self.model.sos1[self._sos_name(day, container_key, obligatory_index)] = dict(
+                                (self.variable[day][container_key][k], meal['GCAL'])
+                                for k, meal in item['meals'].iteritems()
+                            )
+                        for k in item['meals'].keys():
+                            self.obligatoryItems[container_key, k] = obligatory_index
+                        obligatory_index += 1
+        self.model.addConstraints(StandardConstraint.rows(obligatory))
 
+        self._set_containers(meals=meals, needs=needs, add_meal=add_meal)
+
+    def _set_containers(self, meals, needs, add_meal=None):
         switch_nut = {'BF': 'GCAL',
                       'DI': 'GCAL',
                       'LU': 'GCAL',
@@ -362,58 +1044,1276 @@ class Modeller(object):
                         # constraintWeek = StandardConstraint('TOT' + '_WM_' + 'GCAL', sum=sumWeek, ub=3)
                         # constraintWeek.add_to_model(model=self.model)
 
-    def set_meals_evo(self, meals, needs, add_meal=None):
-        gcal = array.array('f')
-        index = 0
-        for day in self.days:
-            for container_key, container_content in meals.iteritems():
-                for item in container_content:
-                    for meal_key, meal_content in item['meals'].iteritems():
-                        if not self.all_meals_evo[day][container_key].get(meal_key):
 
-                            self.all_meals_evo[day][container_key][meal_key] = meal_content
-                            self.all_meals_evo[day][container_key][meal_key]['index'] = index
-                            index += 1
-                            gcal.append(meal_content['GCAL'])
+class SparseModel(object):
+    """Column-major (CSC) representation of a pulp.LpProblem. The model is
+    written to an MPS file straight from the arrays and the cbc solution is
+    mapped back to the variables by column index, which bypasses
+    LpProblem.writeMPS.
+
+    Rows and columns are named C%07d and X%07d just like pulp does with
+    rename=1, so the index of a row or column can be read from its name.
+    """
 
+    mpsSense = {pulp.LpConstraintLE: 'L', pulp.LpConstraintEQ: 'E', pulp.LpConstraintGE: 'G'}
 
-        for container_key in meals.keys():
-            self._set_local_and_global_sum_evo(
-                container_content=meals[container_key],
-                needs=needs,
-                container_key=container_key,
-                add_meal=add_meal,
-                local_nut=None
+    def __init__(self, name, sense, columns, lower, upper, integer, objective,
+                 rows, senses, rhs, col_starts, row_index, values, problem=None, fixed=None, ranges=None,
+                 semicontinuous=None, sos1=None):
+        """
+        :param name: name of the model
+        :param sense: pulp.LpMinimize | pulp.LpMaximize
+        :param columns: list of pulp.LpVariables, one for each column
+        :param lower: numpy array of lower bounds, -inf if there is none
+        :param upper: numpy array of upper bounds, inf if there is none
+        :param integer: numpy array of booleans, True for integer columns
+        :param objective: numpy array of objective coefficients
+        :param rows: list of constraint names, one for each row
+        :param senses: numpy array of pulp constraint senses
+        :param rhs: numpy array of right hand sides
+        :param col_starts: numpy array, column j has its entries in [col_starts[j], col_starts[j + 1])
+        :param row_index: numpy array, row of each entry
+        :param values: numpy array, coefficient of each entry
+        :param problem: pulp.LpProblem the model was compiled from, gets status
+                        and solutionTime after solve
+        :param fixed: list of (pulp.LpVariable, value) that were removed by presolve
+        :param ranges: numpy array, width of the range of each row as in MPS for ≥ and ≤
+                       rows (0 for no range): rhs ≤ a*x ≤ rhs + range for ≥ rows and
+                       rhs - range ≤ a*x ≤ rhs for ≤ rows
+        :param semicontinuous: numpy array of booleans, True for columns that are
+                               0 or within their bounds (MPS SC)
+        :param sos1: OrderedDict {name: (numpy array of column indices, numpy array of weights)}
+                     of special ordered sets of type 1, at most one column of a set is not 0
+        """
+        self.name = name
+        self.sense = sense
+        self.columns = columns
+        self.lower = lower
+        self.upper = upper
+        self.integer = integer
+        self.objective = objective
+        self.rows = rows
+        self.senses = senses
+        self.rhs = rhs
+        self.colStarts = col_starts
+        self.rowIndex = row_index
+        self.values = values
+        self.problem = problem
+        self.fixed = fixed or []
+        self.ranges = np.zeros(len(rhs)) if ranges is None else ranges
+        self.semicontinuous = np.zeros(len(lower), dtype=bool) if semicontinuous is None else semicontinuous
+        self.sos1 = collections.OrderedDict() if sos1 is None else sos1
+        self.status = pulp.LpStatusNotSolved
+        self.solution = None
+        self.presolveLog = None
+
+    @classmethod
+    def from_problem(cls, problem):
+        """Compiles a pulp.LpProblem in one pass over its constraints. Columns are
+        numbered in order of their first occurrence.
+
+        :param problem: pulp.LpProblem
+        :return: SparseModel
+        """
+        column_index = {}
+        columns = []
+        entry_rows = []
+        entry_cols = []
+        entry_values = []
+        objective = problem.objective if problem.objective is not None else {}
+
+        for variable in objective:
+            if variable not in column_index:
+                column_index[variable] = len(columns)
+                columns.append(variable)
+
+        rows = []
+        senses = []
+        rhs = []
+        ranges = []
+        for i, (name, constraint) in enumerate(problem.constraints.items()):
+            rows.append(name)
+            sense, row_range = constraint.sense, constraint.rhsRange or 0
+            if sense == pulp.LpConstraintEQ and row_range:
+                # rhs ≤ a*x ≤ rhs + range for range > 0, rhs + range ≤ a*x ≤ rhs otherwise
+                sense = pulp.LpConstraintGE if row_range > 0 else pulp.LpConstraintLE
+            senses.append(sense)
+            rhs.append(-constraint.constant)
+            ranges.append(abs(row_range))
+            for variable, coef in constraint.items():
+                j = column_index.get(variable)
+                if j is None:
+                    j = column_index[variable] = len(columns)
+                    columns.append(variable)
+                entry_cols.append(j)
+                entry_values.append(coef)
+            entry_rows.extend([i] * len(constraint))
+
+        entry_cols = np.array(entry_cols, dtype=np.int64)
+        order = np.argsort(entry_cols, kind='mergesort')
+
+        obj = np.zeros(len(columns))
+        for variable, coef in objective.items():
+            obj[column_index[variable]] = coef
+
+        # members that are in no row and not in the objective are not columns of the model
+        sos1 = collections.OrderedDict()
+        for name, members in problem.sos1.items():
+            members = [(column_index[variable], weight) for variable, weight in members.items()
+                       if variable in column_index]
+            sos1[name] = (np.array([j for j, _ in members], dtype=np.int64),
+                          np.array([weight for _, weight in members], dtype=float))
+
+        return cls(
+            name=problem.name,
+            sense=problem.sense,
+            columns=columns,
+            lower=np.array([-np.inf if v.lowBound is None else v.lowBound for v in columns], dtype=float),
+            upper=np.array([np.inf if v.upBound is None else v.upBound for v in columns], dtype=float),
+            integer=np.array([v.cat == pulp.LpInteger for v in columns], dtype=bool),
+            objective=obj,
+            rows=rows,
+            senses=np.array(senses, dtype=np.int8),
+            rhs=np.array(rhs, dtype=float),
+            col_starts=np.searchsorted(entry_cols[order], np.arange(len(columns) + 1)),
+            row_index=np.array(entry_rows, dtype=np.int64)[order],
+            values=np.array(entry_values, dtype=float)[order],
+            problem=problem,
+            ranges=np.array(ranges, dtype=float),
+            semicontinuous=np.array([v.cat == pulp.LpSemiContinuous for v in columns], dtype=bool),
+            sos1=sos1
+        )
+
+    def patched(self, columns, rows, rhs, problem=None, ranges=None, sos1=None):
+        """Returns a model with the same structure, i.e. sharing the matrix,
+        bounds, types and senses, but new columns, row names and right hand sides
+        (and ranges and SOS1 set names).
+        """
+        return SparseModel(
+            name=self.name,
+            sense=self.sense,
+            columns=columns,
+            lower=self.lower,
+            upper=self.upper,
+            integer=self.integer,
+            objective=self.objective,
+            rows=rows,
+            senses=self.senses,
+            rhs=rhs,
+            col_starts=self.colStarts,
+            row_index=self.rowIndex,
+            values=self.values,
+            problem=problem,
+            ranges=self.ranges if ranges is None else ranges,
+            semicontinuous=self.semicontinuous,
+            sos1=self.sos1 if sos1 is None else sos1
+        )
+
+    @property
+    def shape(self):
+        return len(self.rows), len(self.columns)
+
+    def restricted(self, keep_rows, keep_cols, lower=None, upper=None, rhs=None, objective=None, name=None):
+        """Returns the model restricted to a subset of rows and columns.
+
+        :param keep_rows: numpy array of booleans, one for each row
+        :param keep_cols: numpy array of booleans, one for each column
+        :param lower, upper, rhs, objective: numpy arrays for all rows/columns that replace
+                                             the ones of this model, optional
+        :param name: name of the new model, defaults to the name of this model
+        :return: SparseModel
+        """
+        lower = self.lower if lower is None else lower
+        upper = self.upper if upper is None else upper
+        rhs = self.rhs if rhs is None else rhs
+        objective = self.objective if objective is None else objective
+
+        entry_cols = np.repeat(np.arange(len(self.lower)), np.diff(self.colStarts))
+        keep_entries = keep_cols[entry_cols] & keep_rows[self.rowIndex]
+        new_row = np.cumsum(keep_rows) - 1
+        new_col = np.cumsum(keep_cols) - 1
+        col_counts = np.bincount(new_col[entry_cols[keep_entries]], minlength=int(keep_cols.sum()))
+
+        return SparseModel(
+            name=self.name if name is None else name,
+            sense=self.sense,
+            columns=[self.columns[j] for j in np.flatnonzero(keep_cols).tolist()],
+            lower=lower[keep_cols],
+            upper=upper[keep_cols],
+            integer=self.integer[keep_cols],
+            objective=objective[keep_cols],
+            rows=[self.rows[i] for i in np.flatnonzero(keep_rows).tolist()],
+            senses=self.senses[keep_rows],
+            rhs=rhs[keep_rows],
+            col_starts=np.concatenate(([0], np.cumsum(col_counts))),
+            row_index=new_row[self.rowIndex[keep_entries]],
+            values=self.values[keep_entries],
+            problem=self.problem,
+            fixed=self.fixed,
+            ranges=self.ranges[keep_rows],
+            semicontinuous=self.semicontinuous[keep_cols],
+            sos1=self._restricted_sos1(keep_cols, new_col)
+        )
+
+    def _restricted_sos1(self, keep_cols, new_col):
+        """SOS1 sets with the remaining columns renumbered, sets of less than
+        two columns are dropped"""
+        sos1 = collections.OrderedDict()
+        for name, (columns, weights) in self.sos1.iteritems():
+            keep = keep_cols[columns]
+            if keep.sum() > 1:
+                sos1[name] = (new_col[columns[keep]], weights[keep])
+        return sos1
+
+    def appended(self, name, columns, values, sense, rhs):
+        """Returns the model with an additional row.
+
+        :param name: name of the row
+        :param columns: numpy array of column indices
+        :param values: numpy array of coefficients
+        :param sense: pulp constraint sense
+        :param rhs: right hand side
+        :return: SparseModel
+        """
+        entry_cols = np.concatenate((np.repeat(np.arange(len(self.lower)), np.diff(self.colStarts)), columns))
+        order = np.argsort(entry_cols, kind='mergesort')
+        model = SparseModel(
+            name=self.name,
+            sense=self.sense,
+            columns=self.columns,
+            lower=self.lower,
+            upper=self.upper,
+            integer=self.integer,
+            objective=self.objective,
+            rows=self.rows + [name],
+            senses=np.append(self.senses, sense).astype(np.int8),
+            rhs=np.append(self.rhs, rhs),
+            col_starts=np.searchsorted(entry_cols[order], np.arange(len(self.lower) + 1)),
+            row_index=np.concatenate((self.rowIndex, np.full(len(columns), len(self.rows), dtype=np.int64)))[order],
+            values=np.concatenate((self.values, values))[order],
+            problem=self.problem,
+            fixed=self.fixed,
+            ranges=np.append(self.ranges, 0.0),
+            semicontinuous=self.semicontinuous,
+            sos1=self.sos1
+        )
+        return model
+
+    def with_columns(self, columns, entries, sos1=None):
+        """Returns the model with additional binary columns. The new entries
+        are appended to the end of the CSC arrays, so the cost is proportional
+        to the number of new entries.
+
+        :param columns: list of pulp.LpVariables
+        :param entries: list of lists of (row index, coefficient), one for each column
+        :param sos1: SOS1 sets that replace the ones of this model, optional
+        :return: SparseModel
+        """
+        counts = [len(column_entries) for column_entries in entries]
+        flat = [entry for column_entries in entries for entry in column_entries]
+        return SparseModel(
+            name=self.name,
+            sense=self.sense,
+            columns=self.columns + list(columns),
+            lower=np.append(self.lower, np.zeros(len(columns))),
+            upper=np.append(self.upper, np.ones(len(columns))),
+            integer=np.append(self.integer, np.ones(len(columns), dtype=bool)),
+            objective=np.append(self.objective, np.zeros(len(columns))),
+            rows=self.rows,
+            senses=self.senses,
+            rhs=self.rhs,
+            col_starts=np.append(self.colStarts, self.colStarts[-1] + np.cumsum(counts, dtype=np.int64)),
+            row_index=np.append(self.rowIndex, np.array([i for i, _ in flat], dtype=np.int64)),
+            values=np.append(self.values, np.array([coef for _, coef in flat], dtype=float)),
+            problem=self.problem,
+            fixed=self.fixed,
+            ranges=self.ranges,
+            semicontinuous=np.append(self.semicontinuous, np.zeros(len(columns), dtype=bool)),
+            sos1=self.sos1 if sos1 is None else sos1
+        )
+
+    def with_bounds(self, columns, lower, upper):
+        """Returns the model with new bounds for some columns. The bound arrays
+        are copied, the matrix is shared.
+
+        :param columns: list of pulp.LpVariables
+        :param lower: new lower bound
+        :param upper: new upper bound
+        :return: SparseModel
+        """
+        columns = set(columns)
+        index = [j for j, variable in enumerate(self.columns) if variable in columns]
+        new_lower = self.lower.copy()
+        new_upper = self.upper.copy()
+        new_lower[index] = lower
+        new_upper[index] = upper
+        return SparseModel(
+            name=self.name,
+            sense=self.sense,
+            columns=self.columns,
+            lower=new_lower,
+            upper=new_upper,
+            integer=self.integer,
+            objective=self.objective,
+            rows=self.rows,
+            senses=self.senses,
+            rhs=self.rhs,
+            col_starts=self.colStarts,
+            row_index=self.rowIndex,
+            values=self.values,
+            problem=self.problem,
+            fixed=self.fixed,
+            ranges=self.ranges,
+            semicontinuous=self.semicontinuous,
+            sos1=self.sos1
+        )
+
+    def sos1_rows(self):
+        """Returns the model with a row Σ x ≤ 1 for each SOS1 set and without
+        the sets, which is the same model if the columns of the sets are binary.
+
+        :return: SparseModel
+        """
+        model = self
+        for name, (columns, _) in self.sos1.iteritems():
+            model = model.appended(name, columns, np.ones(len(columns)), pulp.LpConstraintLE, 1)
+        if model is not self:
+            model.sos1 = collections.OrderedDict()
+        return model
+
+    def row_bounds(self):
+        """Lower and upper bound of the activity of each row from senses, right
+        hand sides and ranges, -inf/inf for the open side of a row.
+
+        :return: numpy arrays row_lower, row_upper
+        """
+        ge = self.senses == pulp.LpConstraintGE
+        le = self.senses == pulp.LpConstraintLE
+        ranged = self.ranges > 0
+        row_lower = np.where(le, np.where(ranged, self.rhs - self.ranges, -np.inf), self.rhs)
+        row_upper = np.where(ge, np.where(ranged, self.rhs + self.ranges, np.inf), self.rhs)
+        return row_lower, row_upper
+
+    @staticmethod
+    def row_violation(activity, row_lower, row_upper, scale):
+        """Scaled violation of each row, activity is (... x rows)"""
+        return (np.maximum(row_lower - activity, 0) + np.maximum(activity - row_upper, 0)) / scale
+
+    def violation(self, x):
+        """Sum of the violations of all rows by x, scaled by max(1, |rhs|)
+
+        :param x: numpy array with a value for each column
+        :return: float
+        """
+        entry_cols = np.repeat(np.arange(len(self.lower)), np.diff(self.colStarts))
+        activity = np.bincount(self.rowIndex, weights=self.values * x[entry_cols], minlength=len(self.rows))
+        row_lower, row_upper = self.row_bounds()
+        return float(self.row_violation(activity, row_lower, row_upper, np.maximum(1.0, np.abs(self.rhs))).sum())
+
+    def _activity_bounds(self, entry_cols, lower, upper):
+        """Minimal and maximal activity of each row for the given column bounds.
+        Infinite contributions are counted separately.
+
+        :return: min_act, min_inf, max_act, max_inf (numpy arrays, one entry per row)
+        """
+        positive = self.values > 0
+        low = self.values * np.where(positive, lower[entry_cols], upper[entry_cols])
+        high = self.values * np.where(positive, upper[entry_cols], lower[entry_cols])
+        n = len(self.rows)
+        low_inf = ~np.isfinite(low)
+        high_inf = ~np.isfinite(high)
+        return (np.bincount(self.rowIndex, weights=np.where(low_inf, 0, low), minlength=n),
+                np.bincount(self.rowIndex, weights=low_inf, minlength=n),
+                np.bincount(self.rowIndex, weights=np.where(high_inf, 0, high), minlength=n),
+                np.bincount(self.rowIndex, weights=high_inf, minlength=n))
+
+    def presolve(self, max_passes=10, tol=1e-9):
+        """Removes redundant rows and fixed columns and tightens the bounds of
+        integer columns with the activity bounds of the rows:
+
+            - rows that are satisfied for all column values within the bounds,
+              e.g. week rows for nutrients no candidate provides or day rows that
+              are implied by the minimal/maximal sums of the candidates
+            - columns that are fixed, e.g. candidates that can never fit the
+              GCAL window of their container
+
+        A semicontinuous column counts with lower bound 0, it is fixed to 0 if
+        it cannot reach its lower bound. The other columns of an SOS1 set with
+        a column that cannot be 0 are fixed to 0. Bounds are tightened until nothing
+        changes or 'max_passes' is reached. What
+        was removed is reported in presolveLog of the returned model. If a row is
+        found to be infeasible the model is returned unchanged and cbc reports
+        the status.
+
+        :param max_passes: maximal number of bound tightening passes
+        :param tol: feasibility tolerance
+        :return: SparseModel, reduced model that solves for the same problem
+        """
+        entry_cols = np.repeat(np.arange(len(self.columns)), np.diff(self.colStarts))
+        lower = self.lower.copy()
+        upper = self.upper.copy()
+        semicontinuous = self.semicontinuous
+        row_lower, row_upper = self.row_bounds()
+        upper_rows = np.isfinite(row_upper)
+        lower_rows = np.isfinite(row_lower)
+        entry_upper = upper_rows[self.rowIndex]
+        entry_lower = lower_rows[self.rowIndex]
+        positive = self.values > 0
+        scale = np.maximum(1.0, np.abs(self.rhs))
+        tightened = 0
+        infeasible = False
+
+        passes = 0
+        for passes in range(1, max_passes + 1):
+            for columns, _ in self.sos1.itervalues():
+                nonzero = (lower[columns] > 0) | (upper[columns] < 0)
+                if nonzero.sum() > 1:
+                    infeasible = True
+                elif nonzero.any():
+                    others = columns[~nonzero & ((lower[columns] < 0) | (upper[columns] > 0))]
+                    tightened += len(others)
+                    lower[others] = np.maximum(lower[others], 0)
+                    upper[others] = np.minimum(upper[others], 0)
+            if infeasible:
+                break
+            low = np.where(semicontinuous, np.minimum(lower, 0), lower)
+            min_act, min_inf, max_act, max_inf = self._activity_bounds(entry_cols, low, upper)
+            if np.any(upper_rows & (min_inf == 0) & (min_act > row_upper + 1e-6 * scale)) or \
+                    np.any(lower_rows & (max_inf == 0) & (max_act < row_lower - 1e-6 * scale)):
+                infeasible = True
+                break
+            # row i, entry a * x_j: a * x_j <= upper_i - (min_act_i - a * bound_j)
+            with np.errstate(invalid='ignore'):
+                own_low = self.values * np.where(positive, low[entry_cols], upper[entry_cols])
+                own_high = self.values * np.where(positive, upper[entry_cols], low[entry_cols])
+                slack_upper = (row_upper[self.rowIndex] - min_act[self.rowIndex] + own_low) / self.values
+                slack_lower = (row_lower[self.rowIndex] - max_act[self.rowIndex] + own_high) / self.values
+            valid_upper = entry_upper & (min_inf[self.rowIndex] == 0)
+            valid_lower = entry_lower & (max_inf[self.rowIndex] == 0)
+
+            new_upper = upper.copy()
+            new_lower = low.copy()
+            np.minimum.at(new_upper, entry_cols[valid_upper & positive], slack_upper[valid_upper & positive])
+            np.maximum.at(new_lower, entry_cols[valid_upper & ~positive], slack_upper[valid_upper & ~positive])
+            np.maximum.at(new_lower, entry_cols[valid_lower & positive], slack_lower[valid_lower & positive])
+            np.minimum.at(new_upper, entry_cols[valid_lower & ~positive], slack_lower[valid_lower & ~positive])
+
+            # integer columns are rounded, continuous columns are only fixed
+            off = semicontinuous & (new_upper < lower - tol)
+            new_upper = np.where(self.integer, np.floor(new_upper + 1e-6),
+                                 np.where((new_upper <= low + tol) | off, low, upper))
+            new_lower = np.where(self.integer, np.ceil(new_lower - 1e-6),
+                                 np.where(new_lower >= upper - tol, upper, low))
+            new_upper = np.minimum(new_upper, upper)
+            new_lower = np.maximum(new_lower, low)
+            if np.any(new_lower > new_upper + tol):
+                infeasible = True
+                break
+            changed = (new_upper < upper) | (new_lower > low)
+            if not changed.any():
+                break
+            tightened += int(changed.sum())
+            upper = np.maximum(new_upper, new_lower)
+            # semicontinuous columns keep their lower bound unless they are fixed
+            lower = np.where(semicontinuous & (new_lower < upper), lower, new_lower)
+
+        if infeasible:
+            self.presolveLog = dict(passes=passes, infeasible=True, rows=[], columns=[], bounds=0)
+            return self
+
+        low = np.where(semicontinuous, np.minimum(lower, 0), lower)
+        min_act, min_inf, max_act, max_inf = self._activity_bounds(entry_cols, low, upper)
+        redundant = ((~upper_rows) | ((max_inf == 0) & (max_act <= row_upper + tol * scale))) & \
+                    ((~lower_rows) | ((min_inf == 0) & (min_act >= row_lower - tol * scale)))
+        # a semicontinuous column with lower == upper is still 0 or lower
+        fixed_cols = (lower == upper) & (~semicontinuous | (upper == 0))
+        keep_rows = ~redundant
+        keep_cols = ~fixed_cols
+
+        fixed_entries = fixed_cols[entry_cols]
+        rhs = self.rhs - np.bincount(self.rowIndex[fixed_entries],
+                                     weights=self.values[fixed_entries] * lower[entry_cols[fixed_entries]],
+                                     minlength=len(self.rows))
+        fixed_values = lower.tolist()
+        fixed = [(self.columns[j], fixed_values[j]) for j in np.flatnonzero(fixed_cols).tolist()]
+        model = self.restricted(keep_rows, keep_cols, lower=lower, upper=upper, rhs=rhs)
+        model.fixed = self.fixed + fixed
+        model.presolveLog = dict(
+            passes=passes,
+            infeasible=False,
+            rows=[self.rows[i] for i in np.flatnonzero(redundant).tolist()],
+            columns=[variable for variable, _ in fixed],
+            bounds=tightened
+        )
+        return model
+
+    def _bound_lines(self):
+        """Bounds section as in LpProblem.writeMPS(mip=1)"""
+        lines = []
+        for j, (lb, ub, integer, semicontinuous) in enumerate(zip(
+                self.lower.tolist(), self.upper.tolist(), self.integer.tolist(), self.semicontinuous.tolist())):
+            n = 'X%07d' % j
+            if semicontinuous:
+                if lb:
+                    lines.append(' LO BND       %-8s  % .12e\n' % (n, lb))
+                lines.append(' SC BND       %-8s  % .12e\n' % (n, ub))
+            elif lb == ub:
+                lines.append(' FX BND       %-8s  % .12e\n' % (n, lb))
+            elif lb == 0 and ub == 1 and integer:
+                lines.append(' BV BND       %-8s\n' % n)
+            else:
+                if lb != -np.inf:
+                    if lb != 0 or (integer and ub == np.inf):
+                        lines.append(' LO BND       %-8s  % .12e\n' % (n, lb))
+                elif ub != np.inf:
+                    lines.append(' MI BND       %-8s\n' % n)
+                else:
+                    lines.append(' FR BND       %-8s\n' % n)
+                if ub != np.inf:
+                    lines.append(' UP BND       %-8s  % .12e\n' % (n, ub))
+        return lines
+
+    def write_mps(self, filename):
+        """Writes the model as (fixed names) MPS file with a single buffered write.
+
+        :param filename: path of the MPS file
+        """
+        with open(filename, 'w') as f:
+            f.write(self.mps_text())
+
+    def mps_text(self):
+        """Returns the model as (fixed names) MPS file content, see write_mps"""
+        lines = ['*SENSE:' + pulp.LpSenses[self.sense] + '\n',
+                 'NAME          MODEL\n',
+                 'ROWS\n',
+                 ' N  OBJ\n']
+        lines.extend(' %s  C%07d\n' % (self.mpsSense[sense], i) for i, sense in enumerate(self.senses.tolist()))
+
+        lines.append('COLUMNS\n')
+        starts = self.colStarts.tolist()
+        row_index = self.rowIndex.tolist()
+        values = self.values.tolist()
+        objective = self.objective.tolist()
+        in_marker = False
+        for j, integer in enumerate(self.integer.tolist()):
+            if integer != in_marker:
+                lines.append("    MARK      'MARKER'                 '%s'\n" % ('INTORG' if integer else 'INTEND'))
+                in_marker = integer
+            n = 'X%07d' % j
+            lines.extend('    %-8s  C%07d  % .12e\n' % (n, i, x)
+                         for i, x in zip(row_index[starts[j]:starts[j + 1]], values[starts[j]:starts[j + 1]]))
+            if objective[j]:
+                lines.append('    %-8s  OBJ       % .12e\n' % (n, objective[j]))
+        if in_marker:
+            lines.append("    MARK      'MARKER'                 'INTEND'\n")
+
+        lines.append('RHS\n')
+        lines.extend('    RHS       C%07d  % .12e\n' % (i, x) for i, x in enumerate(self.rhs.tolist()) if x)
+        if self.ranges.any():
+            lines.append('RANGES\n')
+            lines.extend('    RGS       C%07d  % .12e\n' % (i, x) for i, x in enumerate(self.ranges.tolist()) if x)
+
+        lines.append('BOUNDS\n')
+        lines.extend(self._bound_lines())
+        if self.sos1:
+            lines.append('SOS\n')
+            for k, (columns, weights) in enumerate(self.sos1.itervalues()):
+                lines.append(' S1 SOS       S%07d  %d\n' % (k, k + 1))
+                lines.extend('    X%07d  % .12e\n' % (j, weight)
+                             for j, weight in zip(columns.tolist(), weights.tolist()))
+        lines.append('ENDATA\n')
+        return ''.join(lines)
+
+    def read_solution(self, filename):
+        """Reads a cbc solution file of a model written by write_mps. Column values
+        are stored by column index in self.solution.
+
+        :param filename: path of the cbc solution file or file object
+        :return: pulp status
+        """
+        status, solution = pulp.COIN_CMD.readsolArrays(filename, len(self.lower), len(self.rows))[:2]
+        self.status = status
+        self.solution = solution
+        return status
+
+    def assign_solution(self):
+        """Sets varValue of all columns from self.solution and of the columns
+        that were fixed by presolve"""
+        for variable, val in zip(self.columns, self.solution.tolist()):
+            variable.varValue = val
+        for variable, val in self.fixed:
+            variable.varValue = val
+
+    def run(self, solver, start=None, stopper=None):
+        """Solves the model with cbc, the solution is stored in self.solution
+        but not assigned to the columns.
+
+        :param solver: instance of pulp.COIN_CMD (e.g. pulp.PULP_CBC_CMD) or pulp.CBC_DLL
+        :param start: None or list of (column index, value) passed to cbc as MIP start
+        :param stopper: None or pulp.CbcStopper that may kill cbc from another thread
+        :return: pulp status
+        """
+        if isinstance(solver, pulp.CBC_DLL):
+            if solver.lib is not None and not self.semicontinuous.any():
+                return self._run_library(solver, start)
+            solver = solver.fallbackSolver()
+        if not solver.executable(solver.path):
+            raise pulp.PulpSolverError('Pulp: cannot execute ' + solver.path)
+        if solver.usePipe(bool(start) and solver.mip):
+            # no temporary files, the model goes to stdin and the solution comes from stdout
+            return self.read_solution(solver.callCBCPipe(
+                self.mps_text(), self.sense == pulp.LpMaximize,
+                [('X%07d' % j, val) for j, val in start] if start and solver.mip else None, stopper))
+        tmp_mps, tmp_sol, tmp_mst = solver.tmpFiles(self.name, 'mps', 'sol', 'mst')
+        self.write_mps(tmp_mps)
+        mip_start = None
+        if start and solver.mip:
+            mip_start = tmp_mst
+            solver.writeMipStart(tmp_mst, [('X%07d' % j, val) for j, val in start])
+        try:
+            solver.callCBC(tmp_mps, tmp_sol, self.sense == pulp.LpMaximize, mip_start, stopper)
+            return self.read_solution(tmp_sol)
+        finally:
+            if not solver.keepFiles:
+                for tmp in (tmp_mps, tmp_sol, tmp_mst):
+                    try:
+                        os.remove(tmp)
+                    except OSError:
+                        pass
+
+    def _run_library(self, solver, start=None):
+        """Solves the model with cbc in this process from the arrays, see run.
+
+        :param solver: instance of pulp.CBC_DLL with the library loaded
+        """
+        le, ge = self.senses == pulp.LpConstraintLE, self.senses == pulp.LpConstraintGE
+        ranged = self.ranges > 0
+        status, solution = solver.solveArrays(
+            self.colStarts, self.rowIndex, self.values, self.lower, self.upper, self.objective,
+            rowLower=np.where(le, np.where(ranged, self.rhs - self.ranges, -np.inf), self.rhs),
+            rowUpper=np.where(ge, np.where(ranged, self.rhs + self.ranges, np.inf), self.rhs),
+            integer=self.integer,
+            maximize=self.sense == pulp.LpMaximize,
+            sos1=list(self.sos1.values()),
+            mipStart=start
+        )[:2]
+        self.status = status
+        self.solution = solution
+        return status
+
+    def solve_pool(self, solver, size, distance=1):
+        """Solves the model up to 'size' times, each time with a cut that excludes
+        the previous solutions, i.e. a solution has to differ from all previous ones
+        in at least 'distance' binary columns:
+
+            Σ_{j: x_j = 1} (1 - x_j) + Σ_{j: x_j = 0} x_j ≥ distance
+
+        The first solution is assigned to the columns like by solve. Without
+        objective the solutions are 'size' different feasible plans.
+
+        :param solver: instance of pulp.COIN_CMD (e.g. pulp.PULP_CBC_CMD) or pulp.CBC_DLL
+        :param size: maximal number of solutions
+        :param distance: minimal number of binary columns in which solutions differ
+        :return: list of numpy arrays, one for each solution found
+        """
+        status = self.solve(solver)
+        if status != pulp.LpStatusOptimal:
+            return []
+        solutions = [self.solution]
+        binary = np.flatnonzero(self.integer & (self.lower == 0) & (self.upper == 1))
+        model = self
+        for i in range(1, size):
+            ones = solutions[-1][binary] > 0.5
+            model = model.appended(
+                name='POOL_%d' % i,
+                columns=binary,
+                values=np.where(ones, -1.0, 1.0),
+                sense=pulp.LpConstraintGE,
+                rhs=distance - ones.sum()
             )
-        return self.all_meals_evo, self.bounds
+            if model.run(solver) != pulp.LpStatusOptimal:
+                break
+            solutions.append(model.solution)
+        return solutions
+
+    def solve(self, solver):
+        """Solves the model with cbc and assigns the solution to the columns. If
+        solver.warmStart is set, the current values of the columns (see
+        Modeller.set_start) are passed to cbc as MIP start.
+
+        :param solver: instance of pulp.COIN_CMD (e.g. pulp.PULP_CBC_CMD) or pulp.CBC_DLL
+        :return: pulp status
+        """
+        start = time.time()
+        mip_start = None
+        if solver.warmStart:
+            mip_start = [(j, variable.varValue) for j, variable in enumerate(self.columns)
+                         if variable.varValue is not None]
+        self.run(solver, start=mip_start)
+        self.assign_solution()
+        if self.problem is not None:
+            self.problem.status = self.status
+            self.problem.solutionTime = time.time() - start
+        return self.status
+
+
+def _run_sparse(args):
+    """Solves a SparseModel in a worker of the pool, see LagrangianSolver.
+
+    :param args: tuple of SparseModel and solver
+    :return: pulp status, solution
+    """
+    model, solver = args
+    status = model.run(solver)
+    return status, model.solution
 
-    def _set_local_and_global_sum_evo(self, container_key, container_content, needs, add_meal, local_nut):
-        self.all_meals[container_key] = {}
-        local_nut = 'GCAL'
 
-        for item in container_content:
-            self.all_meals[container_key].update(item['meals'])
+class LagrangianSolver(object):
+    """Solves a SparseModel of nearly independent blocks (days). Rows with columns
+    of more than one block (coupling rows, e.g. TOT_GLOB_<n>) are relaxed with
+    multipliers mu, the objective of each block gets the penalty
 
-        for day in self.days:
-            for meal_key, index in self.all_meals_evo[day][container_key].iteritems():
-                self.all_meals[container_key][meal_key]['index'] = index
-                if n == local_nut:
-                    sum_local = current_sum_for_nutrient + (add_meal[n] if add_meal else [])
+        Σ_i mu_i * (Σ_j a_ij * x_j - b_i) / max(1, |b_i|)
 
-                self.sumGlobal.setdefault(day, {}).setdefault(n, []).append(current_sum_for_nutrient)
+    and the blocks are solved in parallel on a process pool. mu is updated by
+    subgradient steps with the scaled violation of the coupling rows. If the best
+    combined solution still violates coupling rows it is repaired block by block,
+    i.e. small groups of blocks are solved again with the coupling rows and the
+    solution of the other blocks fixed. If that fails the whole model is solved with the best
+    combined solution as MIP start.
 
-                if sum_local:
-                    if needs.get(container_key):
-                        constraint = StandardConstraint(
-                            name=self._join(day, container_key, local_nut),
-                            sum=sum_local,
-                            ub=needs[container_key][local_nut][c.UB],
-                            lb=needs[container_key][local_nut][c.LB]
-                        )
+    For a model without objective (generate) a feasible solution is reported as
+    Optimal, otherwise it is feasible but not necessarily optimal.
+    """
 
-                        constraint.add_to_model(model=self.model)
+    def __init__(self, model, blocks, solver, iterations=5, step=1.0, processes=None, repair_blocks=2, tol=1e-6):
+        """
+        :param model: SparseModel
+        :param blocks: numpy array, block (e.g. day index) of each column, see Modeller.day_blocks
+        :param solver: instance of pulp.COIN_CMD (e.g. pulp.PULP_CBC_CMD), maxSeconds
+                       applies to each subproblem
+        :param iterations: maximal number of subgradient iterations
+        :param step: initial step size, the step in iteration k is step / (k + 1)
+        :param processes: number of worker processes, defaults to the number of cpus.
+                          If no process pool can be created (e.g. no /dev/shm on AWS
+                          Lambda) the blocks are solved by a thread pool, each thread
+                          runs cbc in a subprocess. The blocks are solved sequentially
+                          if processes is 1.
+        :param repair_blocks: number of blocks that are solved together in the repair step
+        :param tol: tolerance for the scaled violation of the coupling rows
+        """
+        if np.any(blocks < 0):
+            raise ValueError('every column has to belong to a block')
+        self.model = model
+        self.blocks = blocks
+        self.solver = solver
+        self.iterations = iterations
+        self.step = step
+        self.processes = processes
+        self.repairBlocks = repair_blocks
+        self.tol = tol
+        self.iterationLog = []
+
+        n = len(model.lower)
+        self.base = model.patched(columns=range(n), rows=model.rows, rhs=model.rhs)
+        entry_cols = np.repeat(np.arange(n), np.diff(model.colStarts))
+        self.entryBlocks = blocks[entry_cols]
+        num_rows = len(model.rows)
+        row_min = np.full(num_rows, np.iinfo(np.int64).max, dtype=np.int64)
+        row_max = np.full(num_rows, -1, dtype=np.int64)
+        np.minimum.at(row_min, model.rowIndex, self.entryBlocks)
+        np.maximum.at(row_max, model.rowIndex, self.entryBlocks)
+        self.rowBlock = row_min
+        self.coupling = row_min != row_max
+
+        entries = self.coupling[model.rowIndex]
+        self.couplingRows = model.rowIndex[entries]
+        self.couplingCols = entry_cols[entries]
+        self.couplingValues = model.values[entries]
+        self.rowLower, self.rowUpper = model.row_bounds()
+        self.scale = np.maximum(1.0, np.abs(model.rhs))
+        self.equality = self.rowLower == self.rowUpper
+
+        self.blockIds = np.unique(blocks).tolist()
+        self.blockColumns = [np.flatnonzero(blocks == k) for k in self.blockIds]
+        self.subproblems = [
+            self.base.restricted(~self.coupling & (self.rowBlock == k), blocks == k,
+                                 name='%s_%d' % (model.name, k))
+            for k in self.blockIds
+        ]
+
+    def _map(self, pool, args):
+        if pool is None:
+            return map(_run_sparse, args)
+        return pool.map(_run_sparse, args)
+
+    def _violation(self, x):
+        """Scaled violation of each coupling row, 0 for all other rows"""
+        activity = np.bincount(self.couplingRows, weights=self.couplingValues * x[self.couplingCols],
+                               minlength=len(self.model.rows))
+        violation = SparseModel.row_violation(activity, self.rowLower, self.rowUpper, self.scale)
+        return np.where(self.coupling, violation, 0), activity
+
+    def _subgradient(self, pool):
+        """Subgradient iterations, returns the status and the least violating solution.
+        The multiplier of a row is positive while its upper bound binds and negative
+        while its lower bound binds, free for equality rows.
+        """
+        mu = np.zeros(len(self.model.rows))
+        best, best_violation, best_k = None, np.inf, 0
+        for k in range(self.iterations):
+            objective = self.model.objective + np.bincount(
+                self.couplingCols, weights=self.couplingValues * (mu / self.scale)[self.couplingRows],
+                minlength=len(self.model.lower))
+            for sub, columns in zip(self.subproblems, self.blockColumns):
+                sub.objective = objective[columns]
+            results = self._map(pool, [(sub, self.solver) for sub in self.subproblems])
+            statuses = [status for status, _ in results]
+            if any(status != pulp.LpStatusOptimal for status in statuses):
+                return min(statuses), best
+
+            x = np.zeros(len(self.model.lower))
+            for (_, solution), columns in zip(results, self.blockColumns):
+                x[columns] = solution
+            violation, activity = self._violation(x)
+            self.iterationLog.append(float(violation.sum()))
+            if violation.sum() < best_violation:
+                best, best_violation, best_k = x, violation.sum(), k
+            if best_violation <= self.tol or k - best_k >= 2:
+                # without objective the block solutions tend to oscillate, the
+                # repair step starts from the best one
+                break
+            target = np.where(mu > 0, self.rowUpper,
+                              np.where(mu < 0, self.rowLower, np.clip(activity, self.rowLower, self.rowUpper)))
+            gradient = (activity - target) / self.scale
+            updated = np.where(self.coupling, mu + self.step / (k + 1) * gradient, 0)
+            mu = np.where(self.equality | (mu == 0), updated,
+                          np.where(mu > 0, np.maximum(updated, 0), np.minimum(updated, 0)))
+        return pulp.LpStatusOptimal, best
+
+    def _repair(self, x):
+        """Solves groups of 'repairBlocks' consecutive blocks one after another with
+        the coupling rows, the other blocks are fixed. Returns the repaired solution."""
+        size = min(self.repairBlocks, len(self.blockIds))
+        for first in range(len(self.blockIds)):
+            violation, activity = self._violation(x)
+            if violation.sum() <= self.tol:
+                break
+            group = np.zeros(len(self.model.lower), dtype=bool)
+            for k in range(first, first + size):
+                group |= self.blocks == self.blockIds[k % len(self.blockIds)]
+            in_group = group[self.couplingCols]
+            own = np.bincount(self.couplingRows[in_group],
+                              weights=self.couplingValues[in_group] * x[self.couplingCols[in_group]],
+                              minlength=len(self.model.rows))
+            touched = np.zeros(len(self.model.rows), dtype=bool)
+            touched[self.couplingRows[in_group]] = True
+            in_rows = np.zeros(len(self.model.rows), dtype=bool)
+            in_rows[self.model.rowIndex[group[np.repeat(np.arange(len(group)), np.diff(self.model.colStarts))]]] = True
+            sub = self.base.restricted(
+                (~self.coupling & in_rows) | touched,
+                group,
+                rhs=self.model.rhs - (activity - own),
+                name='%s_repair' % self.model.name
+            )
+            columns = np.flatnonzero(group)
+            if sub.run(self.solver, start=zip(range(len(columns)), x[columns].tolist())) == pulp.LpStatusOptimal:
+                x = x.copy()
+                x[columns] = sub.solution
+        return x
+
+    def solve(self):
+        """Solves the model and assigns the solution to its columns.
+
+        :return: pulp status
+        """
+        start = time.time()
+        pool = None
+        if self.processes != 1:
+            try:
+                pool = multiprocessing.Pool(self.processes)
+            except OSError:
+                pool = ThreadPool(self.processes)
+        try:
+            status, x = self._subgradient(pool)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if status == pulp.LpStatusInfeasible:
+            # the rows of each block are rows of the model, so it is infeasible too
+            x = np.zeros(len(self.model.lower))
+        else:
+            if x is not None and self._violation(x)[0].sum() > self.tol:
+                x = self._repair(x)
+            if x is None or self._violation(x)[0].sum() > self.tol:
+                start_values = None if x is None else list(enumerate(x.tolist()))
+                status = self.base.run(self.solver, start=start_values)
+                x = self.base.solution
+            else:
+                status = pulp.LpStatusOptimal
+
+        self.model.status = status
+        self.model.solution = x
+        self.model.assign_solution()
+        if self.model.problem is not None:
+            self.model.problem.status = status
+            self.model.problem.solutionTime = time.time() - start
+        return status
+
+
+class EvolutionarySolver(object):
+    """Heuristic for SparseModels of binary columns (e.g. generate without
+    CrossCounter). Genomes are numpy bit (bool) arrays, one bit per column, and
+    the fitness of the whole population is one matrix product with the dense
+    constraint matrix, whose nutrient rows are the meal x nutrient matrices of
+    the Modeller. The fitness is the scaled violation of the rows
+
+        Σ_i max(0, Σ_j a_ij * x_j - b_i) / max(1, |b_i|)   for ≤ rows (≥ and = alike)
+
+    i.e. 0 for feasible plans. Each generation children are bred by tournament
+    selection, crossover of whole blocks (days) and bit flip mutation, the best
+    children are improved by a (vectorized) descent of flips and swaps, and the best 'population'
+    plans survive (plus selection). The search ends with the first feasible plan
+    or after 'time_limit' seconds.
+    """
+
+    def __init__(self, model, blocks=None, time_limit=5.0, population=32, density=0.02,
+                 mutation=4.0, descents=4, seed=None, tol=1e-6):
+        """
+        :param model: SparseModel with binary columns only
+        :param blocks: numpy array, block (e.g. day index) of each column, see Modeller.day_blocks.
+                       Crossover takes whole blocks from either parent, single columns if None
+        :param time_limit: seconds
+        :param population: number of plans that survive each generation
+        :param density: probability of a 1 bit in the initial plans
+        :param mutation: expected number of flipped bits per child
+        :param descents: number of the best children of each generation that are improved by descent
+        :param seed: seed for numpy.random
+        :param tol: tolerance for the scaled violation
+        """
+        if not (np.all(model.integer) and np.all(model.lower >= 0) and np.all(model.upper <= 1)):
+            raise ValueError('EvolutionarySolver requires a model of binary columns')
+        self.model = model
+        self.blocks = blocks
+        self.timeLimit = time_limit
+        self.population = population
+        self.density = density
+        self.mutation = mutation
+        self.descents = descents
+        self.random = np.random.RandomState(seed)
+        self.tol = tol
+        self.generations = 0
+        self.penalty = None
+        self.stopped = False
+
+        # SOS1 sets of binary columns are rows Σ x ≤ 1
+        rows = model.sos1_rows()
+        num_rows, num_cols = rows.shape
+        entry_cols = np.repeat(np.arange(num_cols), np.diff(rows.colStarts))
+        # columns x rows, i.e. the meal x nutrient orientation
+        self.matrix = np.zeros((num_cols, num_rows))
+        np.add.at(self.matrix, (entry_cols, rows.rowIndex), rows.values)
+        self.rowLower, self.rowUpper = rows.row_bounds()
+        self.scale = np.maximum(1.0, np.abs(rows.rhs))
+        # fixed columns (lower == upper) keep their value
+        self.free = model.lower != model.upper
+        self.blockColumns = [] if blocks is None else [np.flatnonzero(blocks == k) for k in np.unique(blocks)]
+
+    def _penalty(self, activity):
+        """Scaled violation of each row, activity is (... x rows)"""
+        return SparseModel.row_violation(activity, self.rowLower, self.rowUpper, self.scale)
+
+    def fitness(self, genomes):
+        """Penalty of each plan of a population (plans x columns)"""
+        return self._penalty(genomes.dot(self.matrix)).sum(axis=1)
+
+    def _descent(self, genome, max_moves=100):
+        """Makes the move with the largest decrease of the penalty as long as there
+        is one. Moves are flips of one bit and, within a block, swaps of a 1 and a
+        0 bit (e.g. exchanging a meal of a day). All moves are evaluated at once as
+        (moves x rows) activities."""
+        genome = genome.copy()
+        activity = genome.dot(self.matrix)
+        current = self._penalty(activity).sum()
+        for _ in range(max_moves):
+            if current <= self.tol:
+                break
+            direction = np.where(genome, -1.0, 1.0)
+            flipped = self._penalty(activity + self.matrix * direction[:, None]).sum(axis=1)
+            flipped[~self.free] = np.inf
+            move, value = (int(np.argmin(flipped)),), flipped.min()
+
+            for block in self.blockColumns:
+                ones = block[genome[block] & self.free[block]]
+                zeros = block[~genome[block] & self.free[block]]
+                if not len(ones) or not len(zeros):
+                    continue
+                swapped = self._penalty(activity - self.matrix[ones][:, None, :] +
+                                        self.matrix[zeros][None, :, :]).sum(axis=2)
+                k = int(np.argmin(swapped))
+                if swapped.flat[k] < value:
+                    move, value = (ones[k // len(zeros)], zeros[k % len(zeros)]), swapped.flat[k]
+
+            if value >= current - self.tol:
+                break
+            for j in move:
+                activity += self.matrix[j] * direction[j]
+                genome[j] = not genome[j]
+            current = value
+        return genome
+
+    def _crossover(self, first, second):
+        if self.blocks is None:
+            take = self.random.rand(*first.shape) < 0.5
+        else:
+            block_ids = np.unique(self.blocks)
+            choice = self.random.rand(len(first), len(block_ids)) < 0.5
+            take = choice[:, np.searchsorted(block_ids, self.blocks)]
+        return np.where(take, first, second)
+
+    def _mutate(self, genomes):
+        flip = self.random.rand(*genomes.shape) < self.mutation / float(genomes.shape[1])
+        return genomes ^ (flip & self.free)
+
+    def search(self, start=None):
+        """Runs the evolutionary search.
+
+        :param start: None or bool array of a plan that is added to the initial population
+        :return: best plan (bool array), its penalty
+        """
+        deadline = time.time() + self.timeLimit
+        num_cols = len(self.model.lower)
+        fixed = self.model.lower.astype(bool)
+        genomes = np.where(self.free, self.random.rand(self.population, num_cols) < self.density, fixed)
+        if start is not None:
+            genomes[0] = start
+        genomes[0] = self._descent(genomes[0])
+        penalty = self.fitness(genomes)
+
+        while penalty.min() > self.tol and time.time() < deadline and not self.stopped:
+            self.generations += 1
+            # binary tournaments
+            contenders = self.random.randint(len(genomes), size=(2, 2 * self.population))
+            winners = np.where(penalty[contenders[0]] <= penalty[contenders[1]], contenders[0], contenders[1])
+            children = self._mutate(self._crossover(genomes[winners[::2]], genomes[winners[1::2]]))
+            child_penalty = self.fitness(children)
+            for best in np.argsort(child_penalty)[:self.descents].tolist():
+                children[best] = self._descent(children[best])
+            child_penalty = self.fitness(children)
+
+            genomes = np.vstack((genomes, children))
+            penalty = np.concatenate((penalty, child_penalty))
+            survivors = np.argsort(penalty, kind='mergesort')[:self.population]
+            genomes, penalty = genomes[survivors], penalty[survivors]
+
+        best = int(np.argmin(penalty))
+        self.penalty = float(penalty[best])
+        return genomes[best], self.penalty
+
+    def stop(self):
+        """Ends a running search (called from another thread) after the current generation"""
+        self.stopped = True
+
+    def solve(self, start=None):
+        """Searches a feasible plan and assigns it to the columns of the model. For
+        a model without objective a feasible plan is reported as Optimal, otherwise
+        the status is NotSolved.
+
+        :return: pulp status
+        """
+        begin = time.time()
+        genome, penalty = self.search(start=start)
+        status = pulp.LpStatusOptimal if penalty <= self.tol else pulp.LpStatusNotSolved
+        self.model.status = status
+        self.model.solution = genome.astype(float)
+        self.model.assign_solution()
+        if self.model.problem is not None:
+            self.model.problem.status = status
+            self.model.problem.solutionTime = time.time() - begin
+        return status
+
+
+class PortfolioSolver(object):
+    """Races several cbc configurations on the same SparseModel. Different
+    models are solved fastest with different settings, so each configuration
+    runs in its own cbc process at the same time (one thread waits for each),
+    optionally together with the EvolutionarySolver. The first proven result
+    (Optimal, Infeasible or Unbounded) wins and the other cbc processes are
+    killed. If none of them proves anything within its time limit, the best
+    incumbent is taken, i.e. the solution with the least violation and then
+    the best objective.
+    """
+
+    # options that are set on top of the solver, the first one is the solver as given
+    configurations = [
+        dict(),
+        dict(presolve=True),
+        dict(strong=10, options=['randomCbcSeed 1', 'randomSeed 1']),
+        dict(presolve=True, cuts=True),
+        dict(strong=20, options=['randomCbcSeed 2', 'randomSeed 2']),
+        dict(strong=None, options=['strong 0', 'randomCbcSeed 3', 'randomSeed 3'])
+    ]
+
+    def __init__(self, model, solver, configurations=None, blocks=None, evo_seconds=0, processes=None,
+                 tol=1e-6):
+        """
+        :param model: SparseModel
+        :param solver: instance of pulp.COIN_CMD (e.g. pulp.PULP_CBC_CMD), pulp.COIN_WORKER or
+                       pulp.CBC_DLL. Its path, time limit, log and warm start are used by all
+                       configurations, each of them runs cbc in a process of its own
+        :param configurations: list of dicts with options of pulp.COIN_CMD (presolve, strong,
+                               cuts, options, ...), PortfolioSolver.configurations if None
+        :param blocks: numpy array, block (e.g. day index) of each column for the EvolutionarySolver
+        :param evo_seconds: time limit of an EvolutionarySolver that races as well, 0 to race cbc
+                            only. It is left out if the model has other than binary columns.
+        :param processes: number of solvers that race, defaults to the number of cpus. The
+                          first configurations are used.
+        :param tol: tolerance for the scaled violation and the integrality of an incumbent
+        """
+        if isinstance(solver, pulp.CBC_DLL):
+            solver = solver.fallbackSolver()
+        self.model = model
+        self.solver = solver
+        self.blocks = blocks
+        self.evoSeconds = evo_seconds
+        self.tol = tol
+        self.binary = bool(np.all(model.integer) and np.all(model.lower >= 0) and np.all(model.upper <= 1))
+        processes = processes or multiprocessing.cpu_count()
+        if evo_seconds and self.binary:
+            processes -= 1
+        configurations = self.configurations if configurations is None else configurations
+        self.solvers = [self._configured(options) for options in configurations[:max(processes, 1)]]
+        self.evo = None
+        # (solver index, status, seconds) of the last solve in the order of the results
+        self.raceLog = []
+
+    def _configured(self, options):
+        """Copy of self.solver with options as a pulp.COIN_CMD, so that its cbc can be stopped"""
+        solver = self.solver
+        kwargs = dict(path=solver.path, keepFiles=solver.keepFiles, mip=solver.mip, msg=solver.msg,
+                      cuts=solver.cuts, presolve=solver.presolve, strong=solver.strong,
+                      options=solver.options, fracGap=solver.fracGap, maxSeconds=solver.maxSeconds,
+                      threads=solver.threads, warmStart=solver.warmStart, pipe=solver.pipe)
+        kwargs.update(options)
+        kwargs['options'] = list(solver.options) + list(options.get('options', []))
+        return pulp.COIN_CMD(**kwargs)
+
+    @staticmethod
+    def _race(index, run, results):
+        """Runs a solver of the portfolio in a thread and reports its result"""
+        status, solution = pulp.LpStatusUndefined, None
+        try:
+            status, solution = run()
+        except pulp.PulpSolverError:
+            # killed by the stopper
+            pass
+        finally:
+            results.put((index, status, solution))
+
+    def _run_cbc(self, solver, start, stopper):
+        # each solver writes status and solution to a copy of the model
+        model = copy.copy(self.model)
+        return model.run(solver, start=start, stopper=stopper), model.solution
+
+    def _run_evo(self):
+        genome, penalty = self.evo.search()
+        if penalty <= self.tol and not self.model.objective.any():
+            return pulp.LpStatusOptimal, genome.astype(float)
+        return pulp.LpStatusNotSolved, genome.astype(float)
+
+    def _rank(self, solution):
+        """Sort key of an incumbent: violation of rows and integrality, objective value"""
+        integer = solution[self.model.integer]
+        violation = self.model.violation(solution) + np.abs(integer - np.round(integer)).sum()
+        return violation > self.tol, self.model.sense * self.model.objective.dot(solution)
+
+    def solve(self):
+        """Races the solvers and assigns the winning solution to the columns of the model.
+
+        :return: pulp status
+        """
+        begin = time.time()
+        start = None
+        if self.solver.warmStart:
+            start = [(j, variable.varValue) for j, variable in enumerate(self.model.columns)
+                     if variable.varValue is not None]
+        # per solve, so that the results and kills of an earlier solve do not leak into this one
+        results = Queue.Queue()
+        stopper = pulp.CbcStopper()
+        self.raceLog = []
+        racers = [lambda solver=solver: self._run_cbc(solver, start, stopper) for solver in self.solvers]
+        if self.evoSeconds and self.binary:
+            self.evo = EvolutionarySolver(model=self.model, blocks=self.blocks, time_limit=self.evoSeconds,
+                                          tol=self.tol)
+            racers.append(self._run_evo)
+        threads = [threading.Thread(target=self._race, args=(index, run, results))
+                   for index, run in enumerate(racers)]
+        for thread in threads:
+            thread.start()
+
+        winner = None
+        incumbents = []
+        try:
+            for _ in threads:
+                index, status, solution = results.get()
+                self.raceLog.append((index, pulp.LpStatus[status], time.time() - begin))
+                if status in (pulp.LpStatusOptimal, pulp.LpStatusInfeasible, pulp.LpStatusUnbounded):
+                    winner = status, solution
+                    break
+                if solution is not None:
+                    incumbents.append((self._rank(solution), status, solution))
+        finally:
+            stopper.stop()
+            if self.evo is not None:
+                self.evo.stop()
+            for thread in threads:
+                thread.join()
+
+        if winner is None and incumbents:
+            _, status, solution = min(incumbents, key=lambda incumbent: incumbent[0])
+            winner = status, solution
+        status, solution = winner or (pulp.LpStatusNotSolved, None)
+        if solution is None:
+            solution = np.zeros(len(self.model.lower))
+
+        self.model.status = status
+        self.model.solution = solution
+        self.model.assign_solution()
+        if self.model.problem is not None:
+            self.model.problem.status = status
+            self.model.problem.solutionTime = time.time() - begin
+        return status
+
+
+Skeleton = collections.namedtuple('Skeleton', ['model', 'layout', 'rows', 'bound_rows'])
+
+
+class ModelCache(object):
+    """LRU cache for compiled model structures (Skeleton). An instance lives
+    as long as the (warm) Lambda container, so its size is limited to
+    'maxsize' entries.
+    """
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
 
+    def get(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._entries[key] = entry
+        return entry
 
+    def put(self, key, entry):
+        self._entries.pop(key, None)
+        self._entries[key] = entry
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
 
 
 class Evaluator(object):
@@ -0,0 +1,176 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.18
+
+Benchmark for formulations of the generate model. The model is set up
+with the Modeller just like in GenerateManager, but with random candidate
+meals so that no database is needed. Every variant is solved by cbc from
+the same MPS file and the number of enumerated nodes and the solve time
+are taken from the cbc log.
+
+Run from the root of the repository:
+
+    python -m other.benchmark [cross_counter] [symmetry] [sos]
+
+@author: L.We
+"""
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import pulp
+
+import params
+import constants as c
+from optimizationtools import Modeller
+
+CONTAINERS = ['BF', 'LU', 'DI', 'SN']
+
+
+def random_meals(num, seed):
+    """Returns random candidate meals in the format of ModelManager.meals.
+
+    :param num: number of optional meals per container
+    :param seed: seed for random
+    :return: meals, macro_bounds, micro_bounds, splitted_macro_bounds (for 1 day)
+    """
+    rnd = random.Random(seed)
+    nutrients = sorted(params.nutrientList)
+    base = {n: rnd.uniform(50, 500) for n in nutrients}
+    meals = {}
+    i = 0
+    for container_key in CONTAINERS:
+        meals[container_key] = []
+        preferences = [('optional', num)]
+        if container_key == 'BF':
+            preferences.insert(0, ('obligatory', 6))
+        for preference, n in preferences:
+            content = {}
+            for _ in range(n):
+                i += 1
+                meal = {nut: 0.0 if rnd.random() < 0.1 else base[nut] * rnd.uniform(0.3, 1.7)
+                        for nut in nutrients}
+                meal['GCAL'] = rnd.uniform(300, 800) if container_key != 'SN' else rnd.uniform(100, 300)
+                meal['NAME'] = 'M%04d' % i
+                meal['DES'] = ''
+                content['M%04d' % i] = meal
+            meals[container_key].append({'preference': preference, 'meals': content})
+
+    all_meals = [meal for container in meals.itervalues() for item in container for meal in item['meals'].itervalues()]
+    avg = {n: sum(meal[n] for meal in all_meals) / len(all_meals) for n in nutrients}
+    macro_bounds = {n: {c.LB: avg[n] * 2.5, c.UB: avg[n] * 4.5} for n in params.nutrientsMacroList}
+    macro_bounds['GCAL'] = {c.LB: 1400, c.UB: 2000}
+    micro_bounds = {n: {c.LB: avg[n] * 2.5, c.UB: avg[n] * 4.5}
+                    for n in params.nutrientList - params.nutrientsMacroList}
+    splitted_macro_bounds = {ck: {'GCAL': {c.LB: 300, c.UB: 800}} for ck in ['BF', 'LU', 'DI']}
+    return meals, macro_bounds, micro_bounds, splitted_macro_bounds
+
+
+def build(days, meals, macro_bounds, micro_bounds, splitted_macro_bounds, cross_counter=None, symmetry=None,
+          sos=False, **kwargs):
+    """Sets up the generate model.
+
+    :param cross_counter: None or formulation for set_cross_counter_and_constraint
+    :param symmetry: passed to Modeller
+    :param sos: passed to Modeller
+    :param kwargs: passed to set_cross_counter_and_constraint
+    :return: Modeller
+    """
+    week_bounds = {n: {c.LB: b[c.LB] * len(days), c.UB: b[c.UB] * len(days)}
+                   for n, b in micro_bounds.iteritems()}
+    modeller = Modeller(
+        model=pulp.LpProblem('generate'),
+        days=days,
+        bounds=week_bounds,
+        vectorized=True,
+        symmetry=symmetry,
+        sos=sos
+    )
+    modeller.set_meals(meals=meals, needs=splitted_macro_bounds)
+    modeller.set_global(needs=macro_bounds)
+    if cross_counter:
+        modeller.set_cross_counter_and_constraint(formulation=cross_counter, **kwargs)
+    return modeller
+
+
+def run_cbc(model, time_out=120):
+    """Solves a SparseModel with the cbc binary and parses its log.
+
+    :return: dict with status, nodes, seconds (wallclock), objective
+    """
+    solver = pulp.PULP_CBC_CMD() if pulp.PULP_CBC_CMD().available() else pulp.COIN_CMD()
+    mps = tempfile.mktemp(suffix='.mps')
+    model.write_mps(mps)
+    start = time.time()
+    try:
+        log = subprocess.check_output([solver.path, mps, 'sec', str(time_out), 'presolve', 'off', 'branch'])
+    finally:
+        os.remove(mps)
+    seconds = time.time() - start
+    status = re.search(r'Result - (.*)', log)
+    nodes = re.search(r'Enumerated nodes:\s+(\d+)', log)
+    objective = re.search(r'Objective value:\s+(\S+)', log)
+    return dict(
+        status=status.group(1).strip() if status else 'unknown',
+        nodes=int(nodes.group(1)) if nodes else 0,
+        seconds=seconds,
+        objective=float(objective.group(1)) if objective else None
+    )
+
+
+def compare(variants, num_days=7, num_meals=40, seeds=(1, 2, 3), time_out=120):
+    """Builds and solves the model for every variant and seed and prints
+    nodes and seconds.
+
+    :param variants: list of (label, dict of kwargs for build)
+    """
+    days = ['2018-01-%02d' % (d + 1) for d in range(num_days)]
+    print '%-20s %5s %8s %8s  %s' % ('variant', 'seed', 'nodes', 'seconds', 'result')
+    for seed in seeds:
+        data = random_meals(num=num_meals, seed=seed)
+        for label, kwargs in variants:
+            modeller = build(days, *data, **kwargs)
+            result = run_cbc(modeller.compile(), time_out=time_out)
+            print '%-20s %5d %8d %8.2f  %s' % (label, seed, result['nodes'], result['seconds'], result['status'])
+
+
+def benchmark_cross_counter():
+    """Compares the formulations of the CrossCounter constraints."""
+    compare([
+        (formulation, dict(cross_counter=formulation, lb=5, ub=60))
+        for formulation in ('big_m', 'bound', 'disaggregated')
+    ])
+
+
+def benchmark_symmetry():
+    """Compares the generate model with and without symmetry breaking."""
+    compare([
+        (str(symmetry), dict(cross_counter='bound', lb=5, ub=60, symmetry=symmetry))
+        for symmetry in (None, 'GCAL', 'index')
+    ])
+
+
+def benchmark_sos():
+    """Compares the generate model with and without SOS1 sets for the obligatory meals."""
+    compare([
+        ('sos=%s' % sos, dict(cross_counter='bound', lb=5, ub=60, sos=sos))
+        for sos in (False, True)
+    ])
+
+
+benchmarks = {
+    'cross_counter': benchmark_cross_counter,
+    'symmetry': benchmark_symmetry,
+    'sos': benchmark_sos
+}
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or sorted(benchmarks):
+        print name
+        benchmarks[name]()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.18
+
+Tests for the generate model of optimizationtools. The models are set up
+with random candidate meals (see other.benchmark), so that no database is
+needed, and solved by cbc. A test raises AssertionError if it fails.
+
+Run from the root of the repository:
+
+    python -m other.modeltests
+
+@author: L.We
+"""
+import copy
+import random
+import threading
+
+import numpy as np
+import pulp
+
+from other.benchmark import random_meals
+import constants as c
+import params
+from optimizationtools import Modeller, ModelCache, LagrangianSolver, EvolutionarySolver, PortfolioSolver
+
+DAYS = ['2018-01-%02d' % (d + 1) for d in range(3)]
+
+
+def check(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+def cbc():
+    return pulp.PULP_CBC_CMD(msg=0) if pulp.PULP_CBC_CMD().available() else pulp.COIN_CMD(msg=0)
+
+
+def build(meals, macro_bounds, micro_bounds, splitted_macro_bounds, days=DAYS, **kwargs):
+    """Sets up the generate model like GenerateManager.
+
+    :param kwargs: passed to Modeller
+    :return: Modeller
+    """
+    week_bounds = {n: {c.LB: b[c.LB] * len(days), c.UB: b[c.UB] * len(days)}
+                   for n, b in micro_bounds.iteritems()}
+    kwargs.setdefault('vectorized', True)
+    modeller = Modeller(model=pulp.LpProblem('generate'), days=days, bounds=week_bounds, **kwargs)
+    modeller.set_meals(meals=meals, needs=splitted_macro_bounds)
+    modeller.set_global(needs=macro_bounds)
+    return modeller
+
+
+def same_model(first, second):
+    """True if two compiled models have the same matrix, bounds and right hand sides"""
+    return all(np.array_equal(getattr(first, name), getattr(second, name))
+               for name in ('colStarts', 'rowIndex', 'values', 'lower', 'upper', 'rhs', 'ranges'))
+
+
+def weighted(modeller, model):
+    """Sets a random objective with a fixed weight for each day, container and meal"""
+    weight = {}
+    for day, day_plan in modeller.variable.iteritems():
+        for container_key, container in day_plan.iteritems():
+            for meal_key, variable in container.iteritems():
+                weight[variable] = random.Random(day + container_key + meal_key).random()
+    model.objective = np.array([weight.get(variable, 0.0) for variable in model.columns])
+
+
+def solution(model):
+    """Values of the columns (including the ones fixed by presolve)"""
+    return np.array([variable.varValue for variable in model.columns])
+
+
+def modelTest010():
+    """
+    Test that the cache is not hit by the same meals with other nutrient values
+    """
+    data = random_meals(num=10, seed=1)
+    cache = ModelCache()
+    build(*data, cache=cache).compile()
+    check(len(cache) == 1, 'model not cached')
+    cached = build(*data, cache=cache).compile()
+    check(len(cache) == 1 and same_model(cached, build(*data).compile()), 'cached model differs')
+
+    changed = copy.deepcopy(data)
+    for container in changed[0].itervalues():
+        for item in container:
+            for meal in item['meals'].itervalues():
+                meal['GCAL'] *= 2
+    model = build(*changed, cache=cache).compile()
+    check(len(cache) == 2, 'cache hit for other nutrient values')
+    check(same_model(model, build(*changed).compile()), 'model differs from a fresh build')
+
+
+def modelTest020():
+    """
+    Test that a presolved model has the same optimum as the original one
+    """
+    data = random_meals(num=10, seed=2)
+    # cannot fit the GCAL window of BF, presolve fixes it
+    data[0]['BF'][-1]['meals']['M0007']['GCAL'] = 5000
+    modeller = build(*data)
+    model = modeller.compile()
+    weighted(modeller, model)
+    check(model.solve(cbc()) == pulp.LpStatusOptimal, 'not solved')
+    x = solution(model)
+
+    presolved = model.presolve()
+    check(presolved.presolveLog['columns'], 'nothing fixed by presolve')
+    check(len(presolved.lower) < len(model.lower), 'no column removed')
+    check(presolved.solve(cbc()) == pulp.LpStatusOptimal, 'presolved model not solved')
+    y = solution(model)
+    check(model.violation(y) <= 1e-6, 'presolved solution is infeasible')
+    check(abs(model.objective.dot(x) - model.objective.dot(y)) <= 1e-6, 'presolved optimum differs')
+
+
+def modelTest030():
+    """
+    Test the decomposition of the week by days (LagrangianSolver)
+    """
+    for processes in (1, 2):
+        modeller = build(*random_meals(num=10, seed=3))
+        model = modeller.compile()
+        blocks = modeller.day_blocks(model)
+        check(sorted(set(blocks.tolist())) == range(len(DAYS)), 'columns not in a day block')
+        solver = LagrangianSolver(model=model, blocks=blocks, solver=cbc(), processes=processes)
+        check(solver.solve() == pulp.LpStatusOptimal, 'not solved')
+        check(model.violation(solution(model)) <= 1e-6, 'solution is infeasible')
+        check(solver.iterationLog, 'no subgradient iteration')
+
+
+def modelTest040():
+    """
+    Test the heuristic search of a plan (EvolutionarySolver)
+    """
+    modeller = build(*random_meals(num=10, seed=4))
+    model = modeller.compile()
+    evo = EvolutionarySolver(model=model, blocks=modeller.day_blocks(model), time_limit=30, seed=0)
+    check(evo.solve() == pulp.LpStatusOptimal, 'no feasible plan found')
+    x = solution(model)
+    check(np.array_equal(x, np.round(x)), 'plan is not binary')
+    check(model.violation(x) <= 1e-6, 'plan is infeasible')
+    check(modeller.plan(model, model.solution), 'empty plan')
+
+
+def modelTest050():
+    """
+    Test that the plans of a solution pool are feasible and distinct
+    """
+    modeller = build(*random_meals(num=10, seed=5))
+    model = modeller.compile()
+    solutions = model.solve_pool(cbc(), size=3, distance=2)
+    check(len(solutions) == 3, 'pool is not full')
+    for i, x in enumerate(solutions):
+        check(model.violation(x) <= 1e-6, 'plan %d is infeasible' % i)
+        for y in solutions[:i]:
+            check(np.abs(x - y).sum() >= 2 - 1e-6, 'plans differ in less than 2 meals')
+    check(np.array_equal(solution(model), solutions[0]), 'first plan is not assigned')
+    plans = [modeller.plan(model, x) for x in solutions]
+    check(all(plan != plans[0] for plan in plans[1:]), 'same plan twice')
+
+
+def modelTest060():
+    """
+    Test that a model edited by add_meals/remove_meals gives the plan of a fresh build
+    """
+    data = random_meals(num=10, seed=6)
+    lunch = data[0]['LU'][0]['meals']
+    added = dict((meal_key, lunch[meal_key]) for meal_key in sorted(lunch)[:3])
+    removed = sorted(data[0]['DI'][0]['meals'])[:2]
+
+    smaller = copy.deepcopy(data)
+    for meal_key in added:
+        del smaller[0]['LU'][0]['meals'][meal_key]
+    edited = build(*smaller)
+    model = edited.compile()
+    edited.add_meals('LU', copy.deepcopy(added))
+    edited.remove_meals('DI', removed)
+    check(edited.compile() is not model, 'compiled model not updated')
+
+    for meal_key in removed:
+        del data[0]['DI'][0]['meals'][meal_key]
+    fresh = build(*data)
+    plans = []
+    for modeller in (edited, fresh):
+        model = modeller.compile()
+        weighted(modeller, model)
+        check(model.solve(cbc()) == pulp.LpStatusOptimal, 'not solved')
+        plans.append(modeller.plan(model, model.solution))
+        # the LpProblem is edited in place as well
+        check(modeller.model.solve(cbc()) == pulp.LpStatusOptimal, 'LpProblem not solved')
+        check(model.violation(solution(model)) <= 1e-6, 'solution of the LpProblem is infeasible')
+    check(plans[0] == plans[1], 'plans differ')
+
+
+def modelTest070():
+    """
+    Test the race of cbc configurations (PortfolioSolver), solved twice
+    """
+    modeller = build(*random_meals(num=10, seed=7))
+    model = modeller.compile()
+    weighted(modeller, model)
+    check(model.solve(cbc()) == pulp.LpStatusOptimal, 'not solved')
+    best = model.objective.dot(solution(model))
+
+    threads = threading.active_count()
+    portfolio = PortfolioSolver(model=model, solver=cbc(), blocks=modeller.day_blocks(model),
+                                evo_seconds=5, processes=3)
+    for _ in range(2):
+        check(portfolio.solve() == pulp.LpStatusOptimal, 'not solved by the portfolio')
+        x = solution(model)
+        check(model.violation(x) <= 1e-6, 'solution is infeasible')
+        check(abs(model.objective.dot(x) - best) <= 1e-6, 'optimum differs')
+        check(1 <= len(portfolio.raceLog) <= 3, 'race log not of this solve')
+        check(threading.active_count() == threads, 'racer still running')
+
+
+def modelTest080():
+    """
+    Test that a MIP start keeps no values of an earlier solve
+    """
+    modeller = build(*random_meals(num=10, seed=8))
+    modeller.set_cross_counter_and_constraint(lb=0, ub=100)
+    model = modeller.compile()
+    weighted(modeller, model)
+    check(model.solve(cbc()) == pulp.LpStatusOptimal, 'not solved')
+    plan = modeller.plan(model, model.solution)
+
+    check(modeller.set_start({DAYS[0]: plan[DAYS[0]]}) > 0, 'no meal in the start')
+    started = set(modeller.variable[DAYS[0]][container_key][meal_key]
+                  for container_key in modeller.variable[DAYS[0]]
+                  for meal_key in modeller.variable[DAYS[0]][container_key])
+    for variable in modeller.model.variables():
+        if variable in started:
+            check(variable.varValue in (0, 1), 'meal of the start not set')
+        else:
+            check(variable.varValue is None, 'value of the earlier solve in the start')
+    solver = cbc()
+    solver.warmStart = True
+    check(model.solve(solver) == pulp.LpStatusOptimal, 'not solved with the start')
+
+
+def modelTest090():
+    """
+    Test that regenerating a container or a meal without objective gives other meals
+    """
+    day = DAYS[0]
+    modeller = build(*random_meals(num=10, seed=9))
+    model = modeller.compile()
+    check(model.solve(cbc()) == pulp.LpStatusOptimal, 'not solved')
+    current = modeller.plan(model, model.solution)[day]
+
+    # the whole container, the stored meals are even passed as start
+    check(modeller.exclude_plan({day: {'LU': current['LU']}}) == 1, 'no row added')
+    modeller.set_start({day: current})
+    solver = cbc()
+    solver.warmStart = True
+    model = modeller.compile()
+    check(model.solve(solver) == pulp.LpStatusOptimal, 'container not regenerated')
+    plan = modeller.plan(model, model.solution)[day]
+    check(sorted(plan['LU']) != sorted(current['LU']), 'same container again')
+
+    # a single meal
+    meal_key = current['DI'][0]
+    check(modeller.remove_meals('DI', [meal_key]), 'meal not removed')
+    model = modeller.compile()
+    check(model.solve(cbc()) == pulp.LpStatusOptimal, 'meal not regenerated')
+    check(meal_key not in modeller.plan(model, model.solution)[day].get('DI', []), 'same meal again')
+
+
+def modelTest100():
+    """
+    Test a container with two obligatory items, with and without SOS1 sets
+    """
+    data = random_meals(num=10, seed=10)
+    breakfast = data[0]['BF']
+    optional = breakfast[-1]['meals']
+    second = dict((meal_key, optional.pop(meal_key)) for meal_key in sorted(optional)[:4])
+    for meal in second.itervalues():
+        # both items fit into the GCAL window of BF
+        meal['GCAL'] = 100
+    breakfast.append({'preference': 'obligatory', 'meals': second})
+    items = [set(item['meals']) for item in breakfast if item['preference'] == 'obligatory']
+    for sos in (False, True):
+        modeller = build(*data, sos=sos)
+        model = modeller.compile()
+        check(len(model.sos1) == (2 * len(DAYS) if sos else 0), 'not one SOS1 set per item')
+        check(model.solve(cbc()) == pulp.LpStatusOptimal, 'not solved')
+        plan = modeller.plan(model, model.solution)
+        for day in DAYS:
+            for meal_keys in items:
+                chosen = meal_keys.intersection(plan[day]['BF'])
+                check(len(chosen) == 1 if sos else chosen, 'obligatory item not chosen')
+
+
+def modelTest110():
+    """
+    Test that the loop and the vectorized Modeller build the same rows for a
+    container without candidates and a regenerated meal (add_meal)
+    """
+    meals, macro_bounds, micro_bounds, splitted_macro_bounds = random_meals(num=10, seed=11)
+    meals['LU'][0]['meals'] = {}
+    add_meal = dict((n, {'VAL': 50.0}) for n in params.nutrientList)
+    week_bounds = {n: {c.LB: b[c.LB] * len(DAYS), c.UB: b[c.UB] * len(DAYS)}
+                   for n, b in micro_bounds.iteritems()}
+    rows = []
+    for vectorized in (False, True):
+        modeller = Modeller(model=pulp.LpProblem('regenerate'), days=DAYS, bounds=week_bounds,
+                            vectorized=vectorized)
+        modeller.set_meals(meals=meals, needs=splitted_macro_bounds, add_meal=add_meal)
+        modeller.set_global(needs=macro_bounds)
+        rows.append(sorted(modeller.model.constraints))
+    check(any('_LU_GCAL' in name for name in rows[0]), 'local GCAL row of the empty container missing')
+    check(rows[0] == rows[1], 'rows differ')
+
+
+tests = [
+    modelTest010,
+    modelTest020,
+    modelTest030,
+    modelTest040,
+    modelTest050,
+    modelTest060,
+    modelTest070,
+    modelTest080,
+    modelTest090,
+    modelTest100,
+    modelTest110
+]
+
+
+def modelTestAll():
+    for test in tests:
+        print test.__doc__.strip()
+        test()
+    print '* all model tests passed.'
+
+
+if __name__ == '__main__':
+    modelTestAll()
@@ -34,8 +34,9 @@ EPS = 1e-7
 LpContinuous = "Continuous"
 LpInteger = "Integer"
 LpBinary = "Binary"
+LpSemiContinuous = "SemiContinuous"
 LpCategories = {LpContinuous: "Continuous", LpInteger: "Integer",
-                LpBinary: "Binary"}
+                LpBinary: "Binary", LpSemiContinuous: "SemiContinuous"}
 
 # objective sense
 LpMinimize = 1
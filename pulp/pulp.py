@@ -97,14 +97,20 @@ import types
 import string
 import itertools
 import warnings
+from array import array
 
 from .constants import *
 from .solvers import *
-from collections import Iterable
+from collections import Iterable, Mapping
 
 import logging
 log = logging.getLogger(__name__)
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 try:  # allow Python 2/3 compatibility
     maketrans = str.maketrans
 except AttributeError:
@@ -156,17 +162,104 @@ elif COIN_CMD().available():
 else:
     LpSolverDefault = None
 
+class _LazyValue(object):
+    """Attribute of a solution value that LpProblem.assignSolution assigns
+    in bulk as (array, index): the value is taken from the array when it is
+    read the first time, setting the attribute replaces it
+    """
+    def __init__(self, name):
+        self.name = name
+        self.lazyName = "_lazy_" + name
+
+    def __get__(self, obj, objtype = None):
+        if obj is None:
+            return self
+        d = obj.__dict__
+        lazy = d.get(self.lazyName)
+        if lazy is None:
+            raise AttributeError(self.name)
+        values, i = lazy
+        value = d[self.name] = float(values[i])
+        d.pop(self.lazyName, None)
+        return value
+
+    @staticmethod
+    def assign(objects, name, values):
+        """sets the attribute name of objects[i] lazily to values[i]"""
+        lazyName = "_lazy_" + name
+        for i, obj in enumerate(objects):
+            d = obj.__dict__
+            d.pop(name, None)
+            d[lazyName] = (values, i)
+
+class LpNames(object):
+    """Names of elements that are only built when a name is read (LP files,
+    debugging), an element created with an LpNames instance as name holds
+    just this shared instance instead of a string. function() returns the
+    (element, name) pairs of the elements it knows, they are all named at
+    once when the first name is read. An element that is not among them gets
+    prefix followed by a number
+
+    >>> names = LpNames(lambda: [(x, "x_1")])
+    >>> x = LpVariable(names)
+    >>> x.name
+    'x_1'
+    """
+    def __init__(self, function, prefix = "_V"):
+        self.function = function
+        self.prefix = prefix
+        self.count = 0
+
+    def resolve(self, element):
+        for other, name in self.function():
+            if other.getRawName() is self:
+                other.name = name
+        if element.getRawName() is self:
+            self.count += 1
+            element.name = "%s%d" % (self.prefix, self.count)
+
+class _NormalisedNames(Mapping):
+    """The variable names of LpProblem.normalisedNames, name -> X%07d name
+    of the columns vs. The mapping is only built when it is read, so that
+    writing a renamed mps file does not build names of an LpNames
+    """
+    def __init__(self, vs):
+        self.vs = vs
+        self.names = None
+
+    def mapping(self):
+        if self.names is None:
+            self.names = dict((v.name, "X%07d" % i)
+                              for i, v in enumerate(self.vs))
+        return self.names
+
+    def __getitem__(self, name):
+        return self.mapping()[name]
+
+    def __iter__(self):
+        return iter(self.mapping())
+
+    def __len__(self):
+        return len(self.mapping())
+
 class LpElement(object):
     """Base class for LpVariable and LpConstraintVar
     """
     #to remove illegal characters from the names
     trans = maketrans("-+[] ->/","________")
     def setName(self,name):
-        if name:
+        if isinstance(name, LpNames):
+            self.__name = name
+        elif name:
             self.__name = str(name).translate(self.trans)
         else:
             self.__name = None
     def getName(self):
+        if isinstance(self.__name, LpNames):
+            self.__name.resolve(self)
+        return self.__name
+    def getRawName(self):
+        """the name or the LpNames instance, if it is not resolved yet"""
         return self.__name
     name = property(fget = getName,fset = setName)
 
@@ -248,11 +341,15 @@ class LpVariable(LpElement):
         Default is negative infinity
     :param upBound: The upper bound on this variable's range.
         Default is positive infinity
-    :param cat: The category this variable is in, Integer, Binary or
-        Continuous(default)
+    :param cat: The category this variable is in, Integer, Binary,
+        SemiContinuous or Continuous(default). A SemiContinuous variable is
+        either 0 or within its bounds, it needs an upper bound
     :param e: Used for column based modelling: relates to the variable's
         existence in the objective function and constraints
     """
+    varValue = _LazyValue("varValue")
+    dj = _LazyValue("dj")
+
     def __init__(self, name, lowBound = None, upBound = None,
                   cat = LpContinuous, e = None):
         LpElement.__init__(self,name)
@@ -268,6 +365,8 @@ class LpVariable(LpElement):
             self.lowBound = 0
             self.upBound = 1
             self.cat = LpInteger
+        if cat == LpSemiContinuous and upBound is None:
+            raise PulpError("SemiContinuous variable %s needs an upper bound" % self.name)
         if e:
             self.add_expression(e)
 
@@ -421,6 +520,8 @@ class LpVariable(LpElement):
 
     def valid(self, eps):
         if self.varValue == None: return False
+        if self.cat == LpSemiContinuous and abs(self.varValue) <= eps:
+            return True
         if self.upBound != None and self.varValue > self.upBound + eps:
             return False
         if self.lowBound != None and self.varValue < self.lowBound - eps:
@@ -431,6 +532,8 @@ class LpVariable(LpElement):
 
     def infeasibilityGap(self, mip = 1):
         if self.varValue == None: raise ValueError("variable value is None")
+        if self.cat == LpSemiContinuous and self.varValue == 0:
+            return 0
         if self.upBound != None and self.varValue > self.upBound:
             return self.varValue - self.upBound
         if self.lowBound != None and self.varValue < self.lowBound:
@@ -439,6 +542,9 @@ class LpVariable(LpElement):
             return round(self.varValue) - self.varValue
         return 0
 
+    def isSemiContinuous(self):
+        return self.cat == LpSemiContinuous
+
     def isBinary(self):
         return self.cat == LpInteger and self.lowBound == 0 and self.upBound == 1
 
@@ -494,8 +600,10 @@ class LpVariable(LpElement):
     def setInitialValue(self,val):
         """sets the initial value of the Variable to val
         may of may not be supported by the solver
+        (COIN_CMD uses it with warmStart = True)
         """
-        raise NotImplementedError
+        self.varValue = val
+        return True
 
 
 class LpAffineExpression(_DICT_TYPE):
@@ -830,34 +938,250 @@ class LpAffineExpression(_DICT_TYPE):
             e.constant = other / c
         return e
 
+    def _compare(self, other, sense):
+        if isNumber(other):
+            # one copy of the terms instead of two for self - other
+            return LpConstraint(self, sense, rhs=other - self.constant)
+        return LpConstraint(self - other, sense)
+
     def __le__(self, other):
-        return LpConstraint(self - other, LpConstraintLE)
+        return self._compare(other, LpConstraintLE)
 
     def __ge__(self, other):
-        return LpConstraint(self - other, LpConstraintGE)
+        return self._compare(other, LpConstraintGE)
 
     def __eq__(self, other):
-        return LpConstraint(self - other, LpConstraintEQ)
+        return self._compare(other, LpConstraintEQ)
+
+class LpArrayExpression(LpAffineExpression):
+    """
+    A linear combination built in bulk from parallel buffers: a table of
+    variables and, for each term, the index of its variable in the table and
+    its coefficient. Terms of the same variable are summed and zero
+    coefficients are dropped on the buffers (numpy arrays if numpy is
+    available, array.array otherwise) before the terms are stored in one
+    pass, so the expression is used like any LpAffineExpression, e.g. in
+    LpConstraint, writeMPS and writeLP.
+
+    The buffers are kept in variables, indices and coefs and are reset to
+    None as soon as the expression is changed in place.
+
+    Being a subclass, an LpArrayExpression on the right hand side of a
+    comparison with an LpAffineExpression gets the reflected comparison,
+    i.e. a <= b with b an LpArrayExpression becomes b >= a. lpSum and lpDot
+    take the same bulk path but return plain LpAffineExpressions.
+
+    Examples:
+
+       >>> x = [LpVariable('x_%d' % i) for i in range(3)]
+       >>> LpArrayExpression(x, [1, 0, 4], constant=2)
+       1.0*x_0 + 4.0*x_2 + 2
+       >>> LpArrayExpression(x, [1, -3, 2], indices=[0, 2, 0])
+       3.0*x_0 + -3.0*x_2 + 0
+    """
+    def __init__(self, variables, coefs, indices=None, constant=0, name=None):
+        """
+        :param variables: sequence of LpVariables
+        :param coefs: sequence of coefficients, one for each term
+        :param indices: sequence of indices into variables, one for each term,
+                        defaults to one term for each variable
+        :param constant: the constant of the expression
+        :param name: name of the expression
+        """
+        if indices is None:
+            variables, indices = _distinctTable(variables)
+        indices, coefs = _compressTerms(len(variables), indices, coefs)
+        LpAffineExpression.__init__(self, list(zip([variables[i] for i in indices], coefs)),
+                                    constant=constant, name=name)
+        self.variables = variables
+        self.indices = indices
+        self.coefs = coefs
+
+    @classmethod
+    def fromSum(cls, vector):
+        """
+        Returns the sum of a (nested) list or tuple of LpArrayExpressions,
+        LpElements and numbers as LpArrayExpression, or None if the vector
+        holds anything else. The tables of the summands are merged, so the
+        terms of a variable in several summands are summed.
+        """
+        terms = _sumTerms(vector)
+        if terms is None:
+            return None
+        variables, coefs, indices, constant = terms
+        return cls(variables, coefs, indices=indices, constant=constant)
+
+    def _changed(self):
+        """the terms are changed in place, the buffers no longer match them"""
+        self.variables = self.indices = self.coefs = None
+
+    def addInPlace(self, other):
+        self._changed()
+        return LpAffineExpression.addInPlace(self, other)
+
+    def subInPlace(self, other):
+        self._changed()
+        return LpAffineExpression.subInPlace(self, other)
+
+    def addterm(self, key, value):
+        self._changed()
+        LpAffineExpression.addterm(self, key, value)
+
+    def __setitem__(self, key, value):
+        self._changed()
+        LpAffineExpression.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._changed()
+        LpAffineExpression.__delitem__(self, key)
+
+    def pop(self, *args):
+        self._changed()
+        return LpAffineExpression.pop(self, *args)
+
+    def popitem(self, *args):
+        self._changed()
+        return LpAffineExpression.popitem(self, *args)
+
+    def setdefault(self, *args):
+        self._changed()
+        return LpAffineExpression.setdefault(self, *args)
+
+    def update(self, *args, **kwargs):
+        self._changed()
+        LpAffineExpression.update(self, *args, **kwargs)
+
+    def clear(self):
+        self._changed()
+        LpAffineExpression.clear(self)
+
+
+def _sumTerms(vector):
+    """
+    Buffers of the sum of a (nested) list or tuple, see LpArrayExpression.fromSum
+
+    :return: variables, coefs, indices, constant or None
+    """
+    position = {}
+    indices = []
+    coefs = []
+    constant = 0
+    stack = [vector]
+    while stack:
+        e = stack.pop()
+        if isinstance(e, (list, tuple)):
+            stack.extend(reversed(e))
+        elif isinstance(e, LpArrayExpression) and e.variables is not None:
+            mapping = [position.setdefault(v, len(position)) for v in e.variables]
+            indices.extend([mapping[i] for i in e.indices])
+            coefs.extend(e.coefs)
+            constant += e.constant
+        elif isinstance(e, LpElement):
+            indices.append(position.setdefault(e, len(position)))
+            coefs.append(1)
+        elif isNumber(e):
+            constant += e
+        else:
+            return None
+    table = [None] * len(position)
+    for v, i in position.items():
+        table[i] = v
+    return table, coefs, indices, constant
+
+
+def _bulkExpression(variables, coefs, indices=None, constant=0):
+    """
+    Plain LpAffineExpression built from buffers like LpArrayExpression
+    """
+    if indices is None:
+        variables, indices = _distinctTable(variables)
+    indices, coefs = _compressTerms(len(variables), indices, coefs)
+    return LpAffineExpression(list(zip([variables[i] for i in indices], coefs)), constant=constant)
+
+
+def _distinctTable(variables):
+    """
+    Table of the variables without repetitions (by identity) and the index
+    of each variable in it, or variables and None if there are none
+    """
+    position = {}
+    indices = [position.setdefault(id(v), len(position)) for v in variables]
+    if len(position) == len(indices):
+        return variables, None
+    table = [None] * len(position)
+    for v, i in zip(variables, indices):
+        table[i] = v
+    return table, indices
+
+
+def _compressTerms(size, indices, coefs):
+    """
+    Sums the coefficients of equal indices and drops zero coefficients.
+
+    :param size: number of variables the indices refer to
+    :param indices: sequence of indices or None for range(size)
+    :param coefs: sequence of coefficients, one for each index
+    :return: indices and coefs as lists
+    """
+    if numpy is not None:
+        coefs = numpy.asarray(coefs, dtype=float)
+        if indices is None:
+            indices = numpy.arange(size)
+        else:
+            indices = numpy.asarray(indices, dtype=numpy.int64)
+            unique, inverse = numpy.unique(indices, return_inverse=True)
+            if len(unique) < len(indices):
+                coefs = numpy.bincount(inverse, weights=coefs, minlength=len(unique))
+                indices = unique
+        nonzero = coefs != 0
+        return indices[nonzero].tolist(), coefs[nonzero].tolist()
+    coefs = array('d', coefs)
+    if indices is None:
+        indices = array('l', range(size))
+    else:
+        indices = array('l', indices)
+        if len(set(indices)) < len(indices):
+            summed = {}
+            for i, x in zip(indices, coefs):
+                summed[i] = summed.get(i, 0) + x
+            indices = array('l', sorted(summed))
+            coefs = array('d', [summed[i] for i in indices])
+    return ([i for i, x in zip(indices, coefs) if x != 0],
+            [x for x in coefs if x != 0])
 
 class LpConstraint(LpAffineExpression):
     """An LP constraint"""
+    pi = _LazyValue("pi")
+    slack = _LazyValue("slack")
+
     def __init__(self, e = None, sense = LpConstraintEQ,
-                  name = None, rhs = None):
+                  name = None, rhs = None, rhsRange = None):
         """
         :param e: an instance of :class:`LpAffineExpression`
         :param sense: one of :data:`~pulp.constants.LpConstraintEQ`, :data:`~pulp.constants.LpConstraintGE`, :data:`~pulp.constants.LpConstraintLE` (0, 1, -1 respectively)
         :param name: identifying string
         :param rhs: numerical value of constraint target
+        :param rhsRange: makes the constraint a ranged row as in the RANGES
+            section of MPS files: a >= row gets the upper bound rhs + |rhsRange|,
+            a <= row the lower bound rhs - |rhsRange|, an == row becomes
+            rhs <= e <= rhs + rhsRange (rhsRange > 0) or
+            rhs + rhsRange <= e <= rhs (rhsRange < 0)
         """
         LpAffineExpression.__init__(self, e, name = name)
         if rhs is not None:
             self.constant = - rhs
         self.sense = sense
+        self.rhsRange = rhsRange
         self.pi = None
         self.slack = None
         self.modified = True
 
     def getLb(self):
+        if self.rhsRange:
+            if self.sense == LpConstraintLE:
+                return -self.constant - abs(self.rhsRange)
+            if self.sense == LpConstraintEQ:
+                return -self.constant + min(self.rhsRange, 0)
         if ( (self.sense == LpConstraintGE) or
              (self.sense == LpConstraintEQ) ):
             return -self.constant
@@ -865,6 +1189,11 @@ class LpConstraint(LpAffineExpression):
             return None
 
     def getUb(self):
+        if self.rhsRange:
+            if self.sense == LpConstraintGE:
+                return -self.constant + abs(self.rhsRange)
+            if self.sense == LpConstraintEQ:
+                return -self.constant + max(self.rhsRange, 0)
         if ( (self.sense == LpConstraintLE) or
              (self.sense == LpConstraintEQ) ):
             return -self.constant
@@ -873,14 +1202,23 @@ class LpConstraint(LpAffineExpression):
 
     def __str__(self):
         s = LpAffineExpression.__str__(self, 0)
+        if self.rhsRange:
+            return "%s <= %s <= %s" % (self.getLb(), s, self.getUb())
         if self.sense is not None:
             s += " " + LpConstraintSenses[self.sense] + " " + str(-self.constant)
         return s
 
     def asCplexLpConstraint(self, name):
         """
-        Returns a constraint as a string
+        Returns a constraint as a string. The LP format has no ranged rows,
+        the upper bound of a ranged row is written as an extra row
+        <name>_RANGE (the solvers report it, but it is not read back).
         """
+        if self.rhsRange:
+            lower = LpConstraint(self, LpConstraintGE, rhs = self.getLb())
+            upper = LpConstraint(self, LpConstraintLE, rhs = self.getUb())
+            return (lower.asCplexLpConstraint(name) +
+                    upper.asCplexLpConstraint(name + "_RANGE"))
         result, line = self.asCplexVariablesOnly(name)
         if not list(self.keys()):
             line += ["0"]
@@ -912,7 +1250,7 @@ class LpConstraint(LpAffineExpression):
 
     def copy(self):
         """Make a copy of self"""
-        return LpConstraint(self, self.sense)
+        return LpConstraint(self, self.sense, rhsRange = self.rhsRange)
 
     def emptyCopy(self):
         return LpConstraint(sense = self.sense)
@@ -1004,6 +1342,9 @@ class LpConstraint(LpAffineExpression):
 
     def valid(self, eps = 0):
         val = self.value()
+        if self.rhsRange:
+            rhs = -self.constant
+            return (self.getLb() - rhs - eps <= val <= self.getUb() - rhs + eps)
         if self.sense == LpConstraintEQ: return abs(val) <= eps
         else: return val * self.sense >= - eps
 
@@ -1118,14 +1459,26 @@ class LpProblem(object):
         self.modifiedVariables = []
         self.modifiedConstraints = []
         self.resolveOK = False
+        # registry of the variables in the order they are added, the position
+        # of a variable is its column id (see columns)
         self._variables = []
-        self._variable_ids = {}  #old school using dict.keys() for a set
+        self._variable_ids = {}  # id(variable) -> column id
+        self._variablesSorted = None
+        self._variablesByName = None
         self.dummyVar = None
 
 
         # locals
         self.lastUnused = 0
 
+    def getObjective(self):
+        return self._objective
+
+    def _setObjectiveExpression(self, objective):
+        self._objective = objective
+
+    objective = property(fget=getObjective, fset=_setObjectiveExpression)
+
     def __repr__(self):
         string = self.name+":\n"
         if self.sense == 1:
@@ -1170,16 +1523,12 @@ class LpProblem(object):
         for k in self.constraints:
             constraintsNames[k] = "C%07d" % i
             i += 1
-        variablesNames = {}
-        i = 0
-        for k in self.variables():
-            variablesNames[k.name] = "X%07d" % i
-            i += 1
+        variablesNames = _NormalisedNames(self.columns())
         return constraintsNames, variablesNames, "OBJ"
 
     def isMIP(self):
-        for v in self.variables():
-            if v.cat == LpInteger: return 1
+        for v in self.columns():
+            if v.cat == LpInteger or v.cat == LpSemiContinuous: return 1
         return 0
 
     def roundSolution(self, epsInt = 1e-5, eps = 1e-7):
@@ -1227,8 +1576,10 @@ class LpProblem(object):
         @param variable: the variable to be added
         """
         if id(variable) not in self._variable_ids:
+            self._variable_ids[id(variable)] = len(self._variables)
             self._variables.append(variable)
-            self._variable_ids[id(variable)] = variable
+            self._variablesSorted = None
+            self._variablesByName = None
 
     def addVariables(self, variables):
         """
@@ -1239,6 +1590,37 @@ class LpProblem(object):
         for v in variables:
             self.addVariable(v)
 
+    def _updateVariables(self):
+        """Registers the variables of objective and constraints that are not
+        registered yet, also after changes in place (e.g. addterm on a
+        constraint or a constraint put into constraints directly). The check
+        runs over the ids of all terms at C speed, only new variables are
+        registered one by one in the order of objective and constraints"""
+        expressions = list(self.constraints.values())
+        if self.objective:
+            expressions.insert(0, self.objective)
+        terms = itertools.chain.from_iterable(dict.keys(e) for e in expressions)
+        if set(map(id, terms)).difference(self._variable_ids):
+            for e in expressions:
+                self.addVariables(list(e.keys()))
+
+    def columns(self):
+        """
+        Returns a list of the problem variables in the order they were added,
+        the position of a variable in this list is its column id. Column ids
+        do not change when variables are added, a variable that is taken out
+        of all constraints keeps its column.
+        """
+        self._updateVariables()
+        return list(self._variables)
+
+    def columnId(self, variable):
+        """
+        Returns the column id of a variable, see columns
+        """
+        self._updateVariables()
+        return self._variable_ids[id(variable)]
+
     def variables(self):
         """
         Returns a list of the problem variables
@@ -1247,18 +1629,15 @@ class LpProblem(object):
             - none
 
         Returns:
-            - A list of the problem variables
+            - A list of the problem variables, sorted by name
         """
-        if self.objective:
-            self.addVariables(list(self.objective.keys()))
-        for c in self.constraints.values():
-            self.addVariables(list(c.keys()))
-        variables = self._variables
-        #sort the varibles DSU
-        variables = [[v.name, v] for v in variables]
-        variables.sort()
-        variables = [v for _, v in variables]
-        return variables
+        self._updateVariables()
+        if self._variablesSorted is None:
+            #sort the varibles DSU
+            variables = [[v.name, v] for v in self._variables]
+            variables.sort()
+            self._variablesSorted = [v for _, v in variables]
+        return list(self._variablesSorted)
 
     def variablesDict(self):
         variables = {}
@@ -1298,6 +1677,69 @@ class LpProblem(object):
         self.modifiedConstraints.append(constraint)
         self.addVariables(list(constraint.keys()))
 
+    def addConstraints(self, constraints):
+        """
+        Adds a batch of constraints in one pass: the names are checked, the
+        constraints are stored and their variables registered just like
+        addConstraint does for each of them.
+
+        :param constraints: dict {name: LpConstraint} or iterable of
+                            (name, LpConstraint), name may be None
+        """
+        if isinstance(constraints, dict):
+            constraints = constraints.items()
+        batch = []
+        names = set()
+        for name, constraint in constraints:
+            if not isinstance(constraint, LpConstraint):
+                raise TypeError("Can only add LpConstraint objects")
+            if name:
+                constraint.name = name
+            name = constraint.name or self.unusedConstraintName()
+            if name in self.constraints or name in names:
+                if self.noOverlap:
+                    raise PulpError("overlapping constraint names: " + name)
+                else:
+                    print("Warning: overlapping constraint names:", name)
+            names.add(name)
+            batch.append((name, constraint))
+
+        variables = self._variables
+        variable_ids = self._variable_ids
+        size = len(variables)
+        for name, constraint in batch:
+            self.constraints[name] = constraint
+            for v in constraint:
+                if id(v) not in variable_ids:
+                    variable_ids[id(v)] = len(variables)
+                    variables.append(v)
+        self.modifiedConstraints.extend(constraint for _, constraint in batch)
+        if len(variables) > size:
+            self._variablesSorted = None
+            self._variablesByName = None
+
+    def addConstraintBlock(self, names, variables, starts, indices, coefs, senses, rhs):
+        """
+        Adds a block of rows given in compressed sparse row format, see
+        addConstraints. The row expressions are LpArrayExpressions.
+
+        :param names: list of constraint names, one for each row
+        :param variables: sequence of LpVariables, the columns of the block
+        :param starts: row i has its entries in [starts[i], starts[i + 1])
+        :param indices: column of each entry
+        :param coefs: coefficient of each entry
+        :param senses: sense of each row (LpConstraintLE, LpConstraintEQ, LpConstraintGE)
+        :param rhs: right hand side of each row
+        :return: list of the new LpConstraints
+        """
+        constraints = []
+        for i, name in enumerate(names):
+            expression = LpArrayExpression(variables, coefs[starts[i]:starts[i + 1]],
+                                           indices=indices[starts[i]:starts[i + 1]])
+            constraints.append(LpConstraint(expression, int(senses[i]), name=name, rhs=float(rhs[i])))
+        self.addConstraints(zip(names, constraints))
+        return constraints
+
     def setObjective(self,obj):
         """
         Sets the input variable as the objective function. Used in Columnwise Modelling
@@ -1392,22 +1834,25 @@ class LpProblem(object):
                 coefs.extend([(translation[v.name], ctr, cst[v]) for v in cst])
         return coefs
 
-    def writeMPS(self, filename, mpsSense = 0, rename = 0, mip = 1):
+    def writeMPS(self, filename, mpsSense = 0, rename = 0, mip = 1, writeSOS = 1):
         wasNone, dummyVar = self.fixObjective()
-        f = open(filename, "w")
+        # filename can also be an open file object, which is not closed
+        f = filename if hasattr(filename, "write") else open(filename, "w")
         if mpsSense == 0: mpsSense = self.sense
         cobj = self.objective
         if mpsSense != self.sense:
             n = cobj.name
             cobj = - cobj
             cobj.name = n
+        vs = self.columns()
         if rename:
             constraintsNames, variablesNames, cobj.name = self.normalisedNames()
+            # keyed by the variables, their names are not needed
+            columnNames = dict((v, "X%07d" % i) for i, v in enumerate(vs))
         f.write("*SENSE:"+LpSenses[mpsSense]+"\n")
         n = self.name
         if rename: n = "MODEL"
         f.write("NAME          "+n+"\n")
-        vs = self.variables()
         # constraints
         f.write("ROWS\n")
         objName = cobj.name
@@ -1425,8 +1870,7 @@ class LpProblem(object):
         for k,c in self.constraints.items():
             if rename: k = constraintsNames[k]
             for v in c:
-                n = v.name
-                if rename: n = variablesNames[n]
+                n = columnNames[v] if rename else v.name
                 if n in coefs:
                     coefs[n][k] = c[v]
                 else:
@@ -1435,15 +1879,16 @@ class LpProblem(object):
         for v in vs:
             if mip and v.cat == LpInteger:
                 f.write("    MARK      'MARKER'                 'INTORG'\n")
-            n = v.name
-            if rename: n = variablesNames[n]
+            n = columnNames[v] if rename else v.name
             if n in coefs:
                 cv = coefs[n]
                 # Most of the work is done here
                 for k in cv: f.write("    %-8s  %-8s  % .12e\n" % (n,k,cv[k]))
 
-            # objective function
+            # objective function, also for a column without any coefficient
+            # (e.g. removed from all constraints), cbc needs an entry of each
             if v in cobj: f.write("    %-8s  %-8s  % .12e\n" % (n,objName,cobj[v]))
+            elif n not in coefs: f.write("    %-8s  %-8s  % .12e\n" % (n,objName,0))
             if mip and v.cat == LpInteger:
                 f.write("    MARK      'MARKER'                 'INTEND'\n")
         # right hand side
@@ -1453,12 +1898,23 @@ class LpProblem(object):
             if rename: k = constraintsNames[k]
             if c == 0: c = 0
             f.write("    RHS       %-8s  % .12e\n" % (k,c))
+        # ranged rows
+        ranges = [(k, c.rhsRange) for k, c in self.constraints.items() if c.rhsRange]
+        if ranges:
+            f.write("RANGES\n")
+            for k, r in ranges:
+                if rename: k = constraintsNames[k]
+                f.write("    RGS       %-8s  % .12e\n" % (k, r))
         # bounds
         f.write("BOUNDS\n")
         for v in vs:
-            n = v.name
-            if rename: n = variablesNames[n]
-            if v.lowBound != None and v.lowBound == v.upBound:
+            n = columnNames[v] if rename else v.name
+            if v.cat == LpSemiContinuous:
+                # x = 0 or lowBound <= x <= upBound
+                if v.lowBound:
+                    f.write(" LO BND       %-8s  % .12e\n" % (n, v.lowBound))
+                f.write(" SC BND       %-8s  % .12e\n" % (n, v.upBound))
+            elif v.lowBound != None and v.lowBound == v.upBound:
                 f.write(" FX BND       %-8s  % .12e\n" % (n, v.lowBound))
             elif v.lowBound == 0 and v.upBound == 1 and mip and v.cat == LpInteger:
                 f.write(" BV BND       %-8s\n" % n)
@@ -1476,8 +1932,21 @@ class LpProblem(object):
                         f.write(" FR BND       %-8s\n" % n)
                 if v.upBound != None:
                     f.write(" UP BND       %-8s  % .12e\n" % (n, v.upBound))
+        # Special Ordered Sets, one header line per set followed by its
+        # members and their weights (as read by COIN and CPLEX)
+        if writeSOS and (self.sos1 or self.sos2):
+            f.write("SOS\n")
+            for kind, sets in (("S1", self.sos1), ("S2", self.sos2)):
+                for priority, (k, sos) in enumerate(sets.items()):
+                    if rename: k = "%s_%d" % (kind, priority)
+                    else: k = str(k).translate(LpAffineExpression.trans)
+                    f.write(" %s SOS       %-8s  %d\n" % (kind, k, priority + 1))
+                    for v, val in sos.items():
+                        n = columnNames[v] if rename else v.name
+                        f.write("    %-8s  % .12e\n" % (n, val))
         f.write("ENDATA\n")
-        f.close()
+        if f is not filename:
+            f.close()
         self.restoreObjective(wasNone, dummyVar)
         # returns the variables, in writing order
         if rename == 0:
@@ -1560,6 +2029,11 @@ class LpProblem(object):
             if vg:
                 f.write("Binaries\n")
                 for v in vg: f.write("%s\n" % v.name)
+            # Semi-continuous variables
+            vg = [v for v in vs if v.isSemiContinuous()]
+            if vg:
+                f.write("Semi-Continuous\n")
+                for v in vg: f.write("%s\n" % v.name)
         # Special Ordered Sets
         if writeSOS and (self.sos1 or self.sos2):
             f.write("SOS\n")
@@ -1577,14 +2051,21 @@ class LpProblem(object):
         f.close()
         self.restoreObjective(wasNone, objectiveDummyVar)
 
+    def _variablesByNameDict(self):
+        """variablesDict from the registry, cached until variables are added"""
+        self._updateVariables()
+        if self._variablesByName is None:
+            self._variablesByName = dict((v.name, v) for v in self._variables)
+        return self._variablesByName
+
     def assignVarsVals(self, values):
-        variables = self.variablesDict()
+        variables = self._variablesByNameDict()
         for name in values:
             if name != '__dummy':
                 variables[name].varValue = values[name]
 
     def assignVarsDj(self,values):
-        variables = self.variablesDict()
+        variables = self._variablesByNameDict()
         for name in values:
             if name != '__dummy':
                 variables[name].dj = values[name]
@@ -1602,6 +2083,36 @@ class LpProblem(object):
             else:
                 self.constraints[name].slack = float(values[name])
 
+    def assignSolution(self, variables, values, reducedCosts = None,
+                       activity = None, shadowPrices = None):
+        """
+        Assigns a solution given as arrays aligned with variables and with
+        the constraints in the order of self.constraints (as the solution of
+        an mps file with normalised names). The values are only converted
+        when varValue, dj, pi or slack are read
+
+        :param variables: the variables, e.g. the columns written by writeMPS
+        :param values: values of the variables
+        :param reducedCosts: None or reduced costs of the variables
+        :param activity: None or activities of the constraints, the slacks
+            are computed from them
+        :param shadowPrices: None or shadow prices of the constraints
+        """
+        _LazyValue.assign(variables, "varValue", values)
+        if reducedCosts is not None:
+            _LazyValue.assign(variables, "dj", reducedCosts)
+        constraints = list(self.constraints.values())
+        if shadowPrices is not None:
+            _LazyValue.assign(constraints, "pi", shadowPrices)
+        if activity is not None:
+            constants = [c.constant for c in constraints]
+            if numpy is not None:
+                slacks = -(numpy.array(constants, dtype = float) + activity)
+            else:
+                slacks = array("d", [-(constant + a) for constant, a
+                                     in zip(constants, activity)])
+            _LazyValue.assign(constraints, "slack", slacks)
+
     def get_dummyVar(self):
         if self.dummyVar is None:
             self.dummyVar = LpVariable("__dummy", 0, 0)
@@ -1756,6 +2267,7 @@ class FixedElasticSubProblem(LpProblem):
         self.lowVar = LpVariable("_neg_penalty_var",
                                  upBound = 0, lowBound = 0)
         constraint.addInPlace(self.freeVar + self.lowVar + self.upVar)
+        self.addVariables([self.freeVar, self.lowVar, self.upVar])
         if proportionFreeBound:
             proportionFreeBoundList = [proportionFreeBound, proportionFreeBound]
         if proportionFreeBoundList:
@@ -1969,16 +2481,67 @@ class LpVariableDict(dict):
 
 # Utility functions
 
+def lpSolveAll(problems, solver = None, threads = None, **kwargs):
+    """
+    Solves independent problems on a pool of threads, each problem with a
+    copy of solver. For command line solvers every solve runs its own
+    subprocess, e.g. cbc for COIN_CMD, so the threads mostly wait.
+
+    :param problems: list of LpProblem, they must not share variables
+    :param solver: the specific solver to be used, defaults to the solver of
+        each problem or the default solver
+    :param threads: number of problems solved at the same time, defaults to
+        the number of problems
+    :param kwargs: passed to LpProblem.solve
+    :return: list of the statuses
+    """
+    from multiprocessing.pool import ThreadPool
+    if not problems:
+        return []
+    def solve(prob):
+        return prob.solve(None if solver is None else solver.copy(), **kwargs)
+    pool = ThreadPool(threads or len(problems))
+    try:
+        return pool.map(solve, problems)
+    finally:
+        pool.close()
+        pool.join()
+
 def lpSum(vector):
     """lpSu
     Calculate the sum of a list of linear expressions
 
+    Lists of LpArrayExpressions, variables and numbers are summed in bulk.
+
     :param vector: A list of linear expressions
     """
+    if isinstance(vector, (list, tuple)):
+        terms = _sumTerms(vector)
+        if terms is not None:
+            variables, coefs, indices, constant = terms
+            return _bulkExpression(variables, coefs, indices, constant)
     return LpAffineExpression().addInPlace(vector)
 
+def _isVariableVector(v):
+    return (isinstance(v, (list, tuple))
+            and all(isinstance(e, LpElement) for e in v))
+
+def _isNumberVector(v):
+    if numpy is not None and isinstance(v, numpy.ndarray):
+        return v.ndim == 1 and v.dtype.kind in 'biuf'
+    return (isinstance(v, (list, tuple, array))
+            and all(isNumber(e) for e in v))
+
 def lpDot(v1, v2):
-    """Calculate the dot product of two lists of linear expressions"""
+    """Calculate the dot product of two lists of linear expressions
+
+    The dot product of a list of variables and a list (or array) of numbers
+    is built in bulk, see LpArrayExpression.
+    """
+    if _isVariableVector(v1) and _isNumberVector(v2) and len(v1) == len(v2):
+        return _bulkExpression(v1, v2)
+    if _isVariableVector(v2) and _isNumberVector(v1) and len(v1) == len(v2):
+        return _bulkExpression(v2, v1)
     if not isiterable(v1) and not isiterable(v2):
         return v1 * v2
     elif not isiterable(v1):
@@ -2266,6 +2829,8 @@ def pulpTestAll():
                CPLEX_CMD,
                CPLEX_PY,
                COIN_CMD,
+               COIN_WORKER,
+               CBC_DLL,
                COINMP_DLL,
                GLPK_CMD,
                XPRESS,
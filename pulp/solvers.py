@@ -40,12 +40,33 @@ except ImportError:
 from . import sparse
 import collections
 import warnings
-from tempfile import mktemp
+from tempfile import mktemp, mkdtemp
+from uuid import uuid4
+import threading
+import select
+import shutil
+import atexit
+import time
+try:
+    import fcntl
+except ImportError:
+    # not on Windows, which has no pipe mode (no /dev/fd)
+    fcntl = None
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
 from .constants import *
+from array import array
 
 import logging
 log = logging.getLogger(__name__)
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 if os.name == "posix" and sys.version_info[0] < 3:
     try:
         import subprocess32 as subprocess
@@ -112,12 +133,17 @@ def initialize(filename, operating_system='linux', arch='64'):
         scip_path = config.get("locations", "ScipPath")
     except configparser.Error:
         scip_path = 'scip'
+    try:
+        cbc_lib_path = config.get("locations", "CbcLibPath")
+    except configparser.Error:
+        cbc_lib_path = 'libCbcSolver.so'
     for i,path in enumerate(coinMP_path):
         if not os.path.dirname(path):
             #if no pathname is supplied assume the file is in the same directory
             coinMP_path[i] = os.path.join(os.path.dirname(config_filename),path)
     return cplex_dll_path, ilm_cplex_license, ilm_cplex_license_signature,\
-        coinMP_path, gurobi_path, cbc_path, glpk_path, pulp_cbc_path, scip_path
+        coinMP_path, gurobi_path, cbc_path, glpk_path, pulp_cbc_path, scip_path,\
+        cbc_lib_path
 
 #pick up the correct config file depending on operating system
 PULPCFGFILE = "pulp.cfg"
@@ -148,8 +174,8 @@ else: #run as a script
     config_filename = os.path.join(DIRNAME,
                                    PULPCFGFILE)
 cplex_dll_path, ilm_cplex_license, ilm_cplex_license_signature, coinMP_path,\
-        gurobi_path, cbc_path, glpk_path, pulp_cbc_path, scip_path = \
-        initialize(config_filename, operating_system, arch)
+        gurobi_path, cbc_path, glpk_path, pulp_cbc_path, scip_path, \
+        cbc_lib_path = initialize(config_filename, operating_system, arch)
 
 
 # See later for LpSolverDefault definition
@@ -194,7 +220,8 @@ class LpSolver:
     #TODO: Not sure if this code should be here or in a child class
     def getCplexStyleArrays(self,lp,
                        senseDict={LpConstraintEQ:"E", LpConstraintLE:"L", LpConstraintGE:"G"},
-                       LpVarCategories = {LpContinuous: "C",LpInteger: "I"},
+                       LpVarCategories = {LpContinuous: "C",LpInteger: "I",
+                                          LpSemiContinuous: "S"},
                        LpObjSenses = {LpMaximize : -1,
                                       LpMinimize : 1},
                        infBound =  1e20
@@ -254,14 +281,16 @@ class LpSolver:
             rangeValues[i] = 0.0
             rowNames[i] = str(c)
             rowType[i] = senseDict[lp.constraints[c].sense]
+            if lp.constraints[c].rhsRange:
+                # cplex convention: rhs <= constraint <= rhs + range
+                rhsValues[i] = lp.constraints[c].getLb()
+                rangeValues[i] = lp.constraints[c].getUb() - lp.constraints[c].getLb()
+                rowType[i] = 'R'
             self.c2n[c] = i
             self.n2c[i] = c
             i = i+1
         #return the coefficient matrix as a series of vectors
-        coeffs = lp.coefficients()
-        sparseMatrix = sparse.Matrix(list(range(numRows)), list(range(numVars)))
-        for var,row,coeff in coeffs:
-            sparseMatrix.add(self.c2n[row], self.vname2n[var], coeff)
+        sparseMatrix = sparse.CscMatrix.fromProblem(lp, variables)
         (numels, mystartsBase, mylenBase, myindBase,
          myelemBase) = sparseMatrix.col_based_arrays()
         elemBase = ctypesArrayFill(myelemBase, ctypes.c_double)
@@ -320,6 +349,18 @@ class LpSolver_CMD(LpSolver):
         elif not os.access(self.tmpDir, os.F_OK + os.W_OK):
             self.tmpDir = ""
 
+    def tmpFiles(self, name, *extensions):
+        """Returns the paths of the temporary files for a solve of the
+        problem called name, one for each of the extensions. Without
+        keepFiles the paths are unique for each call, so that solves in
+        several threads of a process do not overwrite each other's files"""
+        if not self.keepFiles:
+            uid = "%d-%s" % (os.getpid(), uuid4().hex)
+            return tuple(os.path.join(self.tmpDir, "%s-pulp.%s" % (uid, ext))
+                         for ext in extensions)
+        else:
+            return tuple("%s-pulp.%s" % (name, ext) for ext in extensions)
+
     def defaultPath(self):
         raise NotImplementedError
 
@@ -357,13 +398,7 @@ class GLPK_CMD(LpSolver_CMD):
         """Solve a well formulated lp problem"""
         if not self.executable(self.path):
             raise PulpSolverError("PuLP: cannot execute "+self.path)
-        if not self.keepFiles:
-            pid = os.getpid()
-            tmpLp = os.path.join(self.tmpDir, "%d-pulp.lp" % pid)
-            tmpSol = os.path.join(self.tmpDir, "%d-pulp.sol" % pid)
-        else:
-            tmpLp = lp.name+"-pulp.lp"
-            tmpSol = lp.name+"-pulp.sol"
+        tmpLp, tmpSol = self.tmpFiles(lp.name, "lp", "sol")
         lp.writeLP(tmpLp, writeSOS = 0)
         proc = ["glpsol", "--cpxlp", tmpLp, "-o", tmpSol]
         if not self.mip: proc.append('--nomip')
@@ -465,13 +500,7 @@ class CPLEX_CMD(LpSolver_CMD):
         """Solve a well formulated lp problem"""
         if not self.executable(self.path):
             raise PulpSolverError("PuLP: cannot execute "+self.path)
-        if not self.keepFiles:
-            pid = os.getpid()
-            tmpLp = os.path.join(self.tmpDir, "%d-pulp.lp" % pid)
-            tmpSol = os.path.join(self.tmpDir, "%d-pulp.sol" % pid)
-        else:
-            tmpLp = lp.name+"-pulp.lp"
-            tmpSol = lp.name+"-pulp.sol"
+        tmpLp, tmpSol = self.tmpFiles(lp.name, "lp", "sol")
         lp.writeLP(tmpLp, writeSOS = 1)
         try: os.remove(tmpSol)
         except: pass
@@ -913,13 +942,19 @@ try:
             #return the coefficient matrix as a series of vectors
             myobjectCoeffs = {}
             numRows = len(lp.constraints)
-            sparseMatrix = sparse.Matrix(list(range(numRows)), list(range(numVars)))
+            rows = []
+            cols = []
+            values = []
             for var in vars:
                 for row,coeff in var.expression.items():
                    if row.name == lp.objective.name:
                         myobjectCoeffs[var] = coeff
                    else:
-                        sparseMatrix.add(self.c2n[row.name], self.v2n[var] - offset, coeff)
+                        rows.append(self.c2n[row.name])
+                        cols.append(self.v2n[var] - offset)
+                        values.append(coeff)
+            sparseMatrix = sparse.CscMatrix.fromTriplets((numRows, numVars),
+                                                         rows, cols, values)
             #objective values
             objectCoeffs = (ctypes.c_double * numVars)()
             for var in vars:
@@ -1248,13 +1283,7 @@ class XPRESS(LpSolver_CMD):
         """Solve a well formulated lp problem"""
         if not self.executable(self.path):
             raise PulpSolverError("PuLP: cannot execute "+self.path)
-        if not self.keepFiles:
-            pid = os.getpid()
-            tmpLp = os.path.join(self.tmpDir, "%d-pulp.lp" % pid)
-            tmpSol = os.path.join(self.tmpDir, "%d-pulp.prt" % pid)
-        else:
-            tmpLp = lp.name+"-pulp.lp"
-            tmpSol = lp.name+"-pulp.prt"
+        tmpLp, tmpSol = self.tmpFiles(lp.name, "lp", "prt")
         lp.writeLP(tmpLp, writeSOS = 1, mip = self.mip)
         if not self.msg:
             xpress = os.popen(self.path+" "+lp.name+" > /dev/null 2> /dev/null", "w")
@@ -1335,7 +1364,12 @@ class COIN_CMD(LpSolver_CMD):
     def __init__(self, path = None, keepFiles = 0, mip = 1,
             msg = 0, cuts = None, presolve = None, dual = None,
             strong = None, options = [],
-            fracGap = None, maxSeconds = None, threads = None):
+            fracGap = None, maxSeconds = None, threads = None,
+            warmStart = False, pipe = False):
+        """
+        :param pipe: if True the model is streamed to cbc over stdin and the
+            solution is read from its stdout, no files are written
+        """
         LpSolver_CMD.__init__(self, path, keepFiles, mip, msg, options)
         self.cuts = cuts
         self.presolve = presolve
@@ -1344,6 +1378,8 @@ class COIN_CMD(LpSolver_CMD):
         self.fracGap = fracGap
         self.maxSeconds = maxSeconds
         self.threads = threads
+        self.warmStart = warmStart
+        self.pipe = pipe
         #TODO hope this gets fixed in cbc as it does not like the c:\ in windows paths
         if os.name == 'nt':
             self.tmpDir = ''
@@ -1355,6 +1391,11 @@ class COIN_CMD(LpSolver_CMD):
         aCopy.presolve = self.presolve
         aCopy.dual = self.dual
         aCopy.strong = self.strong
+        aCopy.fracGap = self.fracGap
+        aCopy.maxSeconds = self.maxSeconds
+        aCopy.threads = self.threads
+        aCopy.warmStart = self.warmStart
+        aCopy.pipe = self.pipe
         return aCopy
 
     def actualSolve(self, lp, **kwargs):
@@ -1370,89 +1411,246 @@ class COIN_CMD(LpSolver_CMD):
         if not self.executable(self.path):
             raise PulpSolverError("Pulp: cannot execute %s cwd: %s"%(self.path,
                                    os.getcwd()))
-        if not self.keepFiles:
-            pid = os.getpid()
-            tmpLp = os.path.join(self.tmpDir, "%d-pulp.lp" % pid)
-            tmpMps = os.path.join(self.tmpDir, "%d-pulp.mps" % pid)
-            tmpSol = os.path.join(self.tmpDir, "%d-pulp.sol" % pid)
-        else:
-            tmpLp = lp.name+"-pulp.lp"
-            tmpMps = lp.name+"-pulp.mps"
-            tmpSol = lp.name+"-pulp.sol"
+        if self.usePipe(self.warmStart and self.mip):
+            return self.solve_CBC_pipe(lp)
+        tmpLp, tmpMps, tmpSol, tmpMst = self.tmpFiles(lp.name,
+                                                "lp", "mps", "sol", "mst")
+        try:
+            if use_mps:
+                vs, variablesNames, constraintsNames, objectiveName = lp.writeMPS(
+                            tmpMps, rename = 1)
+                mipStart = None
+                if self.warmStart and self.mip:
+                    mipStart = tmpMst
+                    self.writeMipStart(tmpMst, [("X%07d" % i, v.varValue)
+                                        for i, v in enumerate(vs)
+                                        if v.varValue is not None])
+                self.callCBC(tmpMps, tmpSol, lp.sense == LpMaximize, mipStart)
+            else:
+                lp.writeLP(tmpLp)
+                self.callCBC(tmpLp, tmpSol)
+            if use_mps:
+                solution = self.readsolArrays(tmpSol, len(vs),
+                                              len(lp.constraints))
+            else:
+                lp.status, values, reducedCosts, shadowPrices, slacks = self.readsol_LP(
+                        tmpSol, lp, lp.variables())
+        finally:
+            # the names are unique, files of a failed solve would be left behind
+            if not self.keepFiles:
+                for tmp in (tmpMps, tmpLp, tmpSol, tmpMst):
+                    try:
+                        os.remove(tmp)
+                    except OSError:
+                        pass
         if use_mps:
-            vs, variablesNames, constraintsNames, objectiveName = lp.writeMPS(
-                        tmpMps, rename = 1)
-            cmds = ' '+tmpMps+" "
-            if lp.sense == LpMaximize:
-                cmds += 'max '
-        else:
-            lp.writeLP(tmpLp)
-            cmds = ' '+tmpLp+" "
+            return self.assignSolutionArrays(lp, vs, solution)
+        lp.assignVarsVals(values)
+        lp.assignVarsDj(reducedCosts)
+        lp.assignConsPi(shadowPrices)
+        lp.assignConsSlack(slacks, activity=True)
+        return lp.status
+
+    @staticmethod
+    def assignSolutionArrays(lp, vs, solution):
+        """Assigns the result of readsolArrays to lp and its columns vs"""
+        lp.status, values, reducedCosts, activity, shadowPrices = solution
+        lp.assignSolution(vs, values, reducedCosts, activity, shadowPrices)
+        return lp.status
+
+    def solve_CBC_pipe(self, lp):
+        """Solve a MIP problem using CBC without temporary files: the mps
+        file is written to cbc's stdin and the solution read from its stdout
+        """
+        model = StringIO()
+        vs, variablesNames, constraintsNames, objectiveName = lp.writeMPS(
+                    model, rename = 1)
+        mipStart = None
+        if self.warmStart and self.mip:
+            mipStart = [("X%07d" % i, v.varValue)
+                        for i, v in enumerate(vs) if v.varValue is not None]
+        solution = self.callCBCPipe(model.getvalue(), lp.sense == LpMaximize,
+                                    mipStart)
+        return self.assignSolutionArrays(lp, vs, self.readsolArrays(
+                    solution, len(vs), len(lp.constraints)))
+
+    def usePipe(self, mipStart = False):
+        """
+        True if the pipe mode is to be used. A MIP start goes to cbc through
+        /dev/fd, which needs fcntl (not on Windows), then the file mode is
+        used instead
+        """
+        return self.pipe and (fcntl is not None or not mipStart)
+
+    def callCBCPipe(self, model, maximize = False, mipStart = None,
+                    stopper = None):
+        """
+        Runs cbc on the mps file in the string model, which is passed on
+        stdin. mipStart is an optional list of (name, value) tuples, it is
+        passed as writeMipStart does through a pipe (/dev/fd), see usePipe.
+        Returns the solution part of cbc's stdout as file object for
+        readsolArrays, the log before it is printed if msg is set. stopper
+        is an optional CbcStopper that may kill cbc from another thread
+        """
+        cmds = [self.path, "-import", "stdin"]
+        mipRead = mipWrite = writer = None
+        if mipStart is not None:
+            if fcntl is None:
+                raise PulpSolverError("Pulp: no MIP start through a pipe "
+                                      "on this platform, see usePipe")
+            mipRead, mipWrite = os.pipe()
+            # cbc inherits only the read end, so that it sees the end of the start
+            fcntl.fcntl(mipWrite, fcntl.F_SETFD, fcntl.FD_CLOEXEC)
+            cmds += ["mips", "/dev/fd/%d" % mipRead]
+        cmds += self.cbcOptions(maximize)
+        cmds += ["printingOptions", "all", "solution", "stdout"]
+        log.debug(" ".join(cmds))
+        try:
+            cbc = subprocess.Popen(cmds, stdin = subprocess.PIPE,
+                                   stdout = subprocess.PIPE,
+                                   stderr = None if self.msg else open(os.devnull, 'w'),
+                                   close_fds = mipRead is None,
+                                   preexec_fn = None if mipRead is None else
+                                                self._closeFdsBut(mipRead),
+                                   universal_newlines = True)
+            if stopper is not None:
+                stopper.started(cbc)
+            if mipWrite is not None:
+                # written by a thread, the pipe only buffers a few pages
+                writer = threading.Thread(target = self._writePipe,
+                                          args = (mipWrite, mipStart))
+                mipWrite = None
+                writer.start()
+            out = cbc.communicate(model)[0]
+        finally:
+            for fd in (mipRead, mipWrite):
+                if fd is not None:
+                    os.close(fd)
+            if writer is not None:
+                writer.join()
+        if cbc.returncode != 0:
+            raise PulpSolverError("Pulp: Error while trying to execute " +  \
+                                    self.path)
+        return self.solutionFromOutput(out)
+
+    def solutionFromOutput(self, out):
+        """
+        Returns the solution that cbc printed after "solution stdout" in
+        its output out as file object for readsolArrays, the log before it
+        is printed if msg is set
+        """
+        lines = out.splitlines(True)
+        # the solution starts with the status line, e.g.
+        # Optimal - objective value 1.00000000
+        start = None
+        for i in range(len(lines) - 1, -1, -1):
+            if " - objective value" in lines[i] and not lines[i][0].isspace():
+                start = i
+                break
+        if start is None:
+            raise PulpSolverError("Pulp: Error while executing "+self.path)
+        if self.msg:
+            sys.stdout.write("".join(lines[:start]))
+        end = start + 1
+        while end < len(lines) and (lines[end][0].isspace() or
+                                    lines[end].startswith("**")):
+            end += 1
+        return StringIO("".join(lines[start:end]))
+
+    def _closeFdsBut(self, fd):
+        """Returns a preexec_fn for Popen that closes the file descriptors
+        above stderr like close_fds but keeps fd open. Otherwise cbc could
+        hold the pipes of a solve in another thread open"""
+        def closeFds():
+            os.closerange(3, fd)
+            os.closerange(fd + 1, subprocess.MAXFD)
+        return closeFds
+
+    def _writePipe(self, fd, values):
+        """Writes a mip start to the pipe fd and closes it"""
+        f = os.fdopen(fd, "w")
+        try:
+            f.write(self.mipStartText(values))
+            f.close()
+        except (IOError, OSError):
+            # cbc stopped before it read the start
+            pass
+
+    def cbcOptions(self, maximize = False):
+        """The cbc commands for the options of this solver, from max to
+        branch (or initialSolve)"""
+        cmds = []
+        if maximize:
+            cmds.append("max")
         if self.threads:
-            cmds += "threads %s "%self.threads
+            cmds += ["threads", str(self.threads)]
         if self.fracGap is not None:
-            cmds += "ratio %s "%self.fracGap
+            cmds += ["ratio", str(self.fracGap)]
         if self.maxSeconds is not None:
-            cmds += "sec %s "%self.maxSeconds
+            cmds += ["sec", str(self.maxSeconds)]
         if self.presolve:
-            cmds += "presolve on "
+            cmds += ["presolve", "on"]
         if self.strong:
-            cmds += "strong %d " % self.strong
+            cmds += ["strong", "%d" % self.strong]
         if self.cuts:
-            cmds += "gomory on "
-            #cbc.write("oddhole on "
-            cmds += "knapsack on "
-            cmds += "probing on "
+            cmds += ["gomory", "on", "knapsack", "on", "probing", "on"]
         for option in self.options:
-            cmds += option+" "
+            cmds += option.split()
         if self.mip:
-            cmds += "branch "
+            cmds.append("branch")
         else:
-            cmds += "initialSolve "
-        cmds += "printingOptions all "
-        cmds += "solution "+tmpSol+" "
+            cmds.append("initialSolve")
+        return cmds
+
+    def callCBC(self, modelFile, solFile, maximize = False, mipStart = None,
+                stopper = None):
+        """
+        Runs cbc on an existing mps or lp file and writes the solution
+        to solFile. mipStart is an optional file written by writeMipStart
+        that cbc uses as initial solution, stopper is an optional CbcStopper
+        that may kill cbc from another thread
+        """
+        cmds = [self.path, modelFile]
+        if mipStart is not None:
+            cmds += ["mips", mipStart]
+        cmds += self.cbcOptions(maximize)
+        cmds += ["printingOptions", "all", "solution", solFile]
         if self.msg:
             pipe = None
         else:
             pipe = open(os.devnull, 'w')
-        log.debug(self.path + cmds)
-        cbc = subprocess.Popen((self.path + cmds).split(), stdout = pipe,
-                             stderr = pipe)
+        log.debug(" ".join(cmds))
+        cbc = subprocess.Popen(cmds, stdout = pipe,
+                             stderr = pipe, close_fds = True)
+        if stopper is not None:
+            stopper.started(cbc)
         if cbc.wait() != 0:
             raise PulpSolverError("Pulp: Error while trying to execute " +  \
                                     self.path)
-        if not os.path.exists(tmpSol):
+        if not os.path.exists(solFile):
             raise PulpSolverError("Pulp: Error while executing "+self.path)
-        if use_mps:
-            lp.status, values, reducedCosts, shadowPrices, slacks = self.readsol_MPS(
-                        tmpSol, lp, lp.variables(),
-                        variablesNames, constraintsNames, objectiveName)
-        else:
-            lp.status, values, reducedCosts, shadowPrices, slacks = self.readsol_LP(
-                    tmpSol, lp, lp.variables())
-        lp.assignVarsVals(values)
-        lp.assignVarsDj(reducedCosts)
-        lp.assignConsPi(shadowPrices)
-        lp.assignConsSlack(slacks, activity=True)
-        if not self.keepFiles:
-            try:
-                os.remove(tmpMps)
-            except:
-                pass
-            try:
-                os.remove(tmpLp)
-            except:
-                pass
-            try:
-                os.remove(tmpSol)
-            except:
-                pass
-        return lp.status
+
+    def writeMipStart(self, filename, values):
+        """
+        Writes a cbc solution file with the initial values of the
+        variables (a list of (name, value) tuples), that can be read
+        with the cbc mips command
+        """
+        with open(filename, "w") as f:
+            f.write(self.mipStartText(values))
+
+    def mipStartText(self, values):
+        """The content of a mip start file, see writeMipStart"""
+        lines = ["Stopped on iterations - objective value 0.00000000\n"]
+        for i, (name, value) in enumerate(values):
+            lines.append("%7d %s %15.12g 0\n" % (i, name, value))
+        return "".join(lines)
 
     def readsol_MPS(self, filename, lp, vs, variablesNames, constraintsNames,
                 objectiveName):
         """
-        Read a CBC solution file generated from an mps file (different names)
+        Read a CBC solution file generated from an mps file (different names),
+        filename can also be an open file object
         """
         values = {}
 
@@ -1472,9 +1670,12 @@ class COIN_CMD(LpSolver_CMD):
         slacks = {}
         cbcStatus = {'Optimal': LpStatusOptimal,
                     'Infeasible': LpStatusInfeasible,
+                    # "Integer infeasible"
+                    'Integer': LpStatusInfeasible,
                     'Unbounded': LpStatusUnbounded,
                     'Stopped': LpStatusNotSolved}
-        with open(filename) as f:
+        f = filename if hasattr(filename, "readline") else open(filename)
+        try:
             statusstr = f.readline().split()[0]
             status = cbcStatus.get(statusstr, LpStatusUndefined)
             for l in f:
@@ -1493,8 +1694,63 @@ class COIN_CMD(LpSolver_CMD):
                 if vn in reverseCn:
                     slacks[reverseCn[vn]] = float(val)
                     shadowPrices[reverseCn[vn]] = float(dj)
+        finally:
+            f.close()
         return status, values, reducedCosts, shadowPrices, slacks
 
+    @staticmethod
+    def readsolArrays(filename, numVariables, numConstraints):
+        """
+        Reads a CBC solution file of an mps file with normalised names
+        (X%07d, C%07d) in one pass. Returns the status and index aligned
+        arrays of the values and reduced costs of the variables and of the
+        activities and shadow prices of the constraints, numpy arrays if
+        numpy is available. filename can also be an open file object
+        """
+        cbcStatus = {'Optimal': LpStatusOptimal,
+                    'Infeasible': LpStatusInfeasible,
+                    # "Integer infeasible"
+                    'Integer': LpStatusInfeasible,
+                    'Unbounded': LpStatusUnbounded,
+                    'Stopped': LpStatusNotSolved}
+        f = filename if hasattr(filename, "readline") else open(filename)
+        try:
+            status = cbcStatus.get(f.readline().split()[0], LpStatusUndefined)
+            text = f.read()
+        finally:
+            f.close()
+        # the solution ends at the first empty line, "**" marks infeasibilities
+        tokens = text.split("\n\n", 1)[0].replace("**", "").split()
+        # every line is: index name value reduced cost (or shadow price)
+        index, names = tokens[0::4], tokens[1::4]
+        if numpy is not None:
+            index = numpy.array(index, dtype = numpy.int64)
+            column = numpy.array(names, dtype = "S1") == b"X"
+            value = numpy.array(tokens[2::4], dtype = float)
+            dual = numpy.array(tokens[3::4], dtype = float)
+            values = numpy.zeros(numVariables)
+            reducedCosts = numpy.zeros(numVariables)
+            activity = numpy.zeros(numConstraints)
+            shadowPrices = numpy.zeros(numConstraints)
+            values[index[column]] = value[column]
+            reducedCosts[index[column]] = dual[column]
+            row = ~column
+            activity[index[row]] = value[row]
+            shadowPrices[index[row]] = dual[row]
+            return status, values, reducedCosts, activity, shadowPrices
+        values = array("d", [0.0]) * numVariables
+        reducedCosts = array("d", [0.0]) * numVariables
+        activity = array("d", [0.0]) * numConstraints
+        shadowPrices = array("d", [0.0]) * numConstraints
+        for i, name, value, dual in zip(index, names, tokens[2::4], tokens[3::4]):
+            if name[0] == "X":
+                values[int(i)] = float(value)
+                reducedCosts[int(i)] = float(dual)
+            else:
+                activity[int(i)] = float(value)
+                shadowPrices[int(i)] = float(dual)
+        return status, values, reducedCosts, activity, shadowPrices
+
     def readsol_LP(self, filename, lp, vs):
         """
         Read a CBC solution file generated from an lp (good names)
@@ -1507,6 +1763,8 @@ class COIN_CMD(LpSolver_CMD):
             values[v.name] = 0.0
         cbcStatus = {'Optimal': LpStatusOptimal,
                     'Infeasible': LpStatusInfeasible,
+                    # "Integer infeasible"
+                    'Integer': LpStatusInfeasible,
                     'Unbounded': LpStatusUnbounded,
                     'Stopped': LpStatusNotSolved}
         with open(filename) as f:
@@ -1558,6 +1816,598 @@ class PULP_CBC_CMD(COIN_CMD):
             #check that the file is executable
             COIN_CMD.__init__(self, path=self.pulp_cbc_path, *args, **kwargs)
 
+class CbcStopper(object):
+    """
+    Kills the cbc processes of the solves it is passed to (the stopper
+    argument of COIN_CMD.callCBC and callCBCPipe) when stop is called from
+    another thread, e.g. when another solver of a portfolio finished first.
+    These solves then raise PulpSolverError, a cbc that is started after
+    stop is killed right away. The solver itself keeps no process, so that
+    it can be shared by threads
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.processes = []
+        self.stopped = False
+
+    def started(self, cbc):
+        """Keeps a cbc process that was started for stop"""
+        with self.lock:
+            self.processes.append(cbc)
+            stopped = self.stopped
+        if stopped:
+            self.kill(cbc)
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+            processes = list(self.processes)
+        for cbc in processes:
+            self.kill(cbc)
+
+    @staticmethod
+    def kill(cbc):
+        if cbc.poll() is None:
+            try:
+                cbc.kill()
+            except OSError:
+                # it has just finished
+                pass
+
+class CbcWorker(object):
+    """
+    A cbc process that is started before its model is known. cbc started
+    without arguments reads its commands from stdin and prints the prompt
+    "Coin:" when it waits for the next line, a line with several commands
+    is answered by a single prompt. The model and the MIP start are written
+    to files in a directory of the worker, the solution is printed to stdout
+    """
+    prompt = "Coin:"
+
+    def __init__(self, path, tmpDir = None):
+        self.path = path
+        self.dir = mkdtemp(prefix = "cbc", dir = tmpDir)
+        try:
+            self.process = subprocess.Popen([path], stdin = subprocess.PIPE,
+                                            stdout = subprocess.PIPE,
+                                            stderr = subprocess.STDOUT,
+                                            close_fds = True)
+            self.read(timeout = 60)
+        except:
+            self.close()
+            raise
+
+    def close(self):
+        """Kills the process and removes the directory of the worker"""
+        process = getattr(self, "process", None)
+        if process is not None and process.poll() is None:
+            process.kill()
+            process.wait()
+        shutil.rmtree(self.dir, ignore_errors = True)
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def healthy(self):
+        """Health check, the process has to answer a query of a parameter"""
+        if not self.alive():
+            return False
+        try:
+            return "allCommands" in self.command("allCommands", timeout = 5)
+        except PulpSolverError:
+            return False
+
+    def command(self, line, timeout = None):
+        """Sends a line of commands and returns the output up to the next
+        prompt. If cbc does not answer within timeout seconds or stops,
+        the process is killed and PulpSolverError raised"""
+        log.debug(line)
+        try:
+            self.process.stdin.write(line + "\n")
+            self.process.stdin.flush()
+        except (IOError, OSError):
+            self.close()
+            raise PulpSolverError("Pulp: cbc worker %s stopped" % self.path)
+        return self.read(timeout)
+
+    def read(self, timeout = None):
+        fd = self.process.stdout.fileno()
+        end = None if timeout is None else time.time() + timeout
+        out = ""
+        while not out.endswith(self.prompt):
+            if end is not None:
+                left = end - time.time()
+                if left <= 0 or not select.select([fd], [], [], left)[0]:
+                    self.close()
+                    raise PulpSolverError("Pulp: cbc worker %s did not answer "
+                                          "within %s seconds" % (self.path, timeout))
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                self.close()
+                raise PulpSolverError("Pulp: cbc worker %s stopped" % self.path)
+            out += chunk
+        return out[:-len(self.prompt)]
+
+    def solve(self, model, options, mipStart = None, timeout = None):
+        """
+        Solves the mps file in the string model and returns the output of
+        cbc, which ends with the solution
+
+        :param options: commands from COIN_CMD.cbcOptions
+        :param mipStart: None or the text of a MIP start
+        """
+        modelFile = os.path.join(self.dir, "model.mps")
+        with open(modelFile, "w") as f:
+            f.write(model)
+        cmds = ["import", modelFile]
+        if mipStart is not None:
+            startFile = os.path.join(self.dir, "start.mst")
+            with open(startFile, "w") as f:
+                f.write(mipStart)
+            cmds += ["mips", startFile]
+        cmds += options
+        cmds += ["printingOptions", "all", "solution", "stdout"]
+        out = self.command(" ".join(cmds), timeout)
+        if " errors on input" in out:
+            # cbc went on with what it could read
+            raise PulpSolverError("Pulp: Error while executing " + self.path)
+        return out
+
+class CbcWorkerPool(object):
+    """
+    cbc workers for one cbc binary that are started ahead of time, so that
+    a solve does not wait for cbc to start. cbc keeps the state of a branch
+    and bound when the next model is imported (version 2.10 then reports
+    wrong statuses), so a worker solves a single model. A thread of the
+    pool keeps size workers waiting and closes the released ones. A worker
+    that fails the health check is replaced
+    """
+
+    def __init__(self, path, size = 1, tmpDir = None):
+        self.path = path
+        self.size = size
+        self.tmpDir = tmpDir
+        self.idle = []
+        self.released = []
+        self.closed = False
+        # set when a worker could not be started, the thread then waits
+        # for the next acquire
+        self.failed = False
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.thread = threading.Thread(target = self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        """Starts and closes workers in the background"""
+        while True:
+            with self.lock:
+                while not (self.closed or self.released or
+                           (len(self.idle) < self.size and not self.failed)):
+                    self.wake.wait()
+                released, self.released = self.released, []
+                start = (not self.closed and not self.failed and
+                         len(self.idle) < self.size)
+            for worker in released:
+                worker.close()
+            if not start:
+                if self.closed:
+                    return
+                continue
+            try:
+                worker = CbcWorker(self.path, self.tmpDir)
+            except (OSError, PulpSolverError) as e:
+                log.debug("cannot start cbc worker %s: %s" % (self.path, e))
+                with self.lock:
+                    self.failed = True
+                continue
+            with self.lock:
+                if not self.closed:
+                    self.idle.append(worker)
+                    worker = None
+            if worker is not None:
+                worker.close()
+
+    def acquire(self):
+        """Returns a healthy worker, it has to be released after its solve"""
+        worker = None
+        while worker is None:
+            with self.lock:
+                if not self.idle:
+                    break
+                worker = self.idle.pop()
+            if not worker.healthy():
+                log.debug("replacing cbc worker %s" % self.path)
+                self.release(worker)
+                worker = None
+        with self.lock:
+            self.failed = False
+            self.wake.notify()
+        if worker is None:
+            worker = CbcWorker(self.path, self.tmpDir)
+        return worker
+
+    def release(self, worker):
+        """The worker is closed in the background"""
+        with self.lock:
+            self.released.append(worker)
+            self.wake.notify()
+
+    def close(self):
+        """Stops the thread and the workers"""
+        with self.lock:
+            self.closed = True
+            workers, self.idle = self.idle, []
+            self.wake.notify()
+        self.thread.join(60)
+        for worker in workers:
+            worker.close()
+
+cbcWorkerPools = {}
+cbcWorkerPoolsLock = threading.Lock()
+
+def cbcWorkerPool(path, size = 1, tmpDir = None):
+    """
+    Returns the CbcWorkerPool of the cbc binary path, it is created with
+    the other arguments on the first call. A forked process gets pools of
+    its own, it must not talk to the workers of its parent
+    """
+    key = (os.getpid(), path)
+    with cbcWorkerPoolsLock:
+        if key not in cbcWorkerPools:
+            cbcWorkerPools[key] = CbcWorkerPool(path, size, tmpDir)
+        return cbcWorkerPools[key]
+
+@atexit.register
+def closeCbcWorkerPools():
+    with cbcWorkerPoolsLock:
+        for (pid, path), pool in list(cbcWorkerPools.items()):
+            if pid == os.getpid():
+                pool.close()
+                del cbcWorkerPools[(pid, path)]
+
+class COIN_WORKER(COIN_CMD):
+    """
+    cbc from a CbcWorkerPool, the process of a solve is started while the
+    previous model is built. The options are the same as for COIN_CMD, the
+    model goes through the pipe mode (see callCBCPipe) of COIN_CMD
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        :param workers: number of cbc processes kept waiting, used when the
+            pool of the binary is created
+        """
+        self.workers = kwargs.pop("workers", 1)
+        kwargs["pipe"] = True
+        COIN_CMD.__init__(self, *args, **kwargs)
+
+    def copy(self):
+        """Make a copy of self"""
+        aCopy = COIN_CMD.copy(self)
+        aCopy.workers = self.workers
+        return aCopy
+
+    def available(self):
+        """True if the solver is available"""
+        return os.name == "posix" and COIN_CMD.available(self)
+
+    def pool(self):
+        return cbcWorkerPool(self.path, self.workers, self.tmpDir)
+
+    def usePipe(self, mipStart = False):
+        """the MIP start is passed to the worker with the model"""
+        return True
+
+    def callCBCPipe(self, model, maximize = False, mipStart = None,
+                    stopper = None):
+        """
+        Solves the mps file in the string model with a worker of the pool,
+        the arguments and the result are the same as for COIN_CMD. A worker
+        is not killed by a stopper, the solve runs until cbc is done
+        """
+        options = self.cbcOptions(maximize)
+        timeout = None
+        if self.maxSeconds is not None:
+            # a worker that hangs longer is killed
+            timeout = self.maxSeconds + 60
+        pool = self.pool()
+        worker = pool.acquire()
+        try:
+            out = worker.solve(model, options,
+                               None if mipStart is None else self.mipStartText(mipStart),
+                               timeout)
+        finally:
+            pool.release(worker)
+        return self.solutionFromOutput(out)
+
+class PULP_CBC_WORKER(COIN_WORKER):
+    """
+    COIN_WORKER with the precompiled version of cbc provided with the package
+    """
+
+    def __init__(self, path = None, *args, **kwargs):
+        if path is not None:
+            raise PulpSolverError('Use COIN_WORKER if you want to set a path')
+        COIN_WORKER.__init__(self, PULP_CBC_CMD.pulp_cbc_path, *args, **kwargs)
+
+def CBC_DLL_load_dll(path):
+    """
+    loads libCbcSolver from path or, if it is not found there, from the
+    library search path
+    """
+    import ctypes
+    import ctypes.util
+    try:
+        return ctypes.CDLL(path)
+    except OSError:
+        found = ctypes.util.find_library("CbcSolver")
+        if found is None:
+            raise
+        return ctypes.CDLL(found)
+
+class CBC_DLL(LpSolver):
+    """
+    The CBC MIP solver in this process through the C interface of
+    libCbcSolver (Cbc_C_Interface.h). The model is passed as arrays in
+    compressed sparse column format and the solution is read back from
+    memory, no file is written and no process is started.
+
+    If the library is not available, and for semicontinuous variables and
+    SOS2 that the C interface does not know, the problem is solved by the
+    fallback solver: PULP_CBC_CMD (COIN_CMD if the bundled cbc is missing)
+    with the same options unless another solver is given
+    """
+    try:
+        lib = CBC_DLL_load_dll(cbc_lib_path)
+        lib.Cbc_newModel.restype = ctypes.c_void_p
+        lib.Cbc_deleteModel.argtypes = [ctypes.c_void_p]
+        lib.Cbc_loadProblem.argtypes = [ctypes.c_void_p,
+            ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_int)] + [ctypes.POINTER(ctypes.c_double)] * 6
+        lib.Cbc_setObjSense.argtypes = [ctypes.c_void_p, ctypes.c_double]
+        lib.Cbc_setLogLevel.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.Cbc_setInteger.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.Cbc_setParameter.argtypes = [ctypes.c_void_p, ctypes.c_char_p,
+                                         ctypes.c_char_p]
+        lib.Cbc_addSOS.argtypes = [ctypes.c_void_p, ctypes.c_int,
+            ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_double), ctypes.c_int]
+        lib.Cbc_setMIPStartI.argtypes = [ctypes.c_void_p, ctypes.c_int,
+            ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_double)]
+        lib.Cbc_solve.argtypes = [ctypes.c_void_p]
+        for name in ["Cbc_getColSolution", "Cbc_getReducedCost",
+                     "Cbc_getRowActivity"]:
+            getattr(lib, name).argtypes = [ctypes.c_void_p]
+            getattr(lib, name).restype = ctypes.POINTER(ctypes.c_double)
+        for name in ["Cbc_status", "Cbc_isProvenOptimal",
+                     "Cbc_isProvenInfeasible", "Cbc_isContinuousUnbounded",
+                     "Cbc_isInitialSolveProvenPrimalInfeasible"]:
+            getattr(lib, name).argtypes = [ctypes.c_void_p]
+        # the shadow prices are not in the C interface of every version
+        if hasattr(lib, "Cbc_getRowPrice"):
+            lib.Cbc_getRowPrice.argtypes = [ctypes.c_void_p]
+            lib.Cbc_getRowPrice.restype = ctypes.POINTER(ctypes.c_double)
+    except (ImportError, OSError, AttributeError):
+        # no library or one without the functions needed
+        lib = None
+    # Cbc_solve runs CbcMain1, which keeps global state: solves in the
+    # threads of one process are serialized
+    lock = threading.Lock()
+
+    def __init__(self, mip = True, msg = False, options = [],
+            fracGap = None, maxSeconds = None, threads = None,
+            warmStart = False, presolve = None, strong = None, cuts = None,
+            fallback = None):
+        """
+        :param fracGap: relative mip gap (cbc ratio)
+        :param maxSeconds: time limit in seconds
+        :param threads: number of threads of cbc
+        :param warmStart: if True the values of the variables are passed
+            as MIP start
+        :param fallback: solver for the problems that are not solved in
+            process, see fallbackSolver
+        """
+        LpSolver.__init__(self, mip, msg, options)
+        self.fracGap = fracGap
+        self.maxSeconds = maxSeconds
+        self.threads = threads
+        self.warmStart = warmStart
+        self.presolve = presolve
+        self.strong = strong
+        self.cuts = cuts
+        self.fallback = fallback
+
+    @classmethod
+    def fromSolver(cls, solver):
+        """
+        Returns a CBC_DLL with the options of the COIN_CMD solver (e.g. a
+        PULP_CBC_WORKER), which is also its fallback
+        """
+        return cls(mip = solver.mip, msg = solver.msg,
+                   options = solver.options, fracGap = solver.fracGap,
+                   maxSeconds = solver.maxSeconds, threads = solver.threads,
+                   warmStart = solver.warmStart, presolve = solver.presolve,
+                   strong = solver.strong, cuts = solver.cuts,
+                   fallback = solver)
+
+    def copy(self):
+        """Make a copy of self"""
+        return self.__class__(mip = self.mip, msg = self.msg,
+            options = self.options, fracGap = self.fracGap,
+            maxSeconds = self.maxSeconds, threads = self.threads,
+            warmStart = self.warmStart, presolve = self.presolve,
+            strong = self.strong, cuts = self.cuts,
+            fallback = None if self.fallback is None else self.fallback.copy())
+
+    def available(self):
+        """True if the library or the fallback solver is available"""
+        return self.lib is not None or self.fallbackSolver().available()
+
+    def fallbackSolver(self):
+        """The solver used when the library is not available"""
+        if self.fallback is not None:
+            return self.fallback
+        solver = PULP_CBC_CMD if PULP_CBC_CMD().available() else COIN_CMD
+        return solver(mip = self.mip, msg = self.msg, options = self.options,
+                      fracGap = self.fracGap, maxSeconds = self.maxSeconds,
+                      threads = self.threads, warmStart = self.warmStart,
+                      presolve = self.presolve, strong = self.strong,
+                      cuts = self.cuts)
+
+    def cbcParameters(self):
+        """The parameters of Cbc_setParameter as (name, value) tuples, the
+        same as the options of COIN_CMD, the log level is set by
+        Cbc_setLogLevel"""
+        parameters = []
+        if self.threads:
+            parameters.append(("threads", str(self.threads)))
+        if self.fracGap is not None:
+            parameters.append(("ratio", str(self.fracGap)))
+        if self.maxSeconds is not None:
+            parameters.append(("sec", str(self.maxSeconds)))
+        if self.presolve:
+            parameters.append(("presolve", "on"))
+        if self.strong:
+            parameters.append(("strong", "%d" % self.strong))
+        if self.cuts:
+            parameters += [("gomory", "on"), ("knapsack", "on"),
+                           ("probing", "on")]
+        for option in self.options:
+            words = option.split()
+            parameters += list(zip(words[0::2], words[1::2]))
+        return parameters
+
+    def actualSolve(self, lp, **kwargs):
+        """Solve a well formulated lp problem"""
+        variables = lp.columns()
+        if (self.lib is None or lp.sos2 or
+                any(v.cat == LpSemiContinuous for v in variables)):
+            return self.fallbackSolver().actualSolve(lp, **kwargs)
+        inf = float("inf")
+        column = dict((id(v), j) for j, v in enumerate(variables))
+        matrix = sparse.CscMatrix.fromProblem(lp, variables)
+        objective = [0.0] * len(variables)
+        for v, coeff in (lp.objective or {}).items():
+            objective[column[id(v)]] = coeff
+        constraints = list(lp.constraints.values())
+        lowBounds = [c.getLb() for c in constraints]
+        upBounds = [c.getUb() for c in constraints]
+        mipStart = None
+        if self.warmStart:
+            mipStart = [(j, v.varValue) for j, v in enumerate(variables)
+                        if v.varValue is not None]
+        solution = self.solveArrays(matrix.starts, matrix.indices,
+            matrix.values,
+            [-inf if v.lowBound is None else v.lowBound for v in variables],
+            [inf if v.upBound is None else v.upBound for v in variables],
+            objective,
+            [-inf if b is None else b for b in lowBounds],
+            [inf if b is None else b for b in upBounds],
+            [v.cat == LpInteger for v in variables],
+            lp.sense == LpMaximize,
+            [([column[id(v)] for v in members], list(members.values()))
+             for members in lp.sos1.values()],
+            mipStart)
+        lp.status, values, reducedCosts, activity, shadowPrices = solution
+        lp.assignSolution(variables, values, reducedCosts, activity,
+                          shadowPrices)
+        return lp.status
+
+    def solveArrays(self, colStarts, rowIndex, values, lower, upper,
+            objective, rowLower, rowUpper, integer = None, maximize = False,
+            sos1 = (), mipStart = None):
+        """
+        Solves a model given in compressed sparse column format with cbc
+        in this process, bounds that are not there are -inf or inf
+
+        :param colStarts: column j has its entries in
+            [colStarts[j], colStarts[j + 1])
+        :param rowIndex: row of every entry
+        :param values: coefficient of every entry
+        :param lower: lower bound of every column
+        :param upper: upper bound of every column
+        :param objective: objective coefficient of every column
+        :param rowLower: lower bound of every row
+        :param rowUpper: upper bound of every row
+        :param integer: None or True for every integer column
+        :param maximize: True to maximize the objective
+        :param sos1: sequence of (column indices, weights) of SOS1 sets
+        :param mipStart: None or sequence of (column index, value)
+        :return: status and arrays of the column values, reduced costs,
+            row activities and shadow prices (None if the library does not
+            report them)
+        """
+        lib = self.lib
+        numCols, numRows = len(lower), len(rowLower)
+        doubles = lambda x: ctypesArrayFill(x, ctypes.c_double)
+        ints = lambda x: ctypesArrayFill(x, ctypes.c_int)
+        model = lib.Cbc_newModel()
+        try:
+            lib.Cbc_loadProblem(model, numCols, numRows, ints(colStarts),
+                                ints(rowIndex), doubles(values),
+                                doubles(lower), doubles(upper),
+                                doubles(objective), doubles(rowLower),
+                                doubles(rowUpper))
+            lib.Cbc_setObjSense(model, -1 if maximize else 1)
+            lib.Cbc_setLogLevel(model, 1 if self.msg else 0)
+            if self.mip and integer is not None:
+                for j, isInteger in enumerate(integer):
+                    if isInteger:
+                        lib.Cbc_setInteger(model, j)
+            if self.mip and sos1:
+                starts, columns, weights = [0], [], []
+                for setColumns, setWeights in sos1:
+                    columns.extend(setColumns)
+                    weights.extend(setWeights)
+                    starts.append(len(columns))
+                lib.Cbc_addSOS(model, len(sos1), ints(starts), ints(columns),
+                               doubles(weights), 1)
+            if self.mip and mipStart:
+                lib.Cbc_setMIPStartI(model, len(mipStart),
+                                     ints([j for j, _ in mipStart]),
+                                     doubles([x for _, x in mipStart]))
+            for name, value in self.cbcParameters():
+                lib.Cbc_setParameter(model, name, value)
+            with self.lock:
+                lib.Cbc_solve(model)
+            if lib.Cbc_isProvenOptimal(model):
+                status = LpStatusOptimal
+            elif lib.Cbc_isInitialSolveProvenPrimalInfeasible(model):
+                status = LpStatusInfeasible
+            elif lib.Cbc_isContinuousUnbounded(model):
+                status = LpStatusUnbounded
+            elif lib.Cbc_isProvenInfeasible(model):
+                # status -1: there was no branch and bound, the relaxation
+                # is not primal infeasible but dual infeasible
+                if lib.Cbc_status(model) == -1:
+                    status = LpStatusUnbounded
+                else:
+                    status = LpStatusInfeasible
+            else:
+                status = LpStatusNotSolved
+            return (status,
+                    self.doubleArray(lib.Cbc_getColSolution(model), numCols),
+                    self.doubleArray(lib.Cbc_getReducedCost(model), numCols),
+                    self.doubleArray(lib.Cbc_getRowActivity(model), numRows),
+                    self.doubleArray(lib.Cbc_getRowPrice(model), numRows)
+                    if hasattr(lib, "Cbc_getRowPrice") else None)
+        finally:
+            lib.Cbc_deleteModel(model)
+
+    @staticmethod
+    def doubleArray(pointer, n):
+        """copy of the n doubles at pointer, zeros for a null pointer"""
+        if numpy is not None:
+            if not pointer or not n:
+                return numpy.zeros(n)
+            return numpy.ctypeslib.as_array(pointer, shape = (n,)).copy()
+        if not pointer:
+            return array("d", [0.0]) * n
+        return array("d", pointer[:n])
+
 def COINMP_DLL_load_dll(path):
     """
     function that loads the DLL useful for debugging installation problems
@@ -1958,13 +2808,7 @@ class GUROBI_CMD(LpSolver_CMD):
         """Solve a well formulated lp problem"""
         if not self.executable(self.path):
             raise PulpSolverError("PuLP: cannot execute "+self.path)
-        if not self.keepFiles:
-            pid = os.getpid()
-            tmpLp = os.path.join(self.tmpDir, "%d-pulp.lp" % pid)
-            tmpSol = os.path.join(self.tmpDir, "%d-pulp.sol" % pid)
-        else:
-            tmpLp = lp.name+"-pulp.lp"
-            tmpSol = lp.name+"-pulp.sol"
+        tmpLp, tmpSol = self.tmpFiles(lp.name, "lp", "sol")
         lp.writeLP(tmpLp, writeSOS = 1)
         try: os.remove(tmpSol)
         except: pass
@@ -2438,6 +3282,10 @@ try:
         type is the type of the c array
         """
         ctype= type * len(myList)
+        if numpy is not None and isinstance(myList, numpy.ndarray):
+            # one copy of the buffer, e.g. for the arrays of a sparse matrix
+            return ctype.from_buffer_copy(
+                numpy.ascontiguousarray(myList, dtype = numpy.dtype(type)))
         cList = ctype()
         for i,elem in enumerate(myList):
             cList[i] = elem
@@ -2617,14 +3465,7 @@ class SCIP_CMD(LpSolver_CMD):
         if not self.executable(self.path):
             raise PulpSolverError("PuLP: cannot execute "+self.path)
 
-        # TODO: should we use tempfile instead?
-        if not self.keepFiles:
-            pid = os.getpid()
-            tmpLp = os.path.join(self.tmpDir, "%d-pulp.lp" % pid)
-            tmpSol = os.path.join(self.tmpDir, "%d-pulp.sol" % pid)
-        else:
-            tmpLp = lp.name + "-pulp.lp"
-            tmpSol = lp.name + "-pulp.sol"
+        tmpLp, tmpSol = self.tmpFiles(lp.name, "lp", "sol")
 
         lp.writeLP(tmpLp)
         proc = [
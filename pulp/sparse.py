@@ -23,9 +23,19 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 """
-sparse this module provides basic pure python sparse matrix implementation
+sparse this module provides sparse matrices in compressed sparse row (CSR)
+and compressed sparse column (CSC) format, built in one vectorized step from
+triplets or from the constraints of an LpProblem, and the basic pure python
+dictionary based Matrix.
 notably this allows the sparse matrix to be output in various formats
+
+The arrays are numpy arrays if numpy is available, array.array otherwise
 """
+from array import array
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class Matrix(dict):
     """ This is a dictionary based sparse matrix class
@@ -79,6 +89,153 @@ class Matrix(dict):
         startsBase.append(len(elemBase))
         return numEls, startsBase, lenBase, indBase, elemBase
 
+def _compress(numMajor, major, minor, values):
+    """
+    Sorts triplets by (major, minor) and sums the values of equal pairs
+
+    :return: starts, indices, values of the compressed format
+    """
+    if numpy is not None:
+        major = numpy.asarray(major, dtype = numpy.int64)
+        minor = numpy.asarray(minor, dtype = numpy.int64)
+        values = numpy.asarray(values, dtype = float)
+        order = numpy.lexsort((minor, major))
+        major, minor, values = major[order], minor[order], values[order]
+        if len(major) > 1:
+            first = numpy.ones(len(major), dtype = bool)
+            first[1:] = (major[1:] != major[:-1]) | (minor[1:] != minor[:-1])
+            if not first.all():
+                values = numpy.add.reduceat(values, numpy.flatnonzero(first))
+                major, minor = major[first], minor[first]
+        starts = numpy.zeros(numMajor + 1, dtype = numpy.int64)
+        numpy.cumsum(numpy.bincount(major, minlength = numMajor),
+                     out = starts[1:])
+        return starts, minor, values
+    summed = {}
+    for key in zip(major, minor, values):
+        summed[key[:2]] = summed.get(key[:2], 0) + key[2]
+    keys = sorted(summed)
+    starts = array("l", [0]) * (numMajor + 1)
+    for i, _ in keys:
+        starts[i + 1] += 1
+    for i in range(numMajor):
+        starts[i + 1] += starts[i]
+    return (starts, array("l", [j for _, j in keys]),
+            array("d", [summed[k] for k in keys]))
+
+def _expand(starts):
+    """major index of every entry of a compressed matrix"""
+    if numpy is not None:
+        return numpy.repeat(numpy.arange(len(starts) - 1),
+                            numpy.diff(starts))
+    major = array("l")
+    for i in range(len(starts) - 1):
+        major.extend([i] * (starts[i + 1] - starts[i]))
+    return major
+
+class CompressedMatrix(object):
+    """
+    Base class of CsrMatrix and CscMatrix: the entries of line i (a row of
+    a CsrMatrix, a column of a CscMatrix) are indices[starts[i]:starts[i+1]]
+    and values[starts[i]:starts[i+1]], sorted by index
+    """
+    def __init__(self, shape, starts, indices, values):
+        """
+        :param shape: (number of rows, number of columns)
+        :param starts: len(lines) + 1 offsets into indices and values
+        :param indices: index of each entry in its line
+        :param values: value of each entry
+        """
+        self.shape = tuple(shape)
+        self.starts = starts
+        self.indices = indices
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def lengths(self):
+        """number of entries of every line"""
+        if numpy is not None:
+            return numpy.diff(self.starts)
+        return array("l", [self.starts[i + 1] - self.starts[i]
+                           for i in range(len(self.starts) - 1)])
+
+    @classmethod
+    def fromTriplets(cls, shape, rows, cols, values):
+        """
+        Builds the matrix from the row index, column index and value of
+        every entry, the values of equal positions are summed
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def fromProblem(cls, lp, variables = None):
+        """
+        Builds the coefficient matrix of the constraints of lp, rows are in
+        the order of lp.constraints, columns in the order of variables
+
+        :param lp: LpProblem
+        :param variables: the variables of the columns, default lp.columns()
+        """
+        if variables is None:
+            variables = lp.columns()
+        column = dict((id(v), i) for i, v in enumerate(variables))
+        lengths = []
+        cols = []
+        values = []
+        for c in lp.constraints.values():
+            # the order of the terms does not matter, the plain dict methods
+            # skip the ordering of an OrderedDict
+            lengths.append(len(c))
+            cols.extend(map(column.__getitem__, map(id, dict.keys(c))))
+            values.extend(dict.values(c))
+        if numpy is not None:
+            rows = numpy.repeat(numpy.arange(len(lengths)), lengths)
+        else:
+            rows = [i for i, n in enumerate(lengths) for _ in range(n)]
+        return cls.fromTriplets((len(lengths), len(variables)),
+                                rows, cols, values)
+
+class CsrMatrix(CompressedMatrix):
+    """
+    Sparse matrix in compressed sparse row format
+    """
+    @classmethod
+    def fromTriplets(cls, shape, rows, cols, values):
+        return cls(shape, *_compress(shape[0], rows, cols, values))
+
+    def toCsc(self):
+        return CscMatrix.fromTriplets(self.shape, _expand(self.starts),
+                                      self.indices, self.values)
+
+    def row_based_arrays(self):
+        """
+        returns numEls, starts, lengths, column indices and values of the rows
+        """
+        return (len(self), self.starts, self.lengths(), self.indices,
+                self.values)
+
+class CscMatrix(CompressedMatrix):
+    """
+    Sparse matrix in compressed sparse column format
+    """
+    @classmethod
+    def fromTriplets(cls, shape, rows, cols, values):
+        return cls(shape, *_compress(shape[1], cols, rows, values))
+
+    def toCsr(self):
+        return CsrMatrix.fromTriplets(self.shape, self.indices,
+                                      _expand(self.starts), self.values)
+
+    def col_based_arrays(self):
+        """
+        returns numEls, starts, lengths, row indices and values like
+        Matrix.col_based_arrays, as arrays
+        """
+        return (len(self), self.starts, self.lengths(), self.indices,
+                self.values)
+
 if __name__ == "__main__":
     """ unit test
     """
@@ -88,5 +245,8 @@ if __name__ == "__main__":
     mat.add(1,52,"item")
     mat.add(2,54,"stuff")
     print(mat.col_based_arrays())
+    csc = CscMatrix.fromTriplets((10, 10), [1, 2, 1], [2, 4, 2], [1., 2., 3.])
+    print(csc.col_based_arrays())
+    print(csc.toCsr().row_based_arrays())
 
 
@@ -595,6 +595,477 @@ def pulpTest123(solver):
     else:
         pulpTestCheck(prob, solver, [LpStatusUnbounded])
 
+def pulpTest130(solver):
+    """
+    Test passing initial values as MIP start
+    """
+    prob = LpProblem("test130", LpMinimize)
+    x = LpVariable("x", 0, 4, LpInteger)
+    y = LpVariable("y", -1, 1, LpInteger)
+    z = LpVariable("z", 0, None, LpInteger)
+    prob += x + 4*y + 9*z, "obj"
+    prob += x+y <= 5, "c1"
+    prob += x+z >= 10, "c2"
+    prob += -y+z == 7, "c3"
+    x.setInitialValue(4)
+    y.setInitialValue(0)
+    z.setInitialValue(7)
+    if solver.__class__ in [PULP_CBC_CMD, COIN_CMD, COIN_WORKER, CBC_DLL]:
+        print("\t Testing MIP start")
+        solver.warmStart = True
+        pulpTestCheck(prob, solver, [LpStatusOptimal], {x:4, y:-1, z:6})
+
+
+def pulpTest140(solver):
+    """
+    Test expressions built in bulk (LpArrayExpression, lpDot, lpSum)
+    """
+    prob = LpProblem("test140", LpMinimize)
+    x = LpVariable("x", 0, 4)
+    y = LpVariable("y", -1, 1)
+    z = LpVariable("z", 0)
+    w = LpVariable("w", 0)
+    prob += lpDot([x, y, z], [1, 4, 9]), "obj"
+    prob += LpArrayExpression([x, y, z], [1, 1, 0]) <= 5, "c1"
+    prob += lpSum([LpArrayExpression([x, z], [1, 2]), [LpArrayExpression([z], [-1])]]) >= 10, "c2"
+    prob += LpArrayExpression([y, z], [-1, 0.5, 0.5], indices=[0, 1, 1], constant=-1) == 6, "c3"
+    prob += lpSum([w, [w, 3]]) >= 3, "c4"
+    print("\t Testing expressions built in bulk")
+    pulpTestCheck(prob, solver, [LpStatusOptimal], {x:4, y:-1, z:6, w:0})
+
+
+def pulpTest141(solver):
+    """
+    Test bulk expressions with repeated variables and changes in place
+    """
+    prob = LpProblem("test141", LpMinimize)
+    x = LpVariable("x", 0, 4)
+    y = LpVariable("y", -1, 1)
+    z = LpVariable("z", 0)
+    prob += lpDot([x, x, y, z], [1, 2, 3, 1]), "obj"
+    e = LpArrayExpression([x, z], [1, 1])
+    e.addterm(z, 1)
+    prob += lpSum([e, y]) >= 6, "c1"
+    prob += LpArrayExpression([x, x], [1, 1]) == 4, "c2"
+    print("\t Testing bulk expressions with repeated variables")
+    pulpTestCheck(prob, solver, [LpStatusOptimal], {x:2, y:-1, z:2.5}, objective = 5.5)
+
+
+def pulpTest150(solver):
+    """
+    Test the variable registry (column ids) across changes of the problem
+    """
+    prob = LpProblem("test150", LpMinimize)
+    x = LpVariable("x", 0, 4)
+    y = LpVariable("y", -1, 1)
+    z = LpVariable("z", 0)
+    w = LpVariable("w", 0)
+    prob += x+z >= 10, "c2"
+    prob += x+y <= 5, "c1"
+    assert [v.name for v in prob.variables()] == ["x", "y", "z"]
+    assert prob.columnId(z) == 1
+    prob += x + 4*y + 9*z, "obj"
+    prob += -y+z == 7, "c3"
+    c4 = LpConstraint(sense=LpConstraintGE, rhs=0)
+    prob += c4, "c4"
+    c4.addterm(w, 1)
+    assert [v.name for v in prob.variables()] == ["w", "x", "y", "z"]
+    assert [prob.columnId(v) for v in (x, z, y, w)] == [0, 1, 2, 3]
+    v = LpVariable("v", 0)
+    prob.constraints["c5"] = LpConstraint(v - w, LpConstraintEQ, rhs=0)
+    assert prob.columnId(v) == 4
+    # stays a column without coefficients
+    prob.constraints["c5"].pop(v)
+    print("\t Testing variable registry")
+    pulpTestCheck(prob, solver, [LpStatusOptimal], {x:4, y:-1, z:6, w:0})
+
+
+def pulpTest160(solver):
+    """
+    Test adding constraints in bulk (addConstraints, addConstraintBlock)
+    """
+    prob = LpProblem("test160", LpMinimize)
+    x = LpVariable("x", 0, 4)
+    y = LpVariable("y", -1, 1)
+    z = LpVariable("z", 0)
+    w = LpVariable("w", 0)
+    prob += x + 4*y + 9*z, "obj"
+    prob.addConstraints([("c1", x+y <= 5), ("c2", x+z >= 10)])
+    prob.addConstraintBlock(["c3", "c4"], [y, z, w], starts=[0, 2, 3], indices=[0, 1, 2],
+                            coefs=[-1, 1, 1], senses=[LpConstraintEQ, LpConstraintGE], rhs=[7, 0])
+    try:
+        prob.addConstraints({"c1": x >= 0})
+    except PulpError:
+        pass
+    else:
+        raise PulpError("overlapping constraint name not detected")
+    print("\t Testing adding constraints in bulk")
+    pulpTestCheck(prob, solver, [LpStatusOptimal], {x:4, y:-1, z:6, w:0})
+
+
+def pulpTest170(solver):
+    """
+    Test ranged constraints (rhsRange)
+    """
+    prob = LpProblem("test170", LpMinimize)
+    x = LpVariable("x", 0, 4)
+    y = LpVariable("y", -1, 1)
+    z = LpVariable("z", 0)
+    w = LpVariable("w")
+    prob += -2*x - y + z + w, "obj"
+    c1 = x + y >= 2
+    c1.rhsRange = 1
+    c2 = z - y == 1
+    c2.rhsRange = -2
+    prob += c1, "c1"
+    prob += c2, "c2"
+    prob += LpConstraint(w, LpConstraintLE, rhs=5, rhsRange=3), "c3"
+    assert (c1.getLb(), c1.getUb()) == (2, 3)
+    assert (c2.getLb(), c2.getUb()) == (-1, 1)
+    assert (prob.constraints["c3"].getLb(), prob.constraints["c3"].getUb()) == (2, 5)
+    print("\t Testing ranged constraints")
+    pulpTestCheck(prob, solver, [LpStatusOptimal], {x:4, y:-1, z:0, w:2})
+
+
+def pulpTest180(solver):
+    """
+    Test semicontinuous variables
+    """
+    prob = LpProblem("test180", LpMinimize)
+    x = LpVariable("x", 2, 4, LpSemiContinuous)
+    y = LpVariable("y", 3, 5, LpSemiContinuous)
+    z = LpVariable("z", 0, 10)
+    prob += x + y + 10*z, "obj"
+    prob += x + y + z >= 1, "c1"
+    assert prob.isMIP()
+    print("\t Testing semicontinuous variables")
+    if solver.__class__ in [PULP_CBC_CMD, COIN_CMD, COIN_WORKER, CBC_DLL,
+            CPLEX_CMD, GUROBI_CMD]:
+        pulpTestCheck(prob, solver, [LpStatusOptimal], {x:2, y:0, z:0})
+
+
+def pulpTest190(solver):
+    """
+    Test special ordered sets of type 1 in MPS files
+    """
+    prob = LpProblem("test190", LpMaximize)
+    x = [LpVariable("x%d" % i, cat=LpBinary) for i in range(4)]
+    prob += x[0] + 2*x[1] + 3*x[2] + x[3], "obj"
+    prob += x[0] + x[1] + x[2] >= 1, "c1"
+    prob += x[2] + x[3] <= 2, "c2"
+    prob.sos1["s1"] = {x[0]: 1, x[1]: 2}
+    prob.sos1["s2"] = {x[1]: 1, x[2]: 2}
+    print("\t Testing SOS1 sets")
+    if solver.__class__ in [PULP_CBC_CMD, COIN_CMD, COIN_WORKER, CBC_DLL]:
+        pulpTestCheck(prob, solver, [LpStatusOptimal], {x[0]:1, x[1]:0, x[2]:1, x[3]:1})
+
+
+def pulpTest200(solver):
+    """
+    Test solving through pipes without temporary files
+    """
+    if solver.__class__ not in [PULP_CBC_CMD, COIN_CMD]:
+        return
+    prob = LpProblem("test200", LpMinimize)
+    x = LpVariable("x", 0, 4)
+    y = LpVariable("y", -1, 1)
+    z = LpVariable("z", 0, None, LpInteger)
+    w = LpVariable("w", 0)
+    prob += x + 4*y + 9*z, "obj"
+    prob += x+y <= 5, "c1"
+    prob += x+z >= 10, "c2"
+    prob += -y+z == 7.5, "c3"
+    solver.pipe = True
+    print("\t Testing solving through pipes")
+    pulpTestCheck(prob, solver, [LpStatusOptimal], {x:3, y:-0.5, z:7})
+    solver.warmStart = True
+    prob += w >= 1, "c4"
+    pulpTestCheck(prob, solver, [LpStatusOptimal], {x:3, y:-0.5, z:7, w:1})
+    prob += x+z <= 5, "c5"
+    pulpTestCheck(prob, solver, [LpStatusInfeasible, LpStatusNotSolved, LpStatusUndefined])
+
+def pulpTest210(solver):
+    """
+    Test replacement of cbc workers that died
+    """
+    if solver.__class__ not in [COIN_WORKER]:
+        return
+    prob = LpProblem("test210", LpMinimize)
+    x = LpVariable("x", 0, 4)
+    y = LpVariable("y", -1, 1)
+    z = LpVariable("z", 0, None, LpInteger)
+    prob += x + 4*y + 9*z, "obj"
+    prob += x+y <= 5, "c1"
+    prob += x+z >= 10, "c2"
+    prob += -y+z == 7.5, "c3"
+    print("\t Testing replacement of cbc workers")
+    pulpTestCheck(prob, solver, [LpStatusOptimal], {x:3, y:-0.5, z:7})
+    pool = solver.pool()
+    worker = pool.acquire()
+    worker.process.kill()
+    worker.process.wait()
+    pool.idle.append(worker)
+    pulpTestCheck(prob, solver, [LpStatusOptimal], {x:3, y:-0.5, z:7})
+    prob.sense = LpMaximize
+    pulpTestCheck(prob, solver, [LpStatusOptimal], {x:4, y:0.5, z:8})
+
+def pulpTest220(solver):
+    """
+    Test concurrent solves in threads
+    """
+    if solver.__class__ not in [PULP_CBC_CMD, COIN_CMD, COIN_WORKER, CBC_DLL,
+            GLPK_CMD]:
+        return
+    probs = []
+    for i in range(8):
+        prob = LpProblem("test220", LpMinimize)
+        x = LpVariable("x", 0, 4)
+        y = LpVariable("y", -1, 1)
+        z = LpVariable("z", 0, None, LpInteger)
+        prob += x + 4*y + 9*z, "obj"
+        prob += x+y <= 5, "c1"
+        prob += x+z >= 10 + i, "c2"
+        prob += -y+z == 7.5 + i, "c3"
+        probs.append((prob, {x:3, y:-0.5, z:7 + i}))
+    print("\t Testing concurrent solves")
+    statuses = lpSolveAll([prob for prob, sol in probs], solver, threads = 4)
+    for status, (prob, sol) in zip(statuses, probs):
+        pulpTestCheck(prob, solver, [LpStatusOptimal], sol, status = status)
+
+def pulpTest230(solver):
+    """
+    Test the lazy assignment of cbc solutions
+    """
+    if solver.__class__ not in [PULP_CBC_CMD, COIN_CMD, COIN_WORKER]:
+        return
+    from . import solvers
+    prob = LpProblem("test230", LpMinimize)
+    x = LpVariable("x", 0, 4)
+    y = LpVariable("y", -1, 1)
+    z = LpVariable("z", 0, None, LpInteger)
+    prob += x + 4*y + 9*z, "obj"
+    prob += x+y <= 5, "c1"
+    prob += x+z >= 10, "c2"
+    prob += -y+z == 7.5, "c3"
+    print("\t Testing lazy solution values")
+    pulpTestCheck(prob, solver, [LpStatusOptimal], {x:3, y:-0.5, z:7},
+                  slacks = {"c1":2.5, "c2":0, "c3":0})
+    x.varValue = 1
+    prob.constraints["c1"].slack = None
+    if x.varValue != 1 or prob.constraints["c1"].slack is not None:
+        raise PulpError("Tests failed for solver %s"%solver)
+    prob.sense = LpMaximize
+    pulpTestCheck(prob, solver, [LpStatusOptimal], {x:4, y:0.5, z:8},
+                  slacks = {"c1":0.5, "c2":-2, "c3":0})
+    numpy, solvers.numpy = solvers.numpy, None
+    try:
+        print("\t Testing the solution reader without numpy")
+        pulpTestCheck(prob, solver, [LpStatusOptimal], {x:4, y:0.5, z:8},
+                      slacks = {"c1":0.5, "c2":-2, "c3":0})
+    finally:
+        solvers.numpy = numpy
+
+def pulpTest240(solver):
+    """
+    Test the compressed sparse matrices of a problem
+    """
+    from . import sparse
+    prob = LpProblem("test240", LpMinimize)
+    x = LpVariable("x", 0, 4)
+    y = LpVariable("y", -1, 1)
+    z = LpVariable("z", 0)
+    prob += x + 4*y + 9*z, "obj"
+    prob += x+y <= 5, "c1"
+    prob += x+z >= 10, "c2"
+    prob += -y+z == 7, "c3"
+    print("\t Testing compressed sparse matrices")
+    variables = [z, x, y]
+    column = {z: 0, x: 1, y: 2}
+    matrix = sparse.Matrix(list(range(3)), list(range(3)))
+    for i, c in enumerate(prob.constraints.values()):
+        for v, coeff in c.items():
+            matrix.add(i, column[v], coeff)
+    csc = sparse.CscMatrix.fromProblem(prob, variables)
+    csr = sparse.CsrMatrix.fromProblem(prob, variables)
+    for m in [csc, csr.toCsc(), csc.toCsr().toCsc()]:
+        numels, starts, lens, ind, elems = m.col_based_arrays()
+        entries = dict(((ind[k], j), elems[k]) for j in range(3)
+                       for k in range(starts[j], starts[j] + lens[j]))
+        if numels != len(matrix) or entries != dict(matrix):
+            raise PulpError("Tests failed for sparse matrix %s" % entries)
+    csc = sparse.CscMatrix.fromTriplets((2, 2), [1, 0, 1], [0, 1, 0], [1, 2, 3])
+    if (list(csc.starts), list(csc.indices), list(csc.values)) != (
+            [0, 1, 2], [1, 0], [4, 2]):
+        raise PulpError("Tests failed for sparse matrix from triplets")
+
+def pulpTest250(solver):
+    """
+    Test the fallback of the in process cbc
+    """
+    if solver.__class__ is not CBC_DLL:
+        return
+    prob = LpProblem("test250", LpMinimize)
+    x = LpVariable("x", 0, 4)
+    y = LpVariable("y", -1, 1)
+    z = LpVariable("z", 0, None, LpInteger)
+    prob += x + 4*y + 9*z, "obj"
+    prob += x+y <= 5, "c1"
+    prob += x+z >= 10, "c2"
+    prob += -y+z == 7.5, "c3"
+    print("\t Testing the fallback of CBC_DLL")
+    lib, CBC_DLL.lib = CBC_DLL.lib, None
+    try:
+        pulpTestCheck(prob, solver, [LpStatusOptimal], {x:3, y:-0.5, z:7})
+        fallback = solver.fallbackSolver()
+        solver = CBC_DLL.fromSolver(fallback)
+        if solver.fallbackSolver() is not fallback:
+            raise PulpError("Tests failed for solver %s"%solver)
+        prob.sense = LpMaximize
+        pulpTestCheck(prob, solver, [LpStatusOptimal], {x:4, y:0.5, z:8})
+    finally:
+        CBC_DLL.lib = lib
+
+def pulpTest260(solver):
+    """
+    Test variables with names that are built on demand
+    """
+    variables = {}
+    names = LpNames(lambda: [(v, "x_%s" % k) for k, v in variables.items()])
+    for k in ("a", "b", "c"):
+        variables[k] = LpVariable(names, 0, 4, LpInteger)
+    x, y, z = variables["a"], variables["b"], variables["c"]
+    prob = LpProblem("test260", LpMaximize)
+    prob += x + y + z, "obj"
+    prob += x + y <= 5.5, "c1"
+    prob += y - z >= -3, "c2"
+    print("\t Testing lazy variable names")
+    pulpTestCheck(prob, solver, [LpStatusOptimal], objective = 9)
+    if solver.__class__ in (COIN_CMD, COIN_WORKER):
+        # solved through a renamed mps file
+        if [v for v in variables.values() if v.getRawName() is not names]:
+            raise PulpError("Tests failed for solver %s"%solver)
+    # the names of the renamed mps file are keyed by the variable names
+    from .solvers import StringIO
+    variablesNames = prob.writeMPS(StringIO(), rename = 1)[1]
+    if variablesNames["x_a"] != "X%07d" % prob.columnId(x):
+        raise PulpError("Tests failed for solver %s"%solver)
+    w = LpVariable(names)
+    if x.name != "x_a" or z.name != "x_c" or w.name != "_V1" \
+            or w.name == LpVariable(names).name:
+        raise PulpError("Tests failed for solver %s"%solver)
+
+def pulpTest270(solver):
+    """
+    Test killing cbc by a CbcStopper
+    """
+    if solver.__class__ not in (COIN_CMD, PULP_CBC_CMD):
+        return
+    prob = LpProblem("test270", LpMinimize)
+    x = LpVariable("x", 0, 4)
+    y = LpVariable("y", -1, 1)
+    prob += x + 2*y, "obj"
+    prob += x + y >= 2, "c1"
+    print("\t Testing stopping cbc")
+    tmpMps, tmpSol = solver.tmpFiles("test270", "mps", "sol")
+    prob.writeMPS(tmpMps)
+    stopper = CbcStopper()
+    stopper.stop()
+    calls = [lambda: solver.callCBC(tmpMps, tmpSol, stopper = stopper),
+             lambda: solver.callCBCPipe(open(tmpMps).read(), stopper = stopper)]
+    try:
+        for call in calls:
+            try:
+                call()
+            except PulpSolverError:
+                continue
+            raise PulpError("Tests failed for solver %s"%solver)
+    finally:
+        for tmp in (tmpMps, tmpSol):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    # the solver keeps nothing of the stopped solves
+    pulpTestCheck(prob, solver, [LpStatusOptimal], {x:3, y:-1})
+
+def pulpTest280(solver):
+    """
+    Test the pipe mode with a MIP start without fcntl (e.g. on Windows)
+    """
+    if solver.__class__ not in (COIN_CMD, PULP_CBC_CMD):
+        return
+    from . import solvers
+    prob = LpProblem("test280", LpMinimize)
+    x = LpVariable("x", 0, 4)
+    y = LpVariable("y", -1, 1)
+    z = LpVariable("z", 0, None, LpInteger)
+    prob += x + 4*y + 9*z, "obj"
+    prob += x+y <= 5, "c1"
+    prob += x+z >= 10, "c2"
+    prob += -y+z == 7.5, "c3"
+    x.setInitialValue(3)
+    y.setInitialValue(-0.5)
+    z.setInitialValue(7)
+    solver.pipe = True
+    solver.warmStart = True
+    print("\t Testing the pipe mode with a MIP start without fcntl")
+    fcntl, solvers.fcntl = solvers.fcntl, None
+    try:
+        if solver.usePipe(True):
+            raise PulpError("Tests failed for solver %s"%solver)
+        pulpTestCheck(prob, solver, [LpStatusOptimal], {x:3, y:-0.5, z:7})
+    finally:
+        solvers.fcntl = fcntl
+
+def pulpTest290(solver):
+    """
+    Test repeated names and an integer infeasible problem with the cbc
+    solvers that read the solution by column position
+    """
+    if solver.__class__ not in (COIN_CMD, PULP_CBC_CMD, COIN_WORKER, CBC_DLL):
+        return
+    prob = LpProblem("test290", LpMinimize)
+    x = LpVariable("x", 0, 4)
+    y = LpVariable("x", -1, 1)
+    z = LpVariable("z", 0)
+    w = LpVariable("w", 0)
+    prob += x + 4*y + 9*z, "obj"
+    prob += x+y <= 5, "c1"
+    prob += x+z >= 10, "c2"
+    prob += -y+z == 7, "c3"
+    prob += w >= 0, "c4"
+    print("\t Testing repeated names with cbc")
+    pulpTestCheck(prob, solver, [LpStatusOptimal], {x:4, y:-1, z:6, w:0})
+    prob = LpProblem("test290", LpMinimize)
+    x = LpVariable("x", 0, 4, LpInteger)
+    y = LpVariable("y", -1, 1, LpInteger)
+    z = LpVariable("z", 0, 10, LpInteger)
+    prob += x+y <= 5.2, "c1"
+    prob += x+z >= 10.3, "c2"
+    prob += -y+z == 7.4, "c3"
+    print("\t Testing an integer infeasible problem with cbc")
+    pulpTestCheck(prob, solver, [LpStatusInfeasible])
+
+def pulpTest300(solver):
+    """
+    Test the reporting of dual variables slacks and reduced costs by the
+    cbc command line solvers
+    """
+    if solver.__class__ not in (COIN_CMD, COIN_WORKER):
+        return
+    prob = LpProblem("test300", LpMinimize)
+    x = LpVariable("x", 0, 5)
+    y = LpVariable("y", -1, 1)
+    z = LpVariable("z", 0)
+    prob += x + 4*y + 9*z, "obj"
+    prob += x+y <= 5, "c1"
+    prob += x+z >= 10, "c2"
+    prob += -y+z == 7, "c3"
+    print("\t Testing dual variables and slacks reporting with cbc")
+    pulpTestCheck(prob, solver, [LpStatusOptimal],
+              sol = {x:4, y:-1, z:6},
+              reducedcosts = {x:0, y:12, z:0},
+              duals = {"c1":0, "c2":1, "c3":8},
+              slacks = {"c1":2, "c2":0, "c3":0})
+
 
 def pulpTestSolver(solver, msg = 0):
     tests = [
@@ -613,7 +1084,25 @@ def pulpTestSolver(solver, msg = 0):
             pulpTest090,
             pulpTest100,
             pulpTest110,
-            pulpTest120, pulpTest121, pulpTest122, pulpTest123
+            pulpTest120, pulpTest121, pulpTest122, pulpTest123,
+            pulpTest130,
+            pulpTest140, pulpTest141,
+            pulpTest150,
+            pulpTest160,
+            pulpTest170,
+            pulpTest180,
+            pulpTest190,
+            pulpTest200,
+            pulpTest210,
+            pulpTest220,
+            pulpTest230,
+            pulpTest240,
+            pulpTest250,
+            pulpTest260,
+            pulpTest270,
+            pulpTest280,
+            pulpTest290,
+            pulpTest300
             ]
     for t in tests:
         t(solver(msg=msg))